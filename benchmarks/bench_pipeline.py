@@ -0,0 +1,235 @@
+"""
+Benchmark całego przebiegu na danych syntetycznych (benchmarks/synthetic.py):
+czas i szczytowa pamięć każdego etapu - odczyt XLSX, normalizacja, każdy
+reports.report_*, wszystkie arkusze przez rejestr, zapis raportu XLSX.
+
+Wyniki trafiają do JSON (domyślnie benchmarks/results/<data>_<commit>.json),
+--baseline porównuje z wcześniejszym plikiem.
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 10k,100k --baseline benchmarks/results/poprzedni.json
+
+Odczyt XLSX mierzony tylko do limitu wierszy arkusza Excela (1 048 575 wierszy danych);
+pliki wejściowe są generowane raz i trzymane w --data-dir.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import registry  # noqa: E402
+import reports as rpt  # noqa: E402
+from export_excel import EXCEL_MAX_ROWS, write_report_xlsx  # noqa: E402
+from processing import normalize_frame, read_xlsx_columns  # noqa: E402
+from synthetic import make_sorter_frame, write_sorter_xlsx  # noqa: E402
+
+
+DEFAULT_SIZES = "10k,100k,1M,5M"
+
+# Raporty liczone osobno (każdy od zera, bez wspólnych wyników pośrednich)
+REPORTS: List[tuple[str, Callable[[pd.DataFrame], Any]]] = [
+    ("report_package_type_dims_share", rpt.report_package_type_dims_share),
+    ("report_hourly_dims_measured", rpt.report_hourly_dims_measured),
+    ("report_hourly_weight_measured", rpt.report_hourly_weight_measured),
+    ("report_discharge_detail[99 Loop]", lambda df: rpt.report_discharge_detail(df, "99 Loop")),
+    ("report_discharge_detail[Not Ok 244]", lambda df: rpt.report_discharge_detail(df, "Not Ok 244")),
+    ("report_discharge_detail[Overflow 243]", lambda df: rpt.report_discharge_detail(df, "Overflow 243")),
+    ("report_hourly_loop_nok_overflow", rpt.report_hourly_loop_nok_overflow),
+    ("report_chute_full", rpt.report_chute_full),
+    ("report_problem_share_type", rpt.report_problem_share_type),
+    ("report_bad_dims_pct", rpt.report_bad_dims_pct),
+    ("report_bad_weight_pct", rpt.report_bad_weight_pct),
+    ("report_top5_weight_extremes", rpt.report_top5_weight_extremes),
+]
+
+
+def parse_sizes(text: str) -> List[int]:
+    """'10k,1M' -> [10000, 1000000]"""
+    mult = {"k": 1_000, "m": 1_000_000}
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        if part[-1] in mult:
+            sizes.append(int(float(part[:-1]) * mult[part[-1]]))
+        else:
+            sizes.append(int(part))
+    return sizes
+
+
+def _max_rss_mb() -> float:
+    # Linux: KB, macOS: bajty
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def measure(fn: Callable[[], Any], memory: bool = True, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Najlepszy czas z `repeat` przebiegów (bez narzutu tracemalloc) i - osobnym
+    przebiegiem - szczyt alokacji Pythona/numpy. Pamięć spoza tracemalloc
+    (np. bufory Arrow) widać tylko w max_rss_mb procesu.
+    """
+    seconds = float("inf")
+    for _ in range(max(1, repeat)):
+        result = None
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        seconds = min(seconds, time.perf_counter() - t0)
+
+    out: Dict[str, Any] = {"seconds": round(seconds, 4)}
+    if memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = fn()
+            out["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024**2, 2)
+        finally:
+            tracemalloc.stop()
+    out["max_rss_mb"] = round(_max_rss_mb(), 1)
+    out["result"] = result
+    return out
+
+
+def _input_xlsx(rows: int, seed: int, data_dir: Path, raw: pd.DataFrame) -> Path:
+    path = data_dir / f"sorter_{rows}_s{seed}.xlsx"
+    if not path.exists():
+        print(f"  generuję {path} ...", flush=True)
+        write_sorter_xlsx(raw, path)
+    return path
+
+
+def bench_size(
+    rows: int, seed: int, data_dir: Path, memory: bool, skip_xlsx: bool, repeat: int = 1,
+) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+
+    def record(stage: str, m: Dict[str, Any]) -> Any:
+        result = m.pop("result")
+        out.append({"rows": rows, "stage": stage, **m})
+        extra = f"  peak={m['peak_mb']:.1f} MB" if "peak_mb" in m else ""
+        print(f"  {stage:<40} {m['seconds']:>9.3f} s{extra}", flush=True)
+        return result
+
+    raw = make_sorter_frame(rows, seed=seed)
+
+    if not skip_xlsx and rows < EXCEL_MAX_ROWS:
+        path = _input_xlsx(rows, seed, data_dir, raw)
+        record("read_xlsx", measure(lambda: read_xlsx_columns(path), memory, repeat))
+
+    loaded = record("normalize", measure(lambda: normalize_frame(raw.copy()), memory, repeat))
+    del raw
+    df = loaded.df
+
+    for name, fn in REPORTS:
+        record(name, measure(lambda fn=fn: fn(df), memory, repeat))
+
+    def _all_sheets() -> Dict[str, Any]:
+        return registry.evaluate(df, registry.SHEET_ORDER + ["efficiency"], mode="serial")
+
+    results = record("registry.evaluate (wszystkie arkusze)", measure(_all_sheets, memory, repeat))
+    summary = results.pop("efficiency")
+
+    def _export() -> int:
+        buf = io.BytesIO()
+        write_report_xlsx(
+            buf,
+            results,
+            sheet_order=registry.SHEET_ORDER,
+            descriptions=registry.sheet_descriptions(),
+            package_type_share_summary=summary,
+        )
+        return buf.tell()
+
+    record("export_xlsx", measure(_export, memory, repeat))
+    return out
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _meta(args) -> Dict[str, Any]:
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "memory": not args.no_memory,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path) -> None:
+    base = json.loads(baseline_path.read_text(encoding="utf-8"))
+    before = {(r["rows"], r["stage"]): r for r in base["results"]}
+    print(f"\nPorównanie z {baseline_path} (commit {base['meta'].get('commit')}):")
+    for r in results:
+        b = before.get((r["rows"], r["stage"]))
+        if b is None or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "  <-- wolniej" if ratio > 1.2 else ""
+        print(f"  {r['rows']:>9,} {r['stage']:<40} {b['seconds']:>9.3f} -> {r['seconds']:>9.3f} s  x{ratio:.2f}{flag}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help=f"liczby wierszy (domyślnie {DEFAULT_SIZES})")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "analizator_box_bench")
+    ap.add_argument("--out", type=Path, default=None, help="plik JSON z wynikami")
+    ap.add_argument("--baseline", type=Path, default=None, help="wcześniejszy JSON do porównania")
+    ap.add_argument("--repeat", type=int, default=1, help="najlepszy czas z N przebiegów")
+    ap.add_argument("--no-memory", action="store_true", help="bez pomiaru pamięci (jeden przebieg na etap)")
+    ap.add_argument("--skip-xlsx", action="store_true", help="bez odczytu XLSX (tylko dane w pamięci)")
+    args = ap.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for rows in parse_sizes(args.sizes):
+        print(f"\n{rows:,} wierszy", flush=True)
+        results += bench_size(rows, args.seed, args.data_dir, not args.no_memory, args.skip_xlsx, args.repeat)
+
+    meta = _meta(args)
+    out = args.out
+    if out is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = Path(__file__).resolve().parent / "results" / f"{stamp}_{meta['commit'] or 'nocommit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nWyniki: {out}")
+
+    if args.baseline is not None:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Porównanie parsowania kolumny Scan: dotychczasowe pd.to_datetime bez formatu + .dt.date
+vs processing.parse_scan + floor("D").
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/bench_scan_parsing.py --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from processing import parse_scan  # noqa: E402
+
+
+def make_scan_texts(rows: int, seed: int = 0) -> pd.Series:
+    """Tekstowe znaczniki czasu jak w eksporcie sortera (dzień pracy, rozdzielczość 1 s)."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01 06:00:00")
+    offsets = np.sort(rng.integers(0, 24 * 3600, rows))
+    scan = start + pd.to_timedelta(offsets, unit="s")
+    texts = pd.Series(scan.strftime("%Y-%m-%d %H:%M:%S"), dtype=object)
+    texts[rng.random(rows) < 0.001] = None
+    return texts
+
+
+def _old(raw: pd.Series) -> pd.Series:
+    scan = pd.to_datetime(raw, errors="coerce")
+    return scan.dt.date
+
+
+def _new(raw: pd.Series) -> pd.Series:
+    scan = parse_scan(raw)
+    return scan.dt.floor("D")
+
+
+def _timeit(fn, raw: pd.Series, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(raw)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    raw = make_scan_texts(args.rows)
+
+    # poprawność: te same dni
+    old_days = pd.to_datetime(_old(raw))
+    new_days = _new(raw)
+    if not old_days.equals(new_days.astype(old_days.dtype)):
+        raise SystemExit("Wyniki parsowania się różnią!")
+
+    t_old = _timeit(_old, raw, args.repeat)
+    t_new = _timeit(_new, raw, args.repeat)
+
+    print(f"wiersze:            {args.rows:,}")
+    print(f"to_datetime + date: {t_old:.3f} s")
+    print(f"parse_scan + floor: {t_new:.3f} s")
+    print(f"przyspieszenie:     {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Deterministyczny generator syntetycznych eksportów sortera (kolumny jak w processing.USED_COLUMNS).
+
+Ten sam `rows` + `seed` daje zawsze te same dane. Rozkłady są zbliżone do
+prawdziwych plików: kilkanaście typów opakowań (kilka dominujących), paczki
+wielotypowe "A;B", braki i zera w wymiarach/masie, zrzuty 99 Loop / Not Ok 244 /
+Overflow 243, logika "Chute Full <zsyp>" przy pełnych zsypach oraz paczki
+krążące na sorterze (ten sam Chunk Id kilka razy).
+
+Uruchomienie (z katalogu repozytorium):
+    python benchmarks/synthetic.py --rows 100000 -o dane_100k.xlsx
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Typy opakowań i ich udział (reszta to braki / paczki wielotypowe)
+PACKAGE_TYPES = [
+    "BOX S", "BOX M", "BOX L", "BOX XL", "FOLIA S", "FOLIA M", "FOLIA L",
+    "KOPERTA", "KOPERTA B", "TUBA", "WOREK", "PALETA MINI", "NIESTANDARD",
+]
+PACKAGE_WEIGHTS = np.array([22, 18, 10, 4, 12, 8, 4, 9, 4, 2, 4, 1, 2], dtype=float)
+
+# Typowe wymiary [mm] i masa [g] dla każdego typu (mediana)
+_TYPE_LENGTH = np.array([300, 400, 550, 750, 250, 350, 500, 230, 330, 600, 450, 800, 650], dtype=float)
+_TYPE_MASS = np.array([900, 1800, 4000, 9000, 300, 700, 1500, 150, 350, 1200, 2500, 15000, 6000], dtype=float)
+
+# Zsypy docelowe i zrzuty problemowe (udziały wierszy)
+CHUTES = 120
+LOOP_SHARE = 0.06
+NOK_SHARE = 0.02
+OVERFLOW_SHARE = 0.015
+MISSING_DISCHARGE_SHARE = 0.005
+
+# Paczki wielotypowe, braki i zera w pomiarach
+MULTI_TYPE_SHARE = 0.02
+MISSING_TYPE_SHARE = 0.03
+MISSING_DIMS_SHARE = 0.04
+ZERO_DIMS_SHARE = 0.02
+MISSING_MASS_SHARE = 0.03
+ZERO_MASS_SHARE = 0.02
+
+# Udział wierszy będących kolejnym przejazdem tej samej paczki
+RECIRCULATION_SHARE = 0.08
+
+# Pozostałe wartości kolumny Logic
+_LOGIC_OTHER = np.array(["Sorted", "No Read", "No Destination", "Dimension Error"], dtype=object)
+_LOGIC_OTHER_P = np.array([0.93, 0.04, 0.02, 0.01])
+
+
+def make_sorter_frame(
+    rows: int,
+    seed: int = 0,
+    start: str = "2025-01-01 06:00:00",
+    hours: float = 24.0,
+) -> pd.DataFrame:
+    """Surowa ramka jak z arkusza eksportu sortera (przed processing.normalize_frame)."""
+    rng = np.random.default_rng(seed)
+    n = int(rows)
+
+    # Scan: posortowane znaczniki czasu w oknie `hours`, rzadkie braki
+    offsets = np.sort(rng.integers(0, int(hours * 3600), n))
+    scan = pd.Timestamp(start) + pd.to_timedelta(offsets, unit="s")
+    scan = pd.Series(scan).where(rng.random(n) >= 0.001)
+
+    # Typy opakowań
+    type_idx = rng.choice(len(PACKAGE_TYPES), size=n, p=PACKAGE_WEIGHTS / PACKAGE_WEIGHTS.sum())
+    types = np.array(PACKAGE_TYPES, dtype=object)[type_idx]
+    multi = rng.random(n) < MULTI_TYPE_SHARE
+    second = np.array(PACKAGE_TYPES, dtype=object)[rng.integers(0, len(PACKAGE_TYPES), int(multi.sum()))]
+    types[multi] = types[multi] + ";" + second
+    types[rng.random(n) < MISSING_TYPE_SHARE] = None
+
+    # Wymiary [mm] i masa [g]: rozkład log-normalny wokół typowych wartości typu
+    length = _TYPE_LENGTH[type_idx] * rng.lognormal(0.0, 0.25, n)
+    width = length * rng.uniform(0.45, 0.9, n)
+    height = length * rng.uniform(0.1, 0.6, n)
+    mass = _TYPE_MASS[type_idx] * rng.lognormal(0.0, 0.5, n)
+
+    for values in (length, width, height):
+        values[rng.random(n) < ZERO_DIMS_SHARE] = 0.0
+    dims_missing = rng.random(n) < MISSING_DIMS_SHARE
+    length[dims_missing] = np.nan
+    width[dims_missing] = np.nan
+    height[dims_missing] = np.nan
+    mass[rng.random(n) < ZERO_MASS_SHARE] = 0.0
+    mass[rng.random(n) < MISSING_MASS_SHARE] = np.nan
+
+    # Discharge: zsyp docelowy albo zrzut problemowy
+    chute = rng.integers(1, CHUTES + 1, n)
+    discharge = chute.astype(str).astype(object)
+    u = rng.random(n)
+    is_loop = u < LOOP_SHARE
+    is_nok = (u >= LOOP_SHARE) & (u < LOOP_SHARE + NOK_SHARE)
+    is_ovf = (u >= LOOP_SHARE + NOK_SHARE) & (u < LOOP_SHARE + NOK_SHARE + OVERFLOW_SHARE)
+    discharge[is_loop] = "99 Loop"
+    discharge[is_nok] = "Not Ok 244"
+    discharge[is_ovf] = "Overflow 243"
+    discharge[rng.random(n) < MISSING_DISCHARGE_SHARE] = None
+
+    # Chunk Id: unikalny numer, ale część wierszy to kolejny przejazd wcześniejszej paczki
+    chunk = 7_000_000 + np.arange(n, dtype=np.int64)
+    again = np.flatnonzero(rng.random(n) < RECIRCULATION_SHARE)
+    earlier = np.maximum(again - rng.integers(1, 500, again.size), 0)
+    chunk[again] = chunk[earlier]
+    # poprzedni przejazd zwykle kończy się pętlą
+    went_round = earlier[rng.random(earlier.size) < 0.7]
+    discharge[went_round] = "99 Loop"
+    is_loop[went_round] = True
+
+    # Logic: pełny zsyp przy pętli/przepełnieniu, reszta losowo
+    logic = _LOGIC_OTHER[rng.choice(len(_LOGIC_OTHER), size=n, p=_LOGIC_OTHER_P)]
+    full = (is_loop & (rng.random(n) < 0.6)) | is_ovf
+    logic[full] = "Chute Full " + chute[full].astype(str).astype(object)
+
+    return pd.DataFrame({
+        "Scan": scan,
+        "Length": np.round(length),
+        "Width": np.round(width),
+        "Height": np.round(height),
+        "Volume": np.round(mass),
+        "Discharge": discharge,
+        "Logic": logic,
+        "Chunk Id": chunk,
+        "Package type Barcodes": types,
+    })
+
+
+def write_sorter_xlsx(df: pd.DataFrame, path: Path) -> None:
+    """Zapis ramki jako XLSX (jeden arkusz); xlsxwriter w trybie stałej pamięci, jeśli jest."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        df.to_excel(path, index=False)
+        return
+    import xlsxwriter
+
+    # constant_memory wymaga zapisu wiersz po wierszu - df.to_excel pisze kolumnami
+    # i w tym trybie gubi komórki, więc wiersze zapisujemy sami
+    wb = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    try:
+        ws = wb.add_worksheet()
+        date_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        columns = []
+        for c, name in enumerate(df.columns):
+            s = df[name]
+            if pd.api.types.is_datetime64_any_dtype(s):
+                ws.set_column(c, c, 19, date_fmt)
+                values = [None if pd.isna(v) else v for v in s.dt.to_pydatetime()]
+            else:
+                # braki jako puste komórki (None), nie NaN
+                values = s.astype(object).where(s.notna(), None).tolist()
+            columns.append(values)
+        ws.write_row(0, 0, list(df.columns))
+        for r, row in enumerate(zip(*columns), start=1):
+            ws.write_row(r, 0, row)
+    finally:
+        wb.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--out", type=Path, required=True)
+    args = ap.parse_args()
+
+    write_sorter_xlsx(make_sorter_frame(args.rows, seed=args.seed), args.out)
+    print(f"{args.out}: {args.rows:,} wierszy")
+
+
+if __name__ == "__main__":
+    main()
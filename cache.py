@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+import reports as rpt
+from processing import PARSE_VERSION, LoadedData, XlsxSource, load_xlsx
+
+
+# Domyślny katalog i limit rozmiaru cache (można nadpisać zmiennymi środowiskowymi)
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("BOX_CACHE_DIR", Path(tempfile.gettempdir()) / "analizator_box_cache")
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("BOX_CACHE_MAX_BYTES", 2 * 1024**3))
+
+
+def file_hash(data: bytes) -> str:
+    """Klucz cache: SHA-256 zawartości wgranego pliku."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ParsedCache:
+    """
+    Cache na dysku dla znormalizowanego LoadedData.df (po load_xlsx)
+    i kostki agregatów (reports.build_cube) tego samego pliku.
+
+    - klucz: hash bajtów pliku + PARSE_VERSION (wersja w nazwie pliku); kostka dodatkowo
+      z reports.CUBE_VERSION - zmiana logiki kostki nie unieważnia sparsowanych danych
+    - format: Feather/Arrow IPC bez kompresji (czytany przez memory-map) + typy kolumn
+      obok (plik .dtypes, Arrow nie odtwarza ich 1:1), a gdy brak pyarrow - pickle
+    - limit rozmiaru z usuwaniem najdawniej używanych wpisów (LRU po mtime)
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.suffix = ".feather" if _has_pyarrow() else ".pkl"
+
+    def _path(self, digest: str, kind: str = "") -> Path:
+        return self.cache_dir / f"{digest}{kind}-v{PARSE_VERSION}{self.suffix}"
+
+    def _read(self, path: Path) -> Optional[pd.DataFrame]:
+        if not path.exists():
+            return None
+
+        try:
+            if self.suffix == ".feather":
+                import pyarrow.feather as feather
+
+                df = feather.read_table(path, memory_map=True).to_pandas()
+                df = _restore_dtypes(df, pd.read_pickle(_dtypes_path(path)))
+            else:
+                df = pd.read_pickle(path)
+        except Exception:
+            # uszkodzony wpis (albo bez pliku typów) - traktujemy jak brak
+            _remove(path)
+            return None
+
+        # LRU: odświeżamy czas użycia
+        os.utime(path)
+        return df
+
+    def _write(self, path: Path, df: pd.DataFrame) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # zapis do pliku tymczasowego + atomowa podmiana (równoległe sesje)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            if self.suffix == ".feather":
+                df.reset_index(drop=True).to_feather(tmp, compression="uncompressed")
+                # typy przed danymi: wpis bez pliku typów jest odrzucany przy odczycie
+                pd.to_pickle(df.dtypes.to_dict(), tmp + ".dtypes")
+                os.replace(tmp + ".dtypes", _dtypes_path(path))
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, path)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+            Path(tmp + ".dtypes").unlink(missing_ok=True)
+
+        self.evict()
+
+    def get(self, digest: str) -> Optional[LoadedData]:
+        df = self._read(self._path(digest))
+        return None if df is None else _to_loaded(df)
+
+    def put(self, digest: str, loaded: LoadedData) -> None:
+        self._write(self._path(digest), loaded.df)
+
+    def get_cube(self, digest: str) -> Optional[pd.DataFrame]:
+        return self._read(self._path(digest, _CUBE_KIND))
+
+    def put_cube(self, digest: str, cube: pd.DataFrame) -> None:
+        self._write(self._path(digest, _CUBE_KIND), cube)
+
+    def evict(self) -> None:
+        """Usuwa wpisy z innej wersji formatu (lub kostki) oraz najstarsze ponad limit rozmiaru."""
+        if not self.cache_dir.exists():
+            return
+
+        current = f"-v{PARSE_VERSION}{self.suffix}"
+        entries = []
+        for p in self.cache_dir.iterdir():
+            if p.suffix not in (".feather", ".pkl"):
+                continue
+            if not p.name.endswith(current) or ("-cube" in p.name and _CUBE_KIND + "-" not in p.name):
+                _remove(p)
+                continue
+            st = p.stat()
+            entries.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(p)
+            total -= size
+
+        # pliki typów bez danych (np. przerwany zapis)
+        for p in self.cache_dir.glob("*.dtypes"):
+            if not p.with_suffix("").exists():
+                p.unlink(missing_ok=True)
+
+
+_CUBE_KIND = f"-cube{rpt.CUBE_VERSION}"
+
+
+def _dtypes_path(path: Path) -> Path:
+    return path.with_name(path.name + ".dtypes")
+
+
+def _remove(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    _dtypes_path(path).unlink(missing_ok=True)
+
+
+def _restore_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Typy kolumn jak przed zapisem (np. kategorie tekstowe: słownik "string", braki pd.NA)."""
+    for col, dtype in dtypes.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _to_loaded(df: pd.DataFrame) -> LoadedData:
+    min_scan = df["Scan"].min()
+    max_scan = df["Scan"].max()
+    return LoadedData(
+        df=df,
+        min_scan=None if pd.isna(min_scan) else min_scan,
+        max_scan=None if pd.isna(max_scan) else max_scan,
+    )
+
+
+def load_xlsx_cached(
+    data: bytes,
+    source: Optional[XlsxSource] = None,
+    cache: Optional[ParsedCache] = None,
+    digest: Optional[str] = None,
+) -> LoadedData:
+    """
+    load_xlsx z cache: `data` to bajty pliku (do klucza). Przy braku wpisu w cache
+    parsowane jest `source` (ten sam plik jako ścieżka/bufor), a domyślnie same `data`.
+    `digest` - gotowy file_hash(data), jeśli znany.
+    """
+    cache = cache if cache is not None else ParsedCache()
+    digest = digest if digest is not None else file_hash(data)
+
+    loaded = cache.get(digest)
+    if loaded is not None:
+        return loaded
+
+    loaded = load_xlsx(data if source is None else source)
+    try:
+        cache.put(digest, loaded)
+    except Exception:
+        # brak miejsca / uprawnień / nietypowe typy w kolumnach - raport i tak liczymy
+        pass
+    return loaded
+
+
+def cube_cached(
+    loaded: LoadedData,
+    digest: str,
+    cache: Optional[ParsedCache] = None,
+) -> pd.DataFrame:
+    """
+    Kostka agregatów (reports.build_cube) dla pliku o hashu `digest`: z cache,
+    a przy braku wpisu liczona z loaded.df i zapisywana. Wycinki (reports.slice_cube)
+    i arkusze z kostki (registry.evaluate_cube) nie czytają już wierszy.
+    """
+    cache = cache if cache is not None else ParsedCache()
+    cube = cache.get_cube(digest)
+    if cube is not None:
+        return cube
+
+    cube = rpt.build_cube(loaded.df)
+    try:
+        cache.put_cube(digest, cube)
+    except Exception:
+        pass
+    return cube
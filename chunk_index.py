@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from processing import MISSING_LABELS
+
+
+# Indeks Chunk Id -> wiersze LoadedData.df (układ CSR): numery wierszy posortowane po kodzie
+# kategorii Chunk Id + przesunięcia początków. Historia paczki to jeden wycinek tablicy,
+# a liczba przejazdów każdej paczki to różnica przesunięć - bez groupby po całej ramce.
+
+CHUNK_COL = "Chunk Id"
+
+# Kolumny historii paczki (te, które są w danych)
+HISTORY_COLUMNS = [
+    "Scan", "Discharge", "Logic", "Package type Barcodes",
+    "Length", "Width", "Height", "Volume",
+]
+
+
+class ChunkIndex:
+    """
+    Budowany raz przy wczytaniu pliku (jedno stabilne sortowanie kodów).
+    history(chunk) - wszystkie wiersze paczki, top_recirculating(k) - paczki z największą
+    liczbą przejazdów. Wiersze bez Chunk Id (etykieta braku) nie są indeksowane.
+    """
+
+    def __init__(self, df: pd.DataFrame, column: str = CHUNK_COL):
+        s = df[column]
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        self.df = df
+        self.categories = s.cat.categories
+
+        codes = s.cat.codes.to_numpy().astype(np.int64)
+        n = len(self.categories)
+        # braki (kod -1) i etykieta braku na koniec - poza zakresem wyszukiwania
+        missing = self.categories.get_indexer([MISSING_LABELS.get(column)])[0]
+        codes[(codes < 0) | (codes == missing)] = n
+
+        # stabilnie: wiersze jednej paczki w kolejności pliku
+        self.rows = np.argsort(codes, kind="stable")
+        self.counts = np.bincount(codes, minlength=n + 1)[:n]
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def __len__(self) -> int:
+        return int((self.counts > 0).sum())
+
+    def positions(self, chunk: str) -> np.ndarray:
+        """Numery wierszy (pozycje w df) paczki; pusta tablica, jeśli jej nie ma."""
+        code = self.categories.get_indexer([str(chunk).strip()])[0]
+        if code < 0:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def history(self, chunk: str, columns: Sequence[str] = HISTORY_COLUMNS) -> pd.DataFrame:
+        """Wszystkie wiersze paczki (skany, zrzuty, Logic, wymiary) posortowane po Scan."""
+        cols = [c for c in columns if c in self.df.columns]
+        out = self.df.iloc[self.positions(chunk)][cols]
+        if "Scan" in out.columns:
+            out = out.sort_values("Scan", kind="stable")
+        return out.reset_index(drop=True)
+
+    def top_recirculating(self, k: int = 20, loop_discharge: Optional[str] = "99 Loop") -> pd.DataFrame:
+        """
+        k paczek z największą liczbą przejazdów (wierszy) - wybór przez argpartition
+        na licznikach z indeksu. Szczegóły (liczba loop, pierwszy/ostatni skan, typ)
+        liczone tylko dla tych k paczek. Przy równej liczbie przejazdów - kolejność Chunk Id.
+        """
+        k = min(int(k), int((self.counts > 0).sum()))
+        if k <= 0:
+            return pd.DataFrame(columns=["chunk", "passes", "loop_count", "first_scan", "last_scan", "package_type"])
+        # próg = k-ta największa liczba przejazdów (argpartition, bez pełnego sortowania);
+        # z paczek na progu bierzemy te o najmniejszym kodzie - wynik deterministyczny
+        threshold = -np.partition(-self.counts, k - 1)[k - 1]
+        above = np.flatnonzero(self.counts > threshold)
+        at = np.flatnonzero(self.counts == threshold)[: k - len(above)]
+        top = np.concatenate([above, at])
+        top = top[np.lexsort((top, -self.counts[top]))]
+
+        records = []
+        for code in top:
+            rows = self.rows[self.offsets[code]:self.offsets[code + 1]]
+            part = self.df.iloc[rows]
+            records.append({
+                "chunk": self.categories[code],
+                "passes": int(self.counts[code]),
+                "loop_count": int((part["Discharge"] == loop_discharge).sum()) if "Discharge" in part else 0,
+                "first_scan": part["Scan"].min() if "Scan" in part else pd.NaT,
+                "last_scan": part["Scan"].max() if "Scan" in part else pd.NaT,
+                "package_type": part["Package type Barcodes"].iloc[-1] if "Package type Barcodes" in part else None,
+            })
+        return pd.DataFrame(records)
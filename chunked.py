@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+import registry
+import reports as rpt
+from processing import CHUNK_ROWS, USED_COLUMNS, XlsxSource, iter_xlsx_chunks, normalize_frame
+
+
+# Tryb kawałkowy (out-of-core): plik czytany partiami wierszy, każdy raport trzyma
+# sumowalne liczniki częściowe, łączone na końcu. Pamięć zależy od wielkości partii
+# i liczby grup w wynikach (np. wierszy arkuszy loop_99/nok_244/overflow_243),
+# a nie od liczby wierszy pliku. Wyniki są takie same jak przy liczeniu na całej ramce.
+
+# Co ile partii scalamy zebrane liczniki częściowe
+COMPACT_EVERY = 16
+
+# Węzły rejestru czytające wiersze danych - liczone tu z liczników częściowych
+CHUNKED_NODES = (
+    "cube", "slots", "extreme_candidates",
+    "loop_99", "nok_244", "overflow_243",
+    "chute_full", "chute_hours", "hist", "summary",
+)
+
+_DETAIL_SHEETS = {"loop_99": "99 Loop", "nok_244": "Not Ok 244", "overflow_243": "Overflow 243"}
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Kolumny category -> zwykłe wartości (słowniki kategorii różnią się między partiami)."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not cats:
+        return df
+    return df.astype({c: object for c in cats})
+
+
+class _Counts:
+    """
+    Liczniki częściowe (kolumny kluczy + kolumny do zsumowania) z kolejnych partii.
+    Co COMPACT_EVERY partii scalane sumą po kluczach - pamięć ~ liczba grup.
+    """
+
+    def __init__(self, keys: Sequence[str], compact_every: int = COMPACT_EVERY):
+        self.keys = list(keys)
+        self.compact_every = compact_every
+        self.parts: List[pd.DataFrame] = []
+        self.empty: Optional[pd.DataFrame] = None
+
+    def add(self, part: pd.DataFrame) -> None:
+        part = _plain(part)
+        if part.empty:
+            # zachowujemy schemat kolumn na wypadek, gdyby żadna partia nic nie dała
+            if self.empty is None:
+                self.empty = part
+            return
+        self.parts.append(part)
+        if len(self.parts) >= self.compact_every:
+            self.parts = [self._merge()]
+
+    def extend(self, other: "_Counts") -> None:
+        """Dołącza liczniki z innego akumulatora (np. policzone dla innego pliku)."""
+        if other.empty is not None and self.empty is None:
+            self.empty = other.empty
+        for part in other.parts:
+            self.add(part)
+
+    def _merge(self) -> pd.DataFrame:
+        if len(self.parts) == 1:
+            return self.parts[0]
+        merged = pd.concat(self.parts, ignore_index=True)
+        return merged.groupby(self.keys, dropna=False, sort=False).sum().reset_index()
+
+    def result(self) -> pd.DataFrame:
+        """Zsumowane liczniki posortowane po kluczach (jak groupby na całej ramce)."""
+        if not self.parts:
+            return self.empty.reset_index(drop=True) if self.empty is not None else pd.DataFrame(columns=self.keys)
+        merged = pd.concat(self.parts, ignore_index=True)
+        return merged.groupby(self.keys, dropna=False, sort=True).sum().reset_index()
+
+
+class ChunkedReport:
+    """
+    Zbiera liczniki częściowe z kolejnych znormalizowanych partii (processing.normalize_frame)
+    i na końcu liczy wszystkie arkusze przez rejestr (result).
+    """
+
+    def __init__(self, compact_every: int = COMPACT_EVERY, params: Optional[Dict[str, Any]] = None):
+        self.rows = 0
+        self.total_mass_g = 0.0
+        self.min_scan = None
+        self.max_scan = None
+
+        self.cube = _Counts(rpt.CUBE_KEYS, compact_every)
+        self.slots = _Counts(["scan_slot", "Package type Barcodes"], compact_every)
+        self.details = {name: _Counts(rpt.DETAIL_KEYS, compact_every) for name in _DETAIL_SHEETS}
+        self.chute_full = _Counts(["Discharge", "Logic"], compact_every)
+        self.chute_hours = _Counts(rpt.CHUTE_HOUR_KEYS + ["chute"], compact_every)
+        self.hist = _Counts(rpt.HIST_KEYS + ["measure", "bin"], compact_every)
+        # kandydaci skrajnych wartości (po k na typ, miarę i kierunek z każdej partii)
+        # z numerem wiersza pliku; k z parametrów raportu
+        self.k = registry.extreme_k(params)
+        self.compact_every = compact_every
+        self.extremes: List[pd.DataFrame] = []
+
+    def add(self, df: pd.DataFrame) -> None:
+        offset = self.rows
+        self.rows += len(df)
+
+        vol = pd.to_numeric(df.get("Volume"), errors="coerce")
+        if vol is not None:
+            self.total_mass_g += float(vol[vol > 0].sum())
+
+        for value in (df["Scan"].min(), df["Scan"].max()):
+            if pd.isna(value):
+                continue
+            if self.min_scan is None or value < self.min_scan:
+                self.min_scan = value
+            if self.max_scan is None or value > self.max_scan:
+                self.max_scan = value
+
+        # kostka (godzina x typ x discharge) - z niej by_type i problem_share_type,
+        # przedziały 15 min - z nich arkusze czasowe
+        flags = rpt.compute_row_flags(df)
+        self.cube.add(rpt.build_cube(df, flags=flags))
+        self.slots.add(rpt.build_slots(df, flags=flags))
+        del flags
+
+        # jeden filtr i jeden groupby dla trzech arkuszy szczegółów i chute_full
+        problems = rpt.problem_subset(df)
+        details = rpt.discharge_detail_counts_all(problems)
+        for name, discharge in _DETAIL_SHEETS.items():
+            self.details[name].add(details[discharge])
+        self.chute_full.add(rpt.chute_full_counts(df, problems=problems))
+        self.chute_hours.add(rpt.chute_hour_counts(df))
+        self.hist.add(rpt.build_hist(df))
+
+        self.extremes.append(_plain(rpt.extreme_candidates(df, k=self.k, row_offset=offset)))
+        if len(self.extremes) >= self.compact_every:
+            self.extremes = [self._candidates()]
+
+    def merge(self, other: "ChunkedReport") -> None:
+        """
+        Dołącza liczniki policzone osobno dla dalszej części danych (np. kolejnego pliku,
+        w innym procesie). Wynik jak przy add() wszystkich partii po kolei.
+        """
+        offset = self.rows
+        self.rows += other.rows
+        self.total_mass_g += other.total_mass_g
+        for value in (other.min_scan, other.max_scan):
+            if value is None:
+                continue
+            if self.min_scan is None or value < self.min_scan:
+                self.min_scan = value
+            if self.max_scan is None or value > self.max_scan:
+                self.max_scan = value
+
+        self.cube.extend(other.cube)
+        self.slots.extend(other.slots)
+        for name, counts in other.details.items():
+            self.details[name].extend(counts)
+        self.chute_full.extend(other.chute_full)
+        self.chute_hours.extend(other.chute_hours)
+        self.hist.extend(other.hist)
+        # numery wierszy drugiej części - za wierszami tej
+        cand = other._candidates()
+        self.extremes.append(cand.assign(_row=cand["_row"] + offset))
+        if len(self.extremes) >= self.compact_every:
+            self.extremes = [self._candidates()]
+
+    def _candidates(self) -> pd.DataFrame:
+        """
+        Zebrani kandydaci w kolejności wierszy pliku, ponownie przycięci do k na typ
+        (jak extreme_candidates na całej ramce) - pamięć ~ liczba typów, nie partii.
+        """
+        parts = [c for c in self.extremes if not c.empty]
+        if not parts:
+            return pd.DataFrame(columns=rpt.EXTREME_COLUMNS + ["_row"])
+        cand = pd.concat(parts, ignore_index=True).sort_values("_row", kind="stable").reset_index(drop=True)
+        return rpt.extreme_candidates(cand, k=self.k)
+
+    def node_values(self) -> Dict[str, Any]:
+        """Wyniki węzłów rejestru czytających dane (CHUNKED_NODES) z zebranych liczników."""
+        values: Dict[str, Any] = {
+            "cube": self.cube.result().sort_values("scan_hour", kind="stable").reset_index(drop=True),
+            "slots": self.slots.result(),
+            "extreme_candidates": self._candidates(),
+            "chute_full": rpt.chute_full_from_counts(self.chute_full.result()),
+            "chute_hours": self.chute_hours.result(),
+            "hist": self.hist.result(),
+        }
+        for name, counts in self.details.items():
+            values[name] = rpt.discharge_detail_from_counts(counts.result())
+        return values
+
+    def result(self, names: Optional[Iterable[str]] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Jak registry.evaluate(df, names, params), ale z zebranych liczników (bez ramki)."""
+        return registry.evaluate_parts(
+            self.node_values(), self.rows, self.total_mass_g, self.min_scan, self.max_scan,
+            names=names, params=params,
+        )
+
+
+def iter_normalized_chunks(
+    source: XlsxSource,
+    chunk_rows: int = CHUNK_ROWS,
+    columns: Optional[Sequence[str]] = USED_COLUMNS,
+) -> Iterator[pd.DataFrame]:
+    """Partie wierszy z pliku (openpyxl, strumieniowo) po normalizacji jak w load_xlsx."""
+    for chunk in iter_xlsx_chunks(source, columns=columns, chunk_rows=chunk_rows):
+        yield normalize_frame(chunk).df
+
+
+def report_chunked(
+    source: XlsxSource,
+    names: Optional[Iterable[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> tuple[Dict[str, Any], ChunkedReport]:
+    """Wszystkie arkusze (jak registry.evaluate) bez trzymania całego pliku w pamięci."""
+    acc = ChunkedReport(params=params)
+    for df in iter_normalized_chunks(source, chunk_rows=chunk_rows):
+        acc.add(df)
+    return acc.result(names, params), acc
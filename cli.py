@@ -0,0 +1,165 @@
+"""
+Raporty BOX bez przeglądarki: wiele plików naraz, równolegle w puli procesów.
+
+Przykłady:
+    python cli.py dane/*.xlsx -o raporty
+    python cli.py dane/ --workers 4 --min-total 100
+    python cli.py "dane/**/sorter_*.xlsx"
+    python cli.py duzy_plik.xlsx --chunked --chunk-rows 100000
+    python cli.py dane/ --granularity shift --shifts 06:00,18:00
+    python cli.py tydzien/*.xlsx --merge
+    python cli.py dane/ --top-k 20 --top-k-type 5
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, List
+
+import registry
+import reports as rpt
+from processing import CHUNK_ROWS
+from pipeline import FileResult, run_file, run_files_merged
+from scheduler import default_workers
+
+
+def collect_files(inputs: Iterable[str]) -> List[str]:
+    """Pliki, katalogi (wszystkie *.xlsx) i wzorce glob -> lista plików bez powtórzeń."""
+    files: List[str] = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            found = sorted(str(f) for f in p.glob("*.xlsx"))
+        elif p.is_file():
+            found = [str(p)]
+        else:
+            found = sorted(glob.glob(item, recursive=True))
+        for f in found:
+            # pliki blokady Excela (~$nazwa.xlsx)
+            if Path(f).name.startswith("~$"):
+                continue
+            if f not in files:
+                files.append(f)
+    return files
+
+
+def _format_line(r: FileResult) -> str:
+    t = r.timings
+    if not r.ok:
+        return f"BŁĄD  {r.source}  ({t.get('total', 0):.1f} s)  {r.error}"
+    dups = f"  duplikaty={r.duplicates:,}" if r.duplicates else ""
+    return (
+        f"OK    {r.source}  wiersze={r.rows:,}{dups}  "
+        f"wczytanie={t['load']:.2f} s  raporty={t['reports']:.2f} s  "
+        f"zapis={t['export']:.2f} s  razem={t['total']:.2f} s  -> {r.output}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Analizator BOX - raporty XLSX w trybie wsadowym")
+    parser.add_argument("inputs", nargs="+", help="pliki XLSX, katalogi lub wzorce glob")
+    parser.add_argument("-o", "--out-dir", default="raporty", help="katalog raportów (domyślnie: raporty)")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument("--min-total", type=int, default=registry.DEFAULT_PARAMS["min_total"])
+    parser.add_argument("--base-efficiency", type=float, default=registry.DEFAULT_PARAMS["base_efficiency"])
+    parser.add_argument("--base-avg-length", type=float, default=registry.DEFAULT_PARAMS["base_avg_length"])
+    parser.add_argument("--engine", choices=("auto", "xlsxwriter", "openpyxl"), default="auto")
+    parser.add_argument("--no-cache", action="store_true", help="nie używaj cache wczytanych plików")
+    parser.add_argument("--perf-sheet", action="store_true", help="dopisz arkusz _perf z pomiarami etapów")
+    parser.add_argument("--perf-log", default=None, help="plik, do którego dopisywane są linie JSON z pomiarami")
+    parser.add_argument(
+        "--chunked", action="store_true",
+        help="czytaj plik partiami wierszy (pamięć ograniczona wielkością partii, bez cache)",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"wierszy w partii (domyślnie {CHUNK_ROWS})")
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="jeden raport ze wszystkich plików (np. tydzień eksportów), duplikaty wierszy liczone raz",
+    )
+    parser.add_argument(
+        "--granularity", choices=tuple(rpt.TIME_COLUMNS), default=registry.DEFAULT_PARAMS["granularity"],
+        help="przedziały czasu w arkuszach godzinowych (domyślnie: hour)",
+    )
+    parser.add_argument(
+        "--shifts", default=registry.DEFAULT_PARAMS["shifts"],
+        help="początki zmian HH:MM po przecinku, co 15 min (dla --granularity shift)",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=registry.DEFAULT_PARAMS["top_k"],
+        help="ile skrajnych paczek ogółem (najcięższe/najlżejsze, wymiary)",
+    )
+    parser.add_argument(
+        "--top-k-type", type=int, default=registry.DEFAULT_PARAMS["top_k_type"],
+        help="ile skrajnych paczek w każdym typie opakowania (0 = bez arkusza extremes_by_type)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        rpt.parse_shifts(args.shifts)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.top_k < 1 or args.top_k_type < 0:
+        parser.error("--top-k musi być >= 1, --top-k-type >= 0")
+    if args.merge and args.chunked:
+        parser.error("--merge i --chunked nie działają razem")
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("Brak plików XLSX do przetworzenia.", file=sys.stderr)
+        return 2
+
+    params = {
+        "min_total": args.min_total,
+        "base_efficiency": args.base_efficiency,
+        "base_avg_length": args.base_avg_length,
+        "granularity": args.granularity,
+        "shifts": args.shifts,
+        "top_k": args.top_k,
+        "top_k_type": args.top_k_type,
+    }
+    workers = min(args.workers or default_workers(), len(files))
+    print(f"Plików: {len(files)}, procesów: {workers}")
+
+    perf_log = open(args.perf_log, "a", encoding="utf-8") if args.perf_log else None
+
+    def _done(r: FileResult) -> None:
+        print(_format_line(r), flush=True)
+        if perf_log is not None and r.perf_json:
+            perf_log.write(r.perf_json + "\n")
+            perf_log.flush()
+        results.append(r)
+
+    t0 = time.perf_counter()
+    results: List[FileResult] = []
+    run_args = (
+        args.out_dir, params, args.engine, not args.no_cache, args.perf_sheet, args.chunked, args.chunk_rows,
+    )
+    try:
+        if args.merge:
+            _done(run_files_merged(
+                files, args.out_dir, params, args.engine, not args.no_cache, args.perf_sheet, max_workers=workers,
+            ))
+        elif workers == 1:
+            for f in files:
+                _done(run_file(f, *run_args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_file, f, *run_args) for f in files]
+                for fut in as_completed(futures):
+                    _done(fut.result())
+    finally:
+        if perf_log is not None:
+            perf_log.close()
+
+    failed = sum(not r.ok for r in results)
+    rows = sum(r.rows for r in results)
+    done = f"raport łączony z {len(files)} plików" if args.merge else f"{len(results) - failed}/{len(results)} plików"
+    print(f"Gotowe: {done}, {rows:,} wierszy, {time.perf_counter() - t0:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+# Opisy (tekst + pozycja bloku)
+DESCRIPTIONS = {
+    "package_type_share": ("""Ta tabela przedstawia ilościowy i procentowy rozkład opakowań na instalacji wraz z ich wymiarami
+
+Opis kolumn:
+
+package_type - typ opakowania
+avg_lenght - średnia długość paczki danego typu w mm
+avg_width - średnia szerokość  paczki danego typu w mm
+avg_height - średnia wysokość  paczki danego typu w mm
+items_count_all - ile paczek danego typu wystąpiło na instalacji
+pct_share - procentowy rozkład opakowań
+
+Średnie liczone dla opakowań zmierzonych, dzięki czemu nieopomiarowane opakowanie nie zaniżają średniej. Ilości to wszystkie opakowania danego typu, w tym nieopomiarowane. To podejście zapewnia dużą precyzyjność danych
+
+Tabela posortowana według opakowań najczęściej występujących, mających największy udział w rozkładzie
+                           
+avg_len to średnia długość wszystkich paczek na instalacji (średnia ważona)
+predicted_eff to przewidywana wydajność sortera przy założeniu, że średnia długość paczek 400mm daje wydajność 8500 (zgodnie z dokumentacją)
+                           
+https://drive.google.com/file/d/1g8EU9LQgIKa3NrOvm24-8AwQVLDlzRYW/view?usp=sharing
+
+
+
+""", "I4", "O22"),
+    "hourly_dims_measured": ("""Ta tabela przedstawia średnie wymiary paczek w rozkładzie godzinowym oraz jakość pomiarów
+
+Opis kolumn:
+scan_hour - znacznik czasu (scan_15min / shift_start / scan_day przy innej ziarnistości)
+package_type - typ opakowania
+avg_lenght - średnia długość paczki danego typu w mm
+avg_width - średnia szerokość  paczki danego typu w mm
+avg_height - średnia wysokość  paczki danego typu w mm
+total_items - wszystkie paczki zarejestrowane na instalacji
+unmensured_items - ilość paczek niezmierzonych
+pct_unmeasured - procent paczek niezmierzonych
+
+Średnie liczone dla opakowań zmierzonych, dzięki czemu nieopomiarowane opakowanie nie zaniżają średniej. Niezwymiarowanych jest niewiele, dzięki czemu dane są obarczone niskim błędem
+
+
+""", "K4", "Q22"),
+    "loop_99": ("""Ta tabela przedstawia wszystkie paczki wysłane do loop i ile razy
+
+Opis kolumn:
+
+scan_date - znacznik czasu
+chunk - numer danej paczki zawarty na etykiecie wysyłkowej
+package_type - typ opakowania
+discharge - gdzie posortowano (loop)
+items_count- ile razy dana paczka trafiła do loop
+
+Jeśli dana paczka trafiła do loop więcej razy niż określa to system, wskazuje to na problem (np. krążenie paczek danego typu)
+
+Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
+
+""", "H3", "N18"),
+    "nok_244": ("""Ta tabela przedstawia wszystkie paczki posortowane do zrzutni nok 244 i ile razy
+
+Opis kolumn:
+
+scan_date - znacznik czasu
+chunk - numer danej paczki zawarty na etykiecie wysyłkowej
+package_type - typ opakowania
+discharge - gdzie posortowano (nok 244)
+items_count- ile razy dana paczka trafiła do nok 244
+
+Jeśli dana paczka trafiła wielokrotnie do nok, wskazuje to na problem
+
+Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
+
+""", "H4", "N19"),
+    "overflow_243": ("""Ta tabela przedstawia wszystkie paczki posortowane do zrzutni overflow i ile razy
+
+Opis kolumn:
+
+scan_date - znacznik czasu
+chunk - numer danej paczki zawarty na etykiecie wysyłkowej
+package_type - typ opakowania
+discharge - gdzie posortowano (overflow 243)
+items_count- ile razy dana paczka trafiła do overflow 243
+
+Jeśli dana paczka trafiła wielokrotnie do overflow, wskazuje to na problem
+                     
+Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
+
+""", "H4", "N19"),
+    "hourly_loop_nok_ovf": ("""Ta tabela przedstawia, ile paczek w każdej godzinie trafia do loop, overflow, nok w odniesieniu do wszystkich paczek zarejestrowanych na instalacji
+
+Opis kolumn:
+
+scan_hour - znacznik czasu (scan_15min / shift_start / scan_day przy innej ziarnistości)
+total_items - wszystkie rzeczy zarejestrowane na instalacji
+loop_99_count - ilość paczek posortowanych do loop
+overflow_243_count - ilość paczek posortowana do zrzutni overflow 243
+nok_count - ilość paczek posortowana do zrzutni nok 244
+
+""", "H4", "N19"),
+    "chute_full": ("""Ta tabela przedstawia, ile paczek z powodu chute full dana zrzutnia wysłała na loop lub - jeśli się zdarzy - do overflow i nok
+
+Opis kolumn:
+
+discharge - gdzie posortowano (loop, overflow, nok)
+logic - zawiera numer zrzutni i powód (chute full)
+items_count - ilość paczek
+                   
+""", "F4", "L19"),
+    "problem_share_type": ("""Ta tabela przedstawia, jaki typ opakowania ma najwięcej procent wysyłania do loop bądź overflow czy nok
+
+Opis kolumn:
+
+package_type - zawiera kod opakowania
+total_items - ilość paczek danego typu zarejestrowano na instalacji
+discharge - gdzie posortowano (loop, overflow, nok) 
+problem_items - ile paczek z danego typu posortowano do loop, overflow, nok
+pct_of_type - ile paczek z danego typu procentowo posortowano do loop, overflow, nok
+                           
+Tabela posortowana według kolumny pct_of_type malejąco. 
+
+""", "H4", "N19"),
+    "bad_dims_pct": ("""Ta tabela przedstawia jakość wymiarowania danych opakowań
+
+Opis kolumn:
+
+type - typ opakowania
+bad_meaasurements - ile razy paczki z danym typem opakowania nie było zwymiarowane
+total_items - ile razy dany typ opakowania wystąpił na instalacji
+pct_bad - ile procent opakowań danego typu nie jest wymiarowanych przez instalację
+
+""", "G3", "M18"),
+    "bad_weight_pct": ("""Ta tabela przedstawia jakość ważenia danych opakowań
+
+Opis kolumn:
+
+type - typ opakowania
+bad_weight - ile razy paczki z danym typem opakowania nie było zważone
+total_items - ile razy dany typ opakowania wystąpił na instalacji
+pct_bad_weight - ile procent opakowań danego typu nie jest ważonych przez instalację
+
+""", "G4", "M19"),
+
+    "hourly_weight_measured": ("""Ta tabela przedstawia średnią masę paczek (kolumna Volume (waga) - masa w gramach) oraz skuteczność ważenia w ujęciu godzinowym.
+avg_weight: średnia masa [g] 
+measured_items: liczba paczek z masą 
+unmeasured_items: niezważone paczki
+pct_unmeasured: % paczek bez poprawnej masy""", "I2", "N6"),
+
+    "top5_heaviest": ("""TOP K najcięższych paczek (K = parametr top_k, domyślnie 5).
+Kolumny:
+chunk - Chunk Id
+type - Package type Barcodes
+weight - masa [g]""", "I2", "N6"),
+
+    "top5_lightest": ("""TOP K najlżejszych paczek (K = parametr top_k, domyślnie 5).
+Kolumny:
+chunk - Chunk Id
+type - Package type Barcodes
+weight - masa [g]""", "I2", "N6"),
+
+    "dims_extremes": ("""Ta tabela przedstawia paczki o skrajnych wymiarach w całych danych (top/bottom K)
+
+Opis kolumn:
+
+measure - wymiar (length_mm, width_mm, height_mm)
+extreme - max (największe) albo min (najmniejsze)
+rank - miejsce w zestawieniu (1 = najbardziej skrajna)
+chunk - numer paczki
+type - typ opakowania
+value - wartość wymiaru w mm
+
+Pomijane są wymiary niezmierzone (brak lub 0). Przy równych wartościach wygrywa paczka zeskanowana wcześniej.
+""", "I2", "O16"),
+
+    "extremes_by_type": ("""Ta tabela przedstawia skrajne wartości masy i wymiarów w każdym typie opakowania
+
+Opis kolumn:
+
+package_type - typ opakowania
+measure - miara (weight_g, length_mm, width_mm, height_mm)
+extreme - max (największe) albo min (najmniejsze)
+rank - miejsce w typie (1 = najbardziej skrajna)
+chunk - numer paczki
+value - wartość (masa w g, wymiar w mm)
+
+Duży rozrzut min/max masy w jednym typie wskazuje na źle zważone paczki albo źle przypisany typ opakowania.
+""", "I2", "O16"),
+
+    "dist_by_type": ("""Ta tabela przedstawia rozkład masy i wymiarów paczek w każdym typie opakowania (percentyle)
+
+Opis kolumn:
+
+package_type - typ opakowania
+measure - miara (weight_g - masa w g, length_mm / width_mm / height_mm - wymiary w mm)
+measured_items - ile paczek danego typu ma zmierzoną daną miarę
+p5, p50, p95, p99 - percentyle: 5% / 50% (mediana) / 95% / 99% paczek ma wartość nie większą
+
+Percentyle liczone z histogramów o stałych przedziałach (masa co 50 g, wymiary co 10 mm) - dokładność do szerokości przedziału.
+Duża różnica między średnią a medianą albo szeroki rozstęp p5-p95 wskazuje na rozkład dwumodalny (np. rozkalibrowana waga lub głowica DWS).
+""", "J2", "P18"),
+
+    "dist_by_hour": ("""Ta tabela przedstawia rozkład masy i wymiarów wszystkich paczek w kolejnych godzinach (percentyle)
+
+Opis kolumn:
+
+scan_hour - godzina
+measure - miara (weight_g, length_mm, width_mm, height_mm)
+measured_items - ile paczek w tej godzinie ma zmierzoną daną miarę
+p5, p50, p95, p99 - percentyle wartości miary
+
+Nagła zmiana mediany lub p95 przy podobnym miksie paczek wskazuje na zmianę kalibracji wagi lub głowicy DWS.
+""", "J2", "P16"),
+
+    "hist_by_type": ("""Ta tabela przedstawia histogramy masy i wymiarów w każdym typie opakowania
+
+Opis kolumn:
+
+package_type - typ opakowania
+measure - miara (weight_g, length_mm, width_mm, height_mm)
+bin_from, bin_to - przedział wartości [od, do); ostatni przedział (bez bin_to) zbiera wartości powyżej zakresu
+items_count - ile paczek w przedziale
+pct_of_group - udział przedziału w paczkach danego typu i miary
+
+Pokazywane są tylko niepuste przedziały. Dwa wyraźne szczyty w jednym typie to sygnał do sprawdzenia pomiarów.
+""", "H2", "N16"),
+
+    "hist_by_hour": ("""Ta tabela przedstawia histogramy masy i wymiarów wszystkich paczek w kolejnych godzinach
+
+Opis kolumn:
+
+scan_hour - godzina
+measure - miara (weight_g, length_mm, width_mm, height_mm)
+bin_from, bin_to - przedział wartości [od, do); ostatni przedział (bez bin_to) zbiera wartości powyżej zakresu
+items_count - ile paczek w przedziale
+pct_of_group - udział przedziału w paczkach danej godziny i miary
+
+Przesunięcie całego histogramu między godzinami przy podobnym miksie paczek wskazuje na zmianę kalibracji.
+""", "H2", "N16"),
+
+    "daily_comparison": ("""Ta tabela porównuje kolejne doby (np. przy analizie kilku plików - tygodnia eksportów zmianowych)
+
+Opis kolumn:
+
+scan_date - doba
+total_items - wszystkie paczki zarejestrowane w danej dobie
+pct_of_total - udział doby w całym analizowanym okresie
+vs_avg_day_pct - o ile procent więcej (+) lub mniej (-) paczek niż w średniej dobie
+avg_length_mm / avg_weight_g - średnia długość i masa zmierzonych paczek
+pct_dims_unmeasured / pct_weight_unmeasured - procent paczek bez wymiarów / bez masy
+loop_99_count, nok_244_count, overflow_243_count - paczki w zrzutniach problemowych
+pct_loop_99, pct_nok_244, pct_overflow_243 - to samo w procentach wszystkich paczek doby
+
+Duplikaty wierszy z nakładających się plików są liczone raz.
+""", "Q2", "W20"),
+}
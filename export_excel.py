@@ -1,19 +1,30 @@
 from __future__ import annotations
 
+import os
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Tuple
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple, Union
 
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
 from openpyxl.styles import PatternFill, Alignment, Border, Side
 
 
-def _autosize(ws, df: pd.DataFrame, max_width: int = 60) -> None:
+_INT_FMT = "0"
+_FLOAT_FMT = "0.00"
+
+
+def _column_widths(df: pd.DataFrame, max_width: int = 60) -> list[float]:
     """
     Bezpieczne autosize: wartości mogą być float/NaN/datetime itd.
     Wszystko liczymy po str().
     """
-    for i, col in enumerate(df.columns, start=1):
+    widths = []
+    for col in df.columns:
         s = df[col]
 
         # bierzemy próbkę, zamieniamy na stringi (NaN -> "")
@@ -21,52 +32,55 @@ def _autosize(ws, df: pd.DataFrame, max_width: int = 60) -> None:
         lens = [len(str(col))] + [len(v) for v in sample.tolist()]
 
         w = max(lens) + 2
-        ws.column_dimensions[get_column_letter(i)].width = min(w, max_width)
+        widths.append(min(w, max_width))
+    return widths
 
 
-def _format_numbers(ws, df: pd.DataFrame) -> None:
-    int_fmt = "0"
-    float_fmt = "0.00"
+def _autosize(ws, df: pd.DataFrame, max_width: int = 60) -> None:
+    for i, w in enumerate(_column_widths(df, max_width=max_width), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+
 
+def _number_format(s: pd.Series) -> Optional[str]:
+    """Format liczbowy kolumny: całkowite "0", zmiennoprzecinkowe "0.00", reszta bez zmian."""
+    if pd.api.types.is_integer_dtype(s):
+        return _INT_FMT
+    if pd.api.types.is_float_dtype(s):
+        return _FLOAT_FMT
+    return None
+
+
+def _format_numbers(ws, df: pd.DataFrame) -> None:
+    """Ścieżka openpyxl (bez xlsxwriter): format trzeba nadać każdej komórce."""
     for col_idx, col_name in enumerate(df.columns, start=1):
-        s = df[col_name]
-        if pd.api.types.is_integer_dtype(s):
-            fmt = int_fmt
-        elif pd.api.types.is_float_dtype(s):
-            fmt = float_fmt
-        else:
+        fmt = _number_format(df[col_name])
+        if fmt is None:
             continue
 
-        for row_idx in range(2, len(df) + 2):
-            ws.cell(row=row_idx, column=col_idx).number_format = fmt
+        for (cell,) in ws.iter_rows(min_row=2, max_row=len(df) + 1, min_col=col_idx, max_col=col_idx):
+            cell.number_format = fmt
 
 
-def _force_comma_text_for_columns(ws, col_names: list[str], decimals: int = 2) -> None:
+def _comma_text_columns(df: pd.DataFrame, col_names: list[str], decimals: int = 2) -> pd.DataFrame:
     """
-    Zamienia wartości liczbowe w podanych kolumnach na TEKST z przecinkiem
-    i ustawia number_format="@" żeby Excel nie przerabiał z powrotem.
+    Zamienia wartości liczbowe w podanych kolumnach na TEKST z przecinkiem już w DataFrame
+    (przed zapisem), zamiast przepisywać komórki arkusza. Teksty typu "brak pomiaru" zostają.
     """
-    headers = {ws.cell(row=1, column=c).value: c for c in range(1, ws.max_column + 1)}
+    cols = [c for c in col_names if c in df.columns]
+    if not cols:
+        return df
 
-    for name in col_names:
-        col_idx = headers.get(name)
-        if not col_idx:
+    df = df.copy()
+    for col in cols:
+        s = df[col]
+        num = pd.to_numeric(s, errors="coerce")
+        is_num = num.notna() & s.map(lambda v: not isinstance(v, str))
+        if not is_num.any():
             continue
-
-        for r in range(2, ws.max_row + 1):
-            cell = ws.cell(row=r, column=col_idx)
-            v = cell.value
-
-            # zostaw teksty typu "brak pomiaru"
-            if v is None or isinstance(v, str):
-                continue
-
-            try:
-                s = f"{float(v):.{decimals}f}".replace(".", ",")
-                cell.value = s
-                cell.number_format = "@"  # tekst
-            except Exception:
-                pass
+        s = s.astype(object)
+        s[is_num] = num[is_num].map(lambda v: f"{v:.{decimals}f}".replace(".", ","))
+        df[col] = s
+    return df
 
 
 # --- opis (żółte tło) ---
@@ -101,26 +115,300 @@ def _add_description_block(
         ws.column_dimensions[chr(c)].width = col_width
 
 
+def _package_type_share_summary_cells(weighted_avg_len: float, predicted_efficiency: int) -> Dict[str, str]:
+    return {
+        "I1": f"avg_len: {weighted_avg_len:.2f}".replace(".", ","),
+        "I2": f"predicted_eff: {predicted_efficiency}",
+    }
+
+
 def _write_package_type_share_summary(ws, weighted_avg_len: float, predicted_efficiency: int) -> None:
-    ws["I1"].value = f"avg_len: {weighted_avg_len:.2f}".replace(".", ",")
-    ws["I2"].value = f"predicted_eff: {predicted_efficiency}"
+    for ref, value in _package_type_share_summary_cells(weighted_avg_len, predicted_efficiency).items():
+        ws[ref].value = value
+
+
+# Kolumny zapisywane jako tekst z przecinkiem (tylko arkusz package_type_share)
+_COMMA_TEXT_SHEET = "package_type_share"
+_COMMA_TEXT_COLS = ["avg_length", "avg_width", "avg_height"]
+
+# Arkusz heatmapy: skala kolorów na komórkach godzin (bez kolumny zsypu i total)
+_HEATMAP_SHEET = "chute_full_heatmap"
+_HEATMAP_COLORS = ("FFFFFF", "FFEB84", "F8696B")
+
+
+def _heatmap_range(df: pd.DataFrame) -> Optional[str]:
+    """Zakres komórek godzin heatmapy (np. B2:Y121) albo None, gdy brak danych."""
+    if len(df) == 0 or len(df.columns) < 3:
+        return None
+    return f"B2:{get_column_letter(len(df.columns) - 1)}{len(df) + 1}"
+
 
+def _heatmap_rule() -> ColorScaleRule:
+    low, mid, high = _HEATMAP_COLORS
+    return ColorScaleRule(
+        start_type="min", start_color=low, mid_type="percentile", mid_value=50, mid_color=mid,
+        end_type="max", end_color=high,
+    )
+
+
+def _has_xlsxwriter() -> bool:
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_sheet_openpyxl(writer, sheet: str, name: str, df: pd.DataFrame, summary, description) -> None:
+    df.to_excel(writer, sheet_name=sheet, index=False)
+
+    ws = writer.book[sheet]
+    _autosize(ws, df)
+    _format_numbers(ws, df)
+
+    # teksty z przecinkiem jako "@", żeby Excel nie przerabiał ich z powrotem na liczby
+    if name == _COMMA_TEXT_SHEET:
+        for col_idx, col in enumerate(df.columns, start=1):
+            if col not in _COMMA_TEXT_COLS:
+                continue
+            for (cell,) in ws.iter_rows(min_row=2, max_row=len(df) + 1, min_col=col_idx, max_col=col_idx):
+                cell.number_format = "@"
+
+    if name == _HEATMAP_SHEET and _heatmap_range(df):
+        ws.conditional_formatting.add(_heatmap_range(df), _heatmap_rule())
+
+    # wpisz podsumowanie
+    if summary is not None:
+        _write_package_type_share_summary(ws, *summary)
+
+    if description is not None:
+        text, start_cell, end_cell = description
+        _add_description_block(ws, text=text, start_cell=start_cell, end_cell=end_cell)
+
+
+def _write_sheet_xlsxwriter(writer, sheet: str, name: str, df: pd.DataFrame, summary, description, formats) -> None:
+    """
+    Formaty liczbowe nadawane raz na kolumnę (set_column) - xlsxwriter stosuje je
+    do komórek bez własnego formatu, bez dotykania każdej komórki z osobna.
+    """
+    df.to_excel(writer, sheet_name=sheet, index=False)
+    ws = writer.sheets[sheet]
+
+    col_formats = {}
+    for i, (col, width) in enumerate(zip(df.columns, _column_widths(df))):
+        fmt = _number_format(df[col])
+        if name == _COMMA_TEXT_SHEET and col in _COMMA_TEXT_COLS:
+            fmt = "@"
+        col_formats[i] = formats[fmt] if fmt else None
+        ws.set_column(i, i, width, col_formats[i])
+
+    if name == _HEATMAP_SHEET and _heatmap_range(df):
+        low, mid, high = _HEATMAP_COLORS
+        ws.conditional_format(_heatmap_range(df), {
+            "type": "3_color_scale",
+            "min_color": f"#{low}", "mid_color": f"#{mid}", "max_color": f"#{high}",
+        })
+
+    if summary is not None:
+        for ref, value in _package_type_share_summary_cells(*summary).items():
+            ws.write(ref, value)
+
+    if description is not None:
+        text, start_cell, end_cell = description
+        ws.merge_range(f"{start_cell}:{end_cell}", text, formats["description"])
+
+        # ustaw szerokość kolumn w zakresie opisu (np. H..N)
+        _, start_col = _cell_index(start_cell)
+        _, end_col = _cell_index(end_cell)
+        for c in range(start_col - 1, end_col):
+            ws.set_column(c, c, 22.0, col_formats.get(c))
+
+
+def _xlsxwriter_formats(book) -> Dict[Optional[str], object]:
+    return {
+        _INT_FMT: book.add_format({"num_format": _INT_FMT}),
+        _FLOAT_FMT: book.add_format({"num_format": _FLOAT_FMT}),
+        "@": book.add_format({"num_format": "@"}),
+        "description": book.add_format({
+            "bg_color": "#FFF200",
+            "pattern": 1,
+            "valign": "top",
+            "align": "center",
+            "text_wrap": True,
+            "border": 1,
+        }),
+    }
+
+
+# Limit wierszy arkusza Excela (razem z nagłówkiem)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Od tylu wierszy łącznie (wszystkie arkusze) tryb auto przełącza się na zapis strumieniowy
+STREAMING_MIN_ROWS = 200_000
+
+# Ile wierszy DataFrame zamieniamy naraz na wartości Pythona w zapisie strumieniowym
+STREAM_CHUNK_ROWS = 10_000
+
+
+def _cell_index(ref: str) -> Tuple[int, int]:
+    """'I4' -> (4, 9) - wiersz i kolumna liczone od 1."""
+    letters, row = coordinate_from_string(ref)
+    return row, column_index_from_string(letters)
+
+
+def _split_for_excel(name: str, df: pd.DataFrame, max_rows: int = EXCEL_MAX_ROWS) -> list[Tuple[str, pd.DataFrame]]:
+    """
+    Dzieli arkusz przekraczający limit wierszy Excela na części:
+    name, name_2, name_3 ... (nazwa przycięta do 31 znaków).
+    """
+    per_part = max_rows - 1  # nagłówek
+    if len(df) <= per_part:
+        return [(name[:31], df)]
+
+    parts = []
+    for k, start in enumerate(range(0, len(df), per_part), start=1):
+        suffix = "" if k == 1 else f"_{k}"
+        parts.append((name[:31 - len(suffix)] + suffix, df.iloc[start:start + per_part]))
+    return parts
+
+
+def _stream_number_format(s: pd.Series) -> Optional[str]:
+    """Jak _number_format, plus formaty dat takie jak przy zapisie przez pandas."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return "YYYY-MM-DD HH:MM:SS"
+    fmt = _number_format(s)
+    if fmt is not None:
+        return fmt
+    first = s.dropna().head(1).tolist()
+    if first and isinstance(first[0], date) and not isinstance(first[0], datetime):
+        return "YYYY-MM-DD"
+    return None
+
+
+def _iter_row_values(df: pd.DataFrame, chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[list]:
+    """Wiersze jako listy wartości Pythona (NaN/NA/NaT -> None), liczone kawałkami."""
+    for start in range(0, len(df), chunk_rows):
+        part = df.iloc[start:start + chunk_rows]
+        cols = []
+        for col in part.columns:
+            s = part[col]
+            values = s.astype(object).where(s.notna(), None).tolist()
+            cols.append(values)
+        yield from (list(row) for row in zip(*cols))
+
+
+def _write_sheet_streaming(wb, sheet: str, name: str, df: pd.DataFrame, summary, description) -> None:
+    """
+    Arkusz w skoroszycie write-only: wiersze trafiają do pliku od razu przy append,
+    więc pamięć nie rośnie z liczbą komórek. Style/opis/scalenia ustawiane w locie.
+    """
+    ws = wb.create_sheet(title=sheet)
+
+    # szerokości i formaty kolumn (muszą być ustawione przed pierwszym wierszem)
+    for i, w in enumerate(_column_widths(df), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+
+    if name == _HEATMAP_SHEET and _heatmap_range(df):
+        ws.conditional_formatting.add(_heatmap_range(df), _heatmap_rule())
+
+    # komórki dodatkowe: {wiersz: {kolumna: komórka}} (podsumowanie, opis)
+    extra: Dict[int, Dict[int, WriteOnlyCell]] = {}
+
+    if summary is not None:
+        for ref, value in _package_type_share_summary_cells(*summary).items():
+            row, col = _cell_index(ref)
+            extra.setdefault(row, {})[col] = WriteOnlyCell(ws, value=value)
+
+    if description is not None:
+        text, start_cell, end_cell = description
+        row, col = _cell_index(start_cell)
+        _, end_col = _cell_index(end_cell)
+
+        cell = WriteOnlyCell(ws, value=text)
+        cell.fill = _YELLOW
+        cell.alignment = _ALIGN
+        cell.border = _BORDER
+        extra.setdefault(row, {})[col] = cell
+        ws.merged_cells.add(f"{start_cell}:{end_cell}")
+
+        # ustaw szerokość kolumn w zakresie opisu (np. H..N)
+        for c in range(col, end_col + 1):
+            ws.column_dimensions[get_column_letter(c)].width = 22.0
+
+    # jedna komórka wielokrotnego użytku na kolumnę (wiersz jest zapisywany od razu przy append)
+    cell_fmt = {}
+    for i, col in enumerate(df.columns):
+        fmt = _stream_number_format(df[col])
+        if name == _COMMA_TEXT_SHEET and col in _COMMA_TEXT_COLS:
+            fmt = "@"
+        if fmt is not None:
+            c = WriteOnlyCell(ws)
+            c.number_format = fmt
+            cell_fmt[i] = c
+
+    def _with_extra(values: list, row_idx: int) -> list:
+        cells = extra.pop(row_idx, None)
+        if not cells:
+            return values
+        width = max(len(values), max(cells))
+        values = values + [None] * (width - len(values))
+        for col, c in cells.items():
+            values[col - 1] = c
+        return values
+
+    ws.append(_with_extra([str(c) for c in df.columns], 1))
+
+    row_idx = 1
+    for values in _iter_row_values(df):
+        row_idx += 1
+        for i, c in cell_fmt.items():
+            if values[i] is not None:
+                c.value = values[i]
+                values[i] = c
+        ws.append(_with_extra(values, row_idx))
+
+    # opis/podsumowanie poniżej danych (arkusz krótszy niż pozycja bloku)
+    for r in sorted(extra):
+        while row_idx < r - 1:
+            row_idx += 1
+            ws.append([])
+        row_idx += 1
+        ws.append(_with_extra([], row_idx))
 
 
 def write_report_xlsx(
-    path: Path,
+    path: Union[Path, str, BinaryIO],
     sheets: Dict[str, pd.DataFrame],
     sheet_order: Optional[Iterable[str]] = None,
     descriptions: Optional[Dict[str, Tuple[str, str, str]]] = None,
     package_type_share_summary: Optional[Tuple[float, int]] = None,
+    engine: str = "auto",
+    streaming: Optional[bool] = None,
 ) -> None:
     """
+    path: ścieżka albo obiekt plikowy (np. BytesIO) - raport bez pliku na dysku
     descriptions[sheet_name] = (text, start_cell, end_cell)
     sheet_order: wymusza kolejność arkuszy (reszta dopisana na końcu)
 
     package_type_share_summary = (weighted_avg_len, predicted_efficiency)
+
+    engine: "xlsxwriter" (formaty nadawane na kolumnę) | "openpyxl" (formaty per komórka)
+            | "auto" (xlsxwriter jeśli jest zainstalowany)
+    streaming: True - zapis strumieniowy (openpyxl write-only, stała pamięć),
+               None - automatycznie od STREAMING_MIN_ROWS wierszy łącznie.
+    Arkusze dłuższe niż limit Excela są dzielone na name, name_2, ...
     """
-    path.parent.mkdir(parents=True, exist_ok=True)
+    if engine == "auto":
+        engine = "xlsxwriter" if _has_xlsxwriter() else "openpyxl"
+    if engine not in ("xlsxwriter", "openpyxl"):
+        raise ValueError(f"Nieznany silnik zapisu XLSX: {engine!r}")
+
+    if streaming is None:
+        streaming = sum(len(df) for df in sheets.values()) >= STREAMING_MIN_ROWS
+
+    if isinstance(path, (str, os.PathLike)):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
 
     # kolejność arkuszy
     if sheet_order is None:
@@ -136,30 +424,34 @@ def write_report_xlsx(
             if name not in seen:
                 order.append(name)
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        for name in order:
-            df = sheets[name]
-            sheet = name[:31]
-
-            df.to_excel(writer, sheet_name=sheet, index=False)
-
-            ws = writer.book[sheet]
-            _autosize(ws, df)
-            _format_numbers(ws, df)
-
-            # TYLKO ten arkusz: zawsze przecinki w średnich wymiarach
-            if name == "package_type_share":
-                _force_comma_text_for_columns(
-                    ws,
-                    ["avg_length", "avg_width", "avg_height"],
-                    decimals=2,
-                )
-
-                # wpisz podsumowanie 
-                if package_type_share_summary is not None:
-                    wavg_len, pred_eff = package_type_share_summary
-                    _write_package_type_share_summary(ws, wavg_len, pred_eff)
-
-            if descriptions and name in descriptions:
-                text, start_cell, end_cell = descriptions[name]
-                _add_description_block(ws, text=text, start_cell=start_cell, end_cell=end_cell)
+    # (tytuł arkusza, nazwa raportu, dane, podsumowanie, opis); opis tylko na pierwszej części
+    parts = []
+    for name in order:
+        df = sheets[name]
+        summary = None
+
+        # TYLKO ten arkusz: zawsze przecinki w średnich wymiarach (gotowe teksty w DataFrame)
+        if name == _COMMA_TEXT_SHEET:
+            df = _comma_text_columns(df, _COMMA_TEXT_COLS, decimals=2)
+            summary = package_type_share_summary
+
+        description = descriptions.get(name) if descriptions else None
+
+        for k, (sheet, part) in enumerate(_split_for_excel(name, df)):
+            parts.append((sheet, name, part, summary if k == 0 else None, description if k == 0 else None))
+
+    if streaming:
+        wb = Workbook(write_only=True)
+        for sheet, name, part, summary, description in parts:
+            _write_sheet_streaming(wb, sheet, name, part, summary, description)
+        wb.save(path)
+        return
+
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        formats = _xlsxwriter_formats(writer.book) if engine == "xlsxwriter" else None
+
+        for sheet, name, part, summary, description in parts:
+            if engine == "xlsxwriter":
+                _write_sheet_xlsxwriter(writer, sheet, name, part, summary, description, formats)
+            else:
+                _write_sheet_openpyxl(writer, sheet, name, part, summary, description)
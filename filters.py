@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import registry
+import reports as rpt
+from pipeline import Report
+
+
+# Filtr raportu (zakres godzin + typy opakowań) bez ponownego przeliczania pliku:
+# przy wczytaniu liczone są raz liczniki częściowe per godzina i typ (HourlyParts,
+# posortowane po scan_hour), a raport dla filtra to wycinek (binary search) + zsumowanie.
+# Wiersze danych nie są już czytane.
+
+_TYPE = "Package type Barcodes"
+_DETAIL_SHEETS = {"loop_99": "99 Loop", "nok_244": "Not Ok 244", "overflow_243": "Overflow 243"}
+
+
+@dataclass(frozen=True)
+class ReportFilter:
+    """
+    Zakres [start, end) z dokładnością do godziny (jak scan_hour) i typy opakowań.
+    None = bez ograniczenia.
+    """
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    types: Optional[Tuple[str, ...]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.start is not None or self.end is not None or self.types is not None
+
+    def key(self) -> Tuple:
+        """Klucz do cache wyników (hashowalny, stabilny)."""
+        return (
+            None if self.start is None else pd.Timestamp(self.start).isoformat(),
+            None if self.end is None else pd.Timestamp(self.end).isoformat(),
+            None if self.types is None else tuple(sorted(self.types)),
+        )
+
+
+def filter_types(values: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    """Wybór typów z UI -> ReportFilter.types (pusty wybór = wszystkie typy)."""
+    return tuple(values) if values else None
+
+
+def _hourly_counts(df: pd.DataFrame, mask: pd.Series, keys: Sequence[str]) -> pd.DataFrame:
+    """Liczniki wierszy z `mask` po (scan_hour, *keys), posortowane po scan_hour."""
+    cols = ["scan_hour"] + [k for k in keys if k != "scan_hour"]
+    # scan_hour pierwszym kluczem - wynik jest od razu posortowany po godzinie
+    return rpt.count_by(df.loc[mask, cols], cols)
+
+
+def _regroup(part: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    """Wycinek liczników godzinowych -> liczniki po `keys` (jak groupby na wierszach)."""
+    return rpt.count_by(part, keys, value="items_count")
+
+
+class HourlyParts:
+    """
+    Sumowalne wyniki per godzina (i typ opakowania) dla arkuszy czytających wiersze:
+    kostka agregatów, przedziały 15 min, szczegóły zrzutów problemowych, Chute Full,
+    kandydaci skrajnych wartości, histogramy miar, liczniki zsyp x godzina oraz zakres Scan.
+    Liczone raz na plik; for_filter składa z nich raport.
+    k kandydatów zależy od params (top_k, top_k_type) - raport dla filtra dostaje te same params.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        cube: Optional[pd.DataFrame] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        self.cube = cube if cube is not None else rpt.build_cube(df)
+        self.slots = rpt.build_slots(df)
+        self.k = registry.extreme_k(params)
+
+        # wiersze zrzutów problemowych wybierane raz - dla szczegółów i Chute Full
+        problems = rpt.problem_subset(df, ["scan_hour"] + rpt.PROBLEM_COLUMNS)
+        details = rpt.discharge_detail_counts_all(problems, keys=["scan_hour"] + rpt.DETAIL_KEYS)
+        self.details = {name: details[discharge] for name, discharge in _DETAIL_SHEETS.items()}
+        self.chute_full = _hourly_counts(problems, rpt.chute_full_mask(problems), [_TYPE, "Discharge", "Logic"])
+        # heatmapa zsyp x godzina - liczniki już posortowane po scan_hour
+        self.chute_hours = rpt.chute_hour_counts(df)
+
+        # kandydaci skrajnych wartości: po k w każdej parze (godzina, typ), z numerem
+        # wiersza - przy równych wartościach wygrywa wcześniejszy wiersz
+        cand = rpt.extreme_candidates(df, k=self.k, keys=["scan_hour", _TYPE])
+        self.extremes = cand.sort_values("scan_hour", kind="stable").reset_index(drop=True)
+        # histogramy per (godzina, typ) - już posortowane po scan_hour
+        self.hist = rpt.build_hist(df)
+
+        scan = df.groupby(["scan_hour", _TYPE], dropna=False, observed=True)["Scan"].agg(["min", "max"])
+        self.scan_range = scan.reset_index().sort_values("scan_hour", kind="stable").reset_index(drop=True)
+
+    def _slice(self, frame: pd.DataFrame, flt: ReportFilter, time_col: str = "scan_hour") -> pd.DataFrame:
+        return rpt.slice_cube(frame, flt.start, flt.end, flt.types, time_col=time_col)
+
+    def node_values(self, flt: ReportFilter) -> Dict[str, Any]:
+        """Wyniki węzłów rejestru czytających wiersze - dla danych po filtrze."""
+        values: Dict[str, Any] = {
+            "cube": self._slice(self.cube, flt),
+            "slots": self._slice(self.slots, flt, time_col="scan_slot"),
+        }
+        for name, part in self.details.items():
+            values[name] = rpt.discharge_detail_from_counts(_regroup(self._slice(part, flt), rpt.DETAIL_KEYS))
+        values["chute_full"] = rpt.chute_full_from_counts(
+            _regroup(self._slice(self.chute_full, flt), ["Discharge", "Logic"])
+        )
+
+        values["chute_hours"] = self._slice(self.chute_hours, flt)
+        values["hist"] = self._slice(self.hist, flt)
+
+        cand = self._slice(self.extremes, flt).sort_values("_row", kind="stable")
+        values["extreme_candidates"] = cand.drop(columns="scan_hour").reset_index(drop=True)
+        return values
+
+    def for_filter(self, flt: ReportFilter, params: Optional[Dict[str, Any]] = None) -> Report:
+        """Raport (jak pipeline.compute_report) dla danych po filtrze - z wycinków, bez wierszy."""
+        values = self.node_values(flt)
+        cube = values["cube"]
+        scan = self._slice(self.scan_range, flt)
+        min_scan, max_scan = scan["min"].min(), scan["max"].max()
+
+        results = registry.evaluate_parts(
+            values,
+            total_rows=int(cube["total_items"].sum()),
+            # weight_pos w kostce to suma Volume > 0
+            total_mass_g=float(cube["weight_pos"].sum()) if "weight_pos" in cube.columns else 0.0,
+            min_scan=None if pd.isna(min_scan) else min_scan,
+            max_scan=None if pd.isna(max_scan) else max_scan,
+            names=registry.SHEET_ORDER + ["efficiency"],
+            params=params,
+        )
+        summary = results.pop("efficiency")
+        return Report(sheets=results, summary=summary)
+
+    def hours(self) -> np.ndarray:
+        """Godziny z danymi (rosnąco, bez NaT) - zakres suwaka w aplikacji."""
+        return np.sort(self.cube["scan_hour"].dropna().unique())
+
+    def types(self) -> list:
+        """Typy opakowań z danymi (od najczęstszego)."""
+        counts = self.cube.groupby(_TYPE, observed=True)["total_items"].sum()
+        return [str(t) for t in counts.sort_values(ascending=False, kind="stable").index]
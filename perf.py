@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+# Logger dla monitoringu: jedna linia JSON na raport
+logger = logging.getLogger("analizator_box.perf")
+
+# Pomiar szczytu alokacji przez tracemalloc (wolniejszy); domyślnie tylko RSS procesu
+TRACE_MEMORY = os.environ.get("BOX_PERF_TRACEMALLOC", "") not in ("", "0")
+
+
+@dataclass
+class StageStat:
+    """Pomiar jednego etapu (wczytanie, węzeł raportu, zapis XLSX)."""
+    stage: str
+    wall_s: float
+    cpu_s: float
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    # szczyt alokacji w etapie (tylko z tracemalloc) i RSS procesu po etapie
+    peak_mb: Optional[float] = None
+    rss_mb: Optional[float] = None
+    cached: bool = False
+
+
+def rss_mb() -> Optional[float]:
+    """Bieżący RSS procesu (Linux: /proc), w innym razie szczytowy z getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024**2, 1)
+    except (OSError, ValueError, IndexError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / 1024**2 if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """Liczba wierszy wyniku: DataFrame/Series, krotka ramek (suma) albo None."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(len(value))
+    if isinstance(value, tuple):
+        counts = [count_rows(v) for v in value]
+        if counts and all(c is not None for c in counts):
+            return sum(counts)
+    return None
+
+
+class _Probe:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory and tracemalloc.is_tracing()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self.wall0 = time.perf_counter()
+        # CPU wątku: w trybie "thread" każdy raport liczony jest w osobnym wątku
+        self.cpu0 = time.thread_time()
+
+    def finish(self, stage: str, rows_in: Optional[int], rows_out: Optional[int]) -> StageStat:
+        return StageStat(
+            stage=stage,
+            wall_s=round(time.perf_counter() - self.wall0, 4),
+            cpu_s=round(time.thread_time() - self.cpu0, 4),
+            rows_in=rows_in,
+            rows_out=rows_out,
+            peak_mb=round(tracemalloc.get_traced_memory()[1] / 1024**2, 2) if self.trace_memory else None,
+            rss_mb=rss_mb(),
+        )
+
+
+def timed_call(stage: str, trace_memory: bool, func: Callable[..., Any], *args, **kwargs) -> tuple:
+    """
+    func(*args, **kwargs) z pomiarem -> (wynik, StageStat). Funkcja modułu, więc nadaje
+    się jako zadanie schedulera także w trybie "process" (pomiar w procesie roboczym).
+    rows_in: długość pierwszego argumentu, jeśli to ramka.
+    """
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    probe = _Probe(trace_memory)
+    value = func(*args, **kwargs)
+    rows_in = count_rows(args[0]) if args else None
+    return value, probe.finish(stage, rows_in, count_rows(value))
+
+
+class PerfLog:
+    """
+    Zbiera pomiary etapów jednego raportu.
+
+    Przy równoległym liczeniu (tryb "thread") wall/CPU są per raport, ale RSS i szczyt
+    tracemalloc dotyczą całego procesu - to przybliżenie, nie przydział pamięci raportowi.
+    """
+
+    def __init__(self, trace_memory: bool = TRACE_MEMORY):
+        self.trace_memory = trace_memory
+        self.records: List[StageStat] = []
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def add(self, stat: StageStat) -> None:
+        with self._lock:
+            self.records.append(stat)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        with perf.stage("load_xlsx") as s:
+            ...
+            s["rows_out"] = len(df)      # opcjonalnie: rows_in / rows_out / cached
+        """
+        probe = _Probe(self.trace_memory)
+        info: Dict[str, Any] = {"rows_in": rows_in, "rows_out": None, "cached": False}
+        try:
+            yield info
+        finally:
+            stat = probe.finish(name, info["rows_in"], info["rows_out"])
+            stat.cached = bool(info["cached"])
+            self.add(stat)
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def total(self, prefix: str = "") -> float:
+        return sum(r.wall_s for r in self.records if r.stage.startswith(prefix))
+
+    def to_frame(self) -> pd.DataFrame:
+        cols = list(StageStat.__dataclass_fields__)
+        return pd.DataFrame([asdict(r) for r in self.records], columns=cols)
+
+    def to_json_line(self, **extra: Any) -> str:
+        return json.dumps(
+            {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                **extra,
+                "stages": [asdict(r) for r in self.records],
+            },
+            ensure_ascii=False,
+            default=str,
+        )
+
+    def log(self, **extra: Any) -> None:
+        logger.info(self.to_json_line(**extra))
+
+
+def stage(perf: Optional[PerfLog], name: str, rows_in: Optional[int] = None):
+    """perf.stage(...) albo pusty kontekst, gdy pomiar wyłączony (perf=None)."""
+    if perf is None:
+        return nullcontext({})
+    return perf.stage(name, rows_in)
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Linie JSON z PerfLog.log na stderr (dla monitoringu), jeśli logger nie ma jeszcze handlera."""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import perf as perf_mod
+import registry
+from cache import file_hash, load_xlsx_cached
+from chunked import ChunkedReport, report_chunked
+from export_excel import write_report_xlsx
+from perf import PerfLog
+from processing import CHUNK_ROWS, LoadedData, load_xlsx, merge_loaded, overlap_masks, row_keys, spooled_buffer
+from scheduler import map_files
+
+
+# Wspólny przebieg raportu (wczytanie -> raporty -> XLSX) dla aplikacji i CLI.
+
+
+@dataclass
+class Report:
+    sheets: Dict[str, pd.DataFrame]
+    # (weighted_avg_len, predicted_efficiency) - podsumowanie w package_type_share
+    summary: Tuple[float, int]
+
+
+@dataclass
+class FileResult:
+    """Wynik przetworzenia jednego pliku w trybie wsadowym (picklowalny - wraca z procesu)."""
+    source: str
+    output: Optional[str] = None
+    rows: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    # szczegółowe pomiary etapów (PerfLog.to_json_line)
+    perf_json: Optional[str] = None
+    # wiersze pominięte jako duplikaty z innych plików (raport łączony)
+    duplicates: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load(
+    data: bytes,
+    digest: Optional[str] = None,
+    use_cache: bool = True,
+    perf: Optional[PerfLog] = None,
+) -> LoadedData:
+    """
+    Wczytuje plik z bajtów (cache na dysku, jeśli use_cache). Parsowanie z bufora
+    w pamięci - duże pliki przelane do pliku tymczasowego, usuwanego po odczycie.
+    """
+    with perf_mod.stage(perf, "load_xlsx") as s, spooled_buffer(data) as buf:
+        if use_cache:
+            loaded = load_xlsx_cached(data, buf, digest=digest)
+        else:
+            loaded = load_xlsx(buf)
+        s["rows_out"] = len(loaded.df)
+        return loaded
+
+
+def _load_keyed(item: Tuple[bytes, str], use_cache: bool) -> Tuple[LoadedData, np.ndarray]:
+    # w procesie roboczym: wczytanie (z cache) + klucze wierszy do wykrycia duplikatów
+    data, digest = item
+    loaded = load(data, digest=digest, use_cache=use_cache)
+    return loaded, row_keys(loaded.df)
+
+
+def load_many(
+    datas: Sequence[bytes],
+    digests: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+    max_workers: Optional[int] = None,
+    perf: Optional[PerfLog] = None,
+) -> LoadedData:
+    """
+    Kilka plików (np. eksporty kolejnych zmian) jako jedna ramka: pliki parsowane
+    równolegle w puli procesów, wiersze powtórzone z wcześniejszych plików
+    (nakładające się eksporty) pominięte - LoadedData.duplicates.
+    """
+    digests = list(digests) if digests is not None else [file_hash(d) for d in datas]
+    with perf_mod.stage(perf, "load_xlsx") as s:
+        parts = map_files(_load_keyed, list(zip(datas, digests)), use_cache, max_workers=max_workers)
+        loaded = merge_loaded(parts)
+        s["rows_in"] = sum(len(p.df) for p, _ in parts)
+        s["rows_out"] = len(loaded.df)
+    return loaded
+
+
+def check_loaded(loaded: LoadedData) -> None:
+    """Czy wczytane dane nadają się do raportu (RuntimeError z opisem, jeśli nie)."""
+    if loaded.min_scan is None or loaded.max_scan is None:
+        raise RuntimeError("Nie udało się sparsować kolumny Scan (brak dat).")
+    if len(loaded.df) == 0:
+        raise RuntimeError("Plik po wczytaniu ma 0 wierszy.")
+
+
+def compute_report(
+    loaded: LoadedData,
+    params: Optional[Dict[str, Any]] = None,
+    memo: Optional[MutableMapping] = None,
+    mode: str = "thread",
+    max_workers: Optional[int] = None,
+    on_done: Optional[Callable[[str, int, int], None]] = None,
+    perf: Optional[PerfLog] = None,
+) -> Report:
+    """Wszystkie arkusze z rejestru + podsumowanie wydajności (perf: pomiar każdego węzła)."""
+    results = registry.evaluate(
+        loaded.df,
+        registry.SHEET_ORDER + ["efficiency"],
+        params=params,
+        memo=memo,
+        mode=mode,
+        max_workers=max_workers,
+        on_done=on_done,
+        perf=perf,
+    )
+    summary = results.pop("efficiency")
+    return Report(sheets=results, summary=summary)
+
+
+def compute_report_chunked(
+    source: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    perf: Optional[PerfLog] = None,
+) -> Tuple[Report, int]:
+    """
+    Jak load + compute_report, ale plik czytany partiami (chunked.py) - pamięć
+    ograniczona wielkością partii. Zwraca (raport, liczba wierszy).
+    """
+    with perf_mod.stage(perf, "chunked_reports") as s:
+        results, acc = report_chunked(
+            source, registry.SHEET_ORDER + ["efficiency"], params=params, chunk_rows=chunk_rows,
+        )
+        s["rows_in"] = acc.rows
+    if acc.min_scan is None or acc.max_scan is None:
+        raise RuntimeError("Nie udało się sparsować kolumny Scan (brak dat).")
+    if acc.rows == 0:
+        raise RuntimeError("Plik po wczytaniu ma 0 wierszy.")
+    summary = results.pop("efficiency")
+    return Report(sheets=results, summary=summary), acc.rows
+
+
+def _file_partials(
+    item: Tuple[str, Optional[np.ndarray]],
+    use_cache: bool,
+    params: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[np.ndarray], ChunkedReport]:
+    """
+    W procesie roboczym: liczniki częściowe wszystkich raportów (chunked.ChunkedReport)
+    dla jednego pliku. item = (ścieżka, maska wierszy do pominięcia albo None);
+    bez maski zwracane są też klucze wierszy (row_keys) do wykrycia duplikatów.
+    """
+    source, drop = item
+    data = Path(source).read_bytes()
+    df = load(data, digest=file_hash(data), use_cache=use_cache).df
+    keys = row_keys(df) if drop is None else None
+    if drop is not None:
+        df = df.loc[~drop]
+    acc = ChunkedReport(params=params)
+    acc.add(df)
+    return keys, acc
+
+
+def compute_report_many(
+    sources: Sequence[str],
+    params: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    max_workers: Optional[int] = None,
+    perf: Optional[PerfLog] = None,
+) -> Tuple[Report, int, int]:
+    """
+    Jeden raport z kilku plików bez sklejania ramek: każdy plik liczony w osobnym procesie
+    do liczników częściowych (jak tryb kawałkowy), które są potem scalane. Wiersze powtórzone
+    z wcześniejszych plików są pomijane - tylko pliki z takimi wierszami liczone są drugi raz
+    (z cache). Zwraca (raport, liczba wierszy, liczba pominiętych duplikatów).
+    """
+    with perf_mod.stage(perf, "merged_reports") as s:
+        first = map_files(
+            _file_partials, [(src, None) for src in sources], use_cache, params, max_workers=max_workers,
+        )
+        masks = overlap_masks([keys for keys, _ in first])
+        accs: List[ChunkedReport] = [acc for _, acc in first]
+
+        redo = [i for i, mask in enumerate(masks) if mask.any()]
+        if redo:
+            again = map_files(
+                _file_partials, [(sources[i], masks[i]) for i in redo], use_cache, params, max_workers=max_workers,
+            )
+            for i, (_, acc) in zip(redo, again):
+                accs[i] = acc
+
+        total = accs[0]
+        for acc in accs[1:]:
+            total.merge(acc)
+        results = total.result(registry.SHEET_ORDER + ["efficiency"], params=params)
+        s["rows_in"] = sum(len(keys) for keys, _ in first)
+        s["rows_out"] = total.rows
+    if total.min_scan is None or total.max_scan is None:
+        raise RuntimeError("Nie udało się sparsować kolumny Scan (brak dat).")
+    if total.rows == 0:
+        raise RuntimeError("Pliki po wczytaniu mają 0 wierszy.")
+    summary = results.pop("efficiency")
+    return Report(sheets=results, summary=summary), total.rows, int(sum(mask.sum() for mask in masks))
+
+
+def _sheets_with_perf(report: Report, perf: Optional[PerfLog], perf_sheet: bool) -> Dict[str, pd.DataFrame]:
+    # arkusz _perf na końcu: pomiary do chwili zapisu (bez samego zapisu XLSX)
+    if perf is None or not perf_sheet:
+        return report.sheets
+    return {**report.sheets, "_perf": perf.to_frame()}
+
+
+def report_bytes(
+    report: Report,
+    engine: str = "auto",
+    perf: Optional[PerfLog] = None,
+    perf_sheet: bool = False,
+) -> bytes:
+    """
+    Gotowy XLSX jako bajty (bufor w pamięci, duże raporty przelane na dysk i usunięte).
+    perf_sheet: dopisz arkusz _perf z pomiarami etapów.
+    """
+    sheets = _sheets_with_perf(report, perf, perf_sheet)
+    with perf_mod.stage(perf, "write_report_xlsx") as s, spooled_buffer() as buf:
+        s["rows_in"] = sum(len(df) for df in sheets.values())
+        write_report_xlsx(
+            buf,
+            sheets,
+            sheet_order=registry.SHEET_ORDER,
+            descriptions=registry.sheet_descriptions(),
+            package_type_share_summary=report.summary,
+            engine=engine,
+        )
+        buf.seek(0)
+        return buf.read()
+
+
+def report_filename(digest: str) -> str:
+    return f"BOX_raport_{digest[:12]}.xlsx"
+
+
+def _write_report_file(
+    out: Path,
+    report: Report,
+    engine: str,
+    perf: Optional[PerfLog],
+    perf_sheet: bool,
+) -> None:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    sheets = _sheets_with_perf(report, perf, perf_sheet)
+    with perf_mod.stage(perf, "write_report_xlsx") as s:
+        s["rows_in"] = sum(len(df) for df in sheets.values())
+        write_report_xlsx(
+            out,
+            sheets,
+            sheet_order=registry.SHEET_ORDER,
+            descriptions=registry.sheet_descriptions(),
+            package_type_share_summary=report.summary,
+            engine=engine,
+        )
+
+
+def merged_filename(sources: Sequence[str]) -> str:
+    """Nazwa raportu łączonego: pierwszy i ostatni plik."""
+    first, last = Path(sources[0]).stem, Path(sources[-1]).stem
+    return f"BOX_raport_{first}.xlsx" if len(sources) == 1 else f"BOX_raport_{first}--{last}.xlsx"
+
+
+def run_files_merged(
+    sources: Sequence[str],
+    out_dir: str,
+    params: Optional[Dict[str, Any]] = None,
+    engine: str = "auto",
+    use_cache: bool = True,
+    perf_sheet: bool = False,
+    max_workers: Optional[int] = None,
+) -> FileResult:
+    """
+    Jeden raport z kilku plików (compute_report_many - pliki liczone równolegle),
+    zapis do out_dir/merged_filename(sources). Błąd trafia do FileResult.error.
+    """
+    result = FileResult(source=f"{len(sources)} plików")
+    perf = PerfLog()
+    t0 = time.perf_counter()
+    try:
+        report, result.rows, result.duplicates = compute_report_many(
+            sources, params=params, use_cache=use_cache, max_workers=max_workers, perf=perf,
+        )
+        t2 = time.perf_counter()
+
+        out = Path(out_dir) / merged_filename(sources)
+        _write_report_file(out, report, engine, perf, perf_sheet)
+        t3 = time.perf_counter()
+
+        result.output = str(out)
+        # wczytanie plików odbywa się w procesach razem z licznikami - wliczone w raporty
+        result.timings = {"load": 0.0, "reports": t2 - t0, "export": t3 - t2}
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.timings["total"] = time.perf_counter() - t0
+    result.perf_json = perf.to_json_line(
+        files=[str(src) for src in sources], rows=result.rows, duplicates=result.duplicates, ok=result.ok,
+    )
+    perf.close()
+    return result
+
+
+def run_file(
+    source: str,
+    out_dir: str,
+    params: Optional[Dict[str, Any]] = None,
+    engine: str = "auto",
+    use_cache: bool = True,
+    perf_sheet: bool = False,
+    chunked: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+) -> FileResult:
+    """
+    Cały raport dla jednego pliku: zapis do out_dir/BOX_raport_<nazwa>.xlsx.
+    Wywoływane w procesie roboczym CLI - raporty liczone szeregowo (równolegle są pliki).
+    Błąd nie przerywa partii: trafia do FileResult.error.
+    perf_sheet: dopisz arkusz _perf z pomiarami etapów.
+    chunked: czytanie partiami po chunk_rows wierszy (bez cache, wczytanie liczone w raportach).
+    """
+    result = FileResult(source=str(source))
+    perf = PerfLog()
+    t0 = time.perf_counter()
+    try:
+        if chunked:
+            t1 = t0
+            report, result.rows = compute_report_chunked(source, params=params, chunk_rows=chunk_rows, perf=perf)
+        else:
+            data = Path(source).read_bytes()
+            loaded = load(data, digest=file_hash(data), use_cache=use_cache, perf=perf)
+            check_loaded(loaded)
+            result.rows = int(len(loaded.df))
+            t1 = time.perf_counter()
+
+            report = compute_report(loaded, params=params, mode="serial", perf=perf)
+        t2 = time.perf_counter()
+
+        out = Path(out_dir) / f"BOX_raport_{Path(source).stem}.xlsx"
+        _write_report_file(out, report, engine, perf, perf_sheet)
+        t3 = time.perf_counter()
+
+        result.output = str(out)
+        result.timings = {"load": t1 - t0, "reports": t2 - t1, "export": t3 - t2}
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.timings["total"] = time.perf_counter() - t0
+    result.perf_json = perf.to_json_line(file=str(source), rows=result.rows, ok=result.ok)
+    perf.close()
+    return result
@@ -1,10 +1,101 @@
 from __future__ import annotations
 
+import io
+import os
+import tempfile
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from scheduler import map_files
+
+
+# Kolumny używane przez reports.py - reszta arkusza nie jest wczytywana
+USED_COLUMNS = [
+    "Scan",
+    "Length",
+    "Width",
+    "Height",
+    "Volume",
+    "Discharge",
+    "Logic",
+    "Chunk Id",
+    "Package type Barcodes",
+]
+
+# Kolumny liczbowe (wymiary w mm, Volume = masa w gramach)
+NUMERIC_COLUMNS = ["Length", "Width", "Height", "Volume"]
+
+# Ile wierszy zbieramy w listach Pythona zanim zamienimy je na tablice
+CHUNK_ROWS = 50_000
+
+# Wersja formatu znormalizowanej ramki - podbić przy każdej zmianie load_xlsx /
+# _fill_missing_text, żeby stary cache (cache.py) przestał być używany
+PARSE_VERSION = 5
+
+# Logic: "<powód> <numer zsypu>" (np. "Chute Full 12") -> powód + numer zsypu;
+# (?s): powód może zawierać znaki nowej linii (komórki z Excela)
+LOGIC_PATTERN = r"(?s)^(?P<reason>.*?)(?:\s+(?P<chute>\d+))?$"
+# numer zsypu, gdy Logic go nie zawiera
+NO_CHUTE = -1
+
+# Formaty tekstowych znaczników czasu spotykane w eksportach sortera
+# (gdy Excel oddaje tekst zamiast natywnej daty). Sprawdzane po kolei na próbce.
+SCAN_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+]
+
+# Od ilu bajtów bufory XLSX (wejście/wyjście) trafiają do pliku tymczasowego zamiast do RAM.
+# None = zawsze w pamięci. Plik tymczasowy jest usuwany przy zamknięciu bufora.
+SPILL_MAX_BYTES = int(os.environ["BOX_SPILL_MAX_BYTES"]) if os.environ.get("BOX_SPILL_MAX_BYTES") else None
+
+# Źródło XLSX: ścieżka, bajty albo obiekt plikowy (np. BytesIO, plik z uploadu)
+XlsxSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# Wielkość próbki do wykrycia formatu
+SCAN_SAMPLE_SIZE = 200
+
+# Parsujemy tylko wartości unikalne, jeśli jest ich nie więcej niż ten ułamek wierszy
+SCAN_UNIQUE_RATIO = 0.5
+
+
+@contextmanager
+def spooled_buffer(data: Optional[bytes] = None, max_bytes: Optional[int] = SPILL_MAX_BYTES) -> Iterator[BinaryIO]:
+    """
+    Bufor binarny w pamięci, przelewany na dysk powyżej `max_bytes`
+    (SpooledTemporaryFile). `data` - opcjonalna zawartość początkowa; bufor jest
+    przewinięty na początek. Plik tymczasowy znika po wyjściu z bloku, także przy wyjątku.
+    """
+    buf = io.BytesIO() if max_bytes is None else tempfile.SpooledTemporaryFile(max_size=max_bytes)
+    try:
+        if data is not None:
+            buf.write(data)
+            buf.seek(0)
+        yield buf
+    finally:
+        buf.close()
+
+
+def _open_source(source: XlsxSource):
+    """Bajty -> BytesIO, obiekt plikowy -> przewinięty na początek, ścieżka bez zmian."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source
+    return os.fspath(source)
 
 
 @dataclass
@@ -12,24 +103,45 @@ class LoadedData:
     df: pd.DataFrame
     min_scan: Optional[datetime]
     max_scan: Optional[datetime]
+    # wiersze pominięte jako duplikaty z wcześniejszych plików (load_xlsx z listą plików)
+    duplicates: int = 0
+
+
+def _categorical_from_uniques(codes: np.ndarray, labels: pd.Series) -> pd.Categorical:
+    """
+    Buduje kategorię ze stałym (posortowanym) słownikiem:
+    codes - kody wierszy z pd.factorize (-1 = brak), labels - oczyszczone wartości unikalne.
+    Posortowane kategorie dają tę samą kolejność grup co groupby po tekście.
+    """
+    categories = pd.Index(sorted(labels.dropna().unique()), dtype="string")
+    mapper = categories.get_indexer(labels)
+    # -1 w codes (brak w danych) -> -1 w kategorii (NaN)
+    row_codes = np.where(codes >= 0, mapper[codes], -1) if len(mapper) else np.full(len(codes), -1)
+    return pd.Categorical.from_codes(row_codes, categories=categories)
+
+
+# Etykiety braków w kolumnach tekstowych (_fill_missing_text)
+MISSING_LABELS = {
+    "Chunk Id": "brak chunku",
+    "Package type Barcodes": "brak kodu",
+    "Discharge": "brak discharge",
+}
 
 
 def _fill_missing_text(df: pd.DataFrame) -> pd.DataFrame:
     """
     Zamienia braki (NaN/puste) na czytelne etykiety, żeby w Excelu nie było pustych pól.
     Dodatkowo usuwa końcówkę '.0' jeśli kolumna była liczbowa (typowy efekt XLSX->pandas).
-    """
-    mapping = {
-        "Chunk Id": "brak chunku",
-        "Package type Barcodes": "brak kodu",
-        "Discharge": "brak discharge",
-    }
 
-    for col, label in mapping.items():
+    Kolumny tekstowe trafiają do pamięci jako category: czyszczenie (strip/regex)
+    działa tylko na wartościach unikalnych, a raporty grupują i porównują po kodach.
+    """
+    for col, label in MISSING_LABELS.items():
         if col not in df.columns:
             continue
 
-        s = df[col].astype("string")
+        codes, uniques = pd.factorize(df[col])
+        s = pd.Series(uniques, dtype=object).astype("string")
 
         # wyczyść spacje, puste stringi -> NA
         s = s.str.strip()
@@ -38,30 +150,338 @@ def _fill_missing_text(df: pd.DataFrame) -> pd.DataFrame:
         # jeśli Excel zrobił z identyfikatora float (np. 12345.0), usuń ".0"
         s = s.str.replace(r"\.0$", "", regex=True)
 
-        df[col] = s.fillna(label)
+        # braki w wierszach (kod -1) też dostają etykietę
+        s = pd.concat([s.fillna(label), pd.Series([label], dtype="string")], ignore_index=True)
+        codes = np.where(codes >= 0, codes, len(s) - 1)
+
+        df[col] = _categorical_from_uniques(codes, s)
+
+    # Logic: bez etykiety braków, tylko zwarta reprezentacja
+    if "Logic" in df.columns:
+        codes, uniques = pd.factorize(df["Logic"])
+        df["Logic"] = _categorical_from_uniques(codes, pd.Series(uniques, dtype=object).astype("string"))
 
     return df
 
 
-def load_xlsx(path: str) -> LoadedData:
-    df = pd.read_excel(path)
+def parse_logic(logic: pd.Series) -> Tuple[np.ndarray, pd.Categorical]:
+    """
+    Numer zsypu (int16, NO_CHUTE gdy brak) i powód (category, np. "Chute Full") z kolumny Logic.
+    Regex (LOGIC_PATTERN) tylko na wartościach unikalnych, wynik mapowany przez kody kategorii.
+    """
+    if not isinstance(logic.dtype, pd.CategoricalDtype):
+        logic = logic.astype("category")
+    labels = pd.Series(logic.cat.categories, dtype=object).astype("string").str.strip()
+    parts = labels.str.extract(LOGIC_PATTERN)
+
+    chutes = pd.to_numeric(parts["chute"]).to_numpy(dtype=np.float64, na_value=np.nan)
+    chutes = np.where(chutes <= np.iinfo(np.int16).max, chutes, np.nan)
+    chutes = np.nan_to_num(chutes, nan=NO_CHUTE).astype(np.int16)
+    reason_codes, reasons = pd.factorize(parts["reason"].replace("", pd.NA), sort=True)
+
+    codes = logic.cat.codes.to_numpy()
+    known = codes >= 0
+    chute = np.full(len(codes), NO_CHUTE, dtype=np.int16)
+    chute[known] = chutes[codes[known]]
+    reason = np.full(len(codes), -1, dtype=np.int64)
+    reason[known] = reason_codes[codes[known]]
+    return chute, pd.Categorical.from_codes(reason, categories=reasons.astype("string"))
+
+
+def _detect_scan_format(sample: pd.Series) -> Optional[str]:
+    """Format z SCAN_FORMATS, który parsuje największą część próbki tekstów (None = żaden)."""
+    best, best_hits = None, 0
+    for fmt in SCAN_FORMATS:
+        hits = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+        if hits == len(sample):
+            break
+    return best
+
+
+def _to_datetime(values: pd.Series, fmt: Optional[str]) -> pd.Series:
+    if fmt is None:
+        return pd.to_datetime(values, errors="coerce")
+
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+
+    # pojedyncze wartości w innym formacie - dopytujemy pandas tylko o nie
+    missed = parsed.isna() & values.notna()
+    if missed.any():
+        parsed[missed] = pd.to_datetime(values[missed], errors="coerce")
+    return parsed
+
+
+def parse_scan(raw: pd.Series) -> pd.Series:
+    """
+    Szybkie parsowanie kolumny Scan:
+    - natywne daty z XLSX zostają bez zmian
+    - format tekstu wykrywany raz na próbce, potem parsowanie z jawnym formatem
+    - przy powtarzających się wartościach parsowane są tylko unikalne i mapowane przez kody
+    """
+    if pd.api.types.is_datetime64_any_dtype(raw):
+        return raw
+
+    texts = raw.dropna()
+    texts = texts[texts.map(type) == str].head(SCAN_SAMPLE_SIZE)
+    fmt = _detect_scan_format(texts.str.strip())
+
+    codes, uniques = pd.factorize(raw)
+    if len(uniques) > len(raw) * SCAN_UNIQUE_RATIO:
+        return _to_datetime(raw, fmt)
+
+    parsed = _to_datetime(pd.Series(uniques, dtype=object), fmt)
+    # kod -1 (brak w danych) -> NaT dopisany na końcu
+    values = np.append(parsed.to_numpy(), np.datetime64("NaT").astype(parsed.dtype))
+    return pd.Series(values[codes], index=raw.index, name=raw.name)
+
+
+def _build_chunk(buffers: dict[str, list]) -> pd.DataFrame:
+    """
+    Zamienia bufory wartości (listy z openpyxl) na typowane kolumny:
+    liczby -> float64, reszta zostaje jako object (czyszczenie w _fill_missing_text).
+    """
+    cols = {}
+    for name, values in buffers.items():
+        s = pd.Series(values, dtype=object)
+        if name in NUMERIC_COLUMNS:
+            s = pd.to_numeric(s, errors="coerce").astype("float64")
+        cols[name] = s
+    return pd.DataFrame(cols)
+
+
+def iter_xlsx_chunks(
+    source: XlsxSource,
+    columns: Optional[Sequence[str]] = USED_COLUMNS,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Strumieniowe czytanie pierwszego arkusza (openpyxl read_only, tylko wartości)
+    ze ścieżki, bajtów albo obiektu plikowego.
+    Zwraca kolejne ramki po maks. `chunk_rows` wierszy z kolumnami z `columns`
+    (None = wszystkie). Całkiem puste wiersze są pomijane.
+    """
+    from openpyxl import load_workbook
 
+    wb = load_workbook(_open_source(source), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+
+        wanted = None if columns is None else set(columns)
+        picked = [
+            (i, str(name))
+            for i, name in enumerate(header)
+            if name is not None and (wanted is None or str(name) in wanted)
+        ]
+
+        buffers: dict[str, list] = {name: [] for _, name in picked}
+        n = 0
+        yielded = False
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            for i, name in picked:
+                buffers[name].append(row[i] if i < len(row) else None)
+            n += 1
+            if n >= chunk_rows:
+                yield _build_chunk(buffers)
+                yielded = True
+                buffers = {name: [] for _, name in picked}
+                n = 0
+
+        # ostatni niepełny kawałek (albo pusta ramka z nagłówkami, gdy brak wierszy)
+        if n or not yielded:
+            yield _build_chunk(buffers)
+    finally:
+        wb.close()
+
+
+def _read_xlsx_calamine(source: XlsxSource, columns: Optional[Sequence[str]]) -> Optional[pd.DataFrame]:
+    """
+    Szybki backend (python-calamine, Rust) - jeśli jest zainstalowany.
+    Zwraca None, gdy pakietu brak.
+    """
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+
+    usecols = None if columns is None else (lambda c: c in columns)
+    df = pd.read_excel(_open_source(source), engine="calamine", usecols=usecols)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+def read_xlsx_columns(
+    source: XlsxSource,
+    columns: Optional[Sequence[str]] = USED_COLUMNS,
+    engine: str = "auto",
+) -> pd.DataFrame:
+    """
+    Wczytuje tylko potrzebne kolumny z XLSX.
+    engine: "calamine" | "openpyxl" (strumieniowo, w kawałkach) | "auto" (calamine jeśli jest)
+    """
+    if engine not in ("auto", "calamine", "openpyxl"):
+        raise ValueError(f"Nieznany silnik odczytu XLSX: {engine!r}")
+
+    if engine in ("auto", "calamine"):
+        df = _read_xlsx_calamine(source, columns)
+        if df is not None:
+            return df
+        if engine == "calamine":
+            raise RuntimeError("Brak pakietu 'python-calamine' (pip install python-calamine).")
+
+    chunks = list(iter_xlsx_chunks(source, columns=columns))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_xlsx(
+    source: Union[XlsxSource, Sequence[XlsxSource]],
+    columns: Optional[Sequence[str]] = USED_COLUMNS,
+    engine: str = "auto",
+    max_workers: Optional[int] = None,
+) -> LoadedData:
+    """
+    source: ścieżka, bajty pliku albo obiekt plikowy (bez zapisu na dysk).
+    Lista/krotka źródeł: pliki parsowane równolegle w puli procesów (max_workers),
+    wiersze powtórzone z wcześniejszych plików pominięte (merge_loaded).
+    """
+    if isinstance(source, (list, tuple)):
+        sources = [_picklable(s) for s in source]
+        return merge_loaded(map_files(_load_keyed, sources, columns, engine, max_workers=max_workers))
+    df = read_xlsx_columns(source, columns=columns, engine=engine)
+    return normalize_frame(df)
+
+
+def _picklable(source: XlsxSource) -> XlsxSource:
+    """Obiekt plikowy (np. upload) -> bajty, żeby dało się go przekazać do procesu."""
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source.read()
+    return source
+
+
+def _load_keyed(
+    source: XlsxSource,
+    columns: Optional[Sequence[str]],
+    engine: str,
+) -> Tuple[LoadedData, np.ndarray]:
+    # w procesie roboczym: parsowanie + klucze wierszy (do wykrycia duplikatów)
+    loaded = load_xlsx(source, columns=columns, engine=engine)
+    return loaded, row_keys(loaded.df)
+
+
+# Kolumny, z których liczony jest klucz wiersza (te same dane = ten sam skan)
+ROW_KEY_COLUMNS = USED_COLUMNS
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bitowy hash każdego wiersza po ROW_KEY_COLUMNS (uint64). Kolumny category
+    hashowane po wartościach - klucze są porównywalne między plikami o różnych słownikach.
+    """
+    cols = [c for c in ROW_KEY_COLUMNS if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def overlap_masks(keys: Sequence[np.ndarray]) -> List[np.ndarray]:
+    """
+    Dla kluczy kolejnych plików: maska wierszy, które wystąpiły już we wcześniejszym pliku
+    (nakładające się eksporty). Powtórzenia w obrębie jednego pliku zostają.
+    """
+    masks: List[np.ndarray] = []
+    seen: Optional[pd.Index] = None
+    for k in keys:
+        k = pd.Index(k)
+        if seen is None:
+            masks.append(np.zeros(len(k), dtype=bool))
+            seen = k.unique()
+            continue
+        # isin przez tablicę haszującą kluczy wcześniejszych plików (bez sortowania)
+        masks.append(k.isin(seen))
+        seen = seen.append(k).unique()
+    return masks
+
+
+def concat_frames(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Sklejenie znormalizowanych ramek z kilku plików. Kolumny category łączone przez
+    union_categoricals (posortowany słownik jak w _categorical_from_uniques), a nie do object.
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            parts = [_string_categories(f[col]) for f in frames]
+            df[col] = union_categoricals(parts, sort_categories=True)
+    return df
+
+
+def _string_categories(s: pd.Series) -> pd.Series:
+    """
+    Słownik kategorii tekstowych jako "string" (braki pd.NA) - union_categoricals wymaga
+    jednego typu słownika, a pliki z różnych źródeł (np. cache i świeży odczyt) mogą się różnić.
+    """
+    cats = s.cat.categories
+    if not pd.api.types.is_string_dtype(cats) or cats.dtype == pd.StringDtype():
+        return s
+    return pd.Series(pd.Categorical.from_codes(s.cat.codes, categories=cats.astype(pd.StringDtype())), index=s.index)
+
+
+def merge_loaded(parts: Sequence[Tuple[LoadedData, np.ndarray]]) -> LoadedData:
+    """(wczytany plik, row_keys) w kolejności plików -> jedna ramka bez duplikatów między plikami."""
+    masks = overlap_masks([keys for _, keys in parts])
+    frames = [loaded.df.loc[~mask] if mask.any() else loaded.df for (loaded, _), mask in zip(parts, masks)]
+    df = concat_frames(frames)
+
+    min_scan = df["Scan"].min()
+    max_scan = df["Scan"].max()
+    return LoadedData(
+        df=df,
+        min_scan=None if pd.isna(min_scan) else min_scan,
+        max_scan=None if pd.isna(max_scan) else max_scan,
+        duplicates=int(sum(mask.sum() for mask in masks)),
+    )
+
+
+def normalize_frame(df: pd.DataFrame) -> LoadedData:
+    """
+    Normalizacja surowych kolumn z arkusza (Scan, scan_date/scan_hour, braki w tekstach,
+    chute/logic_reason z Logic).
+    Ramka jest modyfikowana w miejscu - przekazywać świeżo wczytaną albo kopię.
+    """
     if "Scan" not in df.columns:
         raise RuntimeError("Brak kolumny 'Scan' w XLSX.")
 
     # Ujednolicenie czasu skanowania
-    scan = pd.to_datetime(df["Scan"], errors="coerce")
+    scan = parse_scan(df["Scan"])
 
-    df = df.copy()
+    # ramka jest świeżo zbudowana z wybranych kolumn - bez df.copy()
     df["Scan"] = scan
 
     # Kolumny wymagane przez reports.py
-    df["scan_date"] = scan.dt.date
+    # scan_date jako datetime64 (północ), nie obiekty date Pythona per wiersz
+    df["scan_date"] = scan.dt.floor("D")
     df["scan_hour"] = scan.dt.floor("h")
 
     # zamień braki na czytelne teksty (żeby w Excelu nie było pustych pól)
     df = _fill_missing_text(df)
 
+    # numer zsypu i powód z Logic jako zwarte kolumny (int16 / category)
+    if "Logic" in df.columns:
+        df["chute"], df["logic_reason"] = parse_logic(df["Logic"])
+
     min_scan = scan.min()
     max_scan = scan.max()
 
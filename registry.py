@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, MutableMapping, Optional, Tuple
+
+import pandas as pd
+
+import reports as rpt
+from descriptions import DESCRIPTIONS
+from perf import PerfLog, StageStat, count_rows, timed_call
+from scheduler import SHARED_FRAME, ReportJob, effective_mode, report_pool, run_reports, worker_cached
+
+
+# Domyślne parametry raportu
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "min_total": 50,
+    "base_efficiency": 8500.0,
+    "base_avg_length": 400.0,
+    # arkusze czasowe: "15min", "hour", "shift" albo "day"
+    "granularity": "hour",
+    # początki zmian (HH:MM, co 15 min) dla granularity="shift"
+    "shifts": os.environ.get("BOX_SHIFTS", "06:00,14:00,22:00"),
+    # skrajne paczki: ile ogółem (top/bottom K) i ile w każdym typie opakowania
+    "top_k": 5,
+    "top_k_type": 3,
+}
+
+
+@dataclass(frozen=True)
+class Node:
+    """
+    Węzeł grafu raportu: arkusz (sheet=True) albo wspólny wynik pośredni.
+
+    compute(df, deps, params) - funkcja modułu (picklowalna, tryb "process"):
+      deps   - {nazwa węzła: wynik} dla węzłów z `needs`
+      params - tylko parametry z `params`
+    columns - kolumny danych wejściowych, których węzeł używa bezpośrednio
+    """
+    name: str
+    compute: Callable[[pd.DataFrame, Dict[str, Any], Dict[str, Any]], Any]
+    needs: Tuple[str, ...] = ()
+    columns: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+    sheet: bool = False
+
+
+# --- wyniki pośrednie ---
+
+def _flags(df, deps, params):
+    return rpt.compute_row_flags(df)
+
+
+def _cube(df, deps, params):
+    return rpt.build_cube(df, flags=deps["flags"])
+
+
+def _by_type(df, deps, params):
+    return rpt.finalize_flags(rpt.rollup_cube(deps["cube"], "Package type Barcodes"))
+
+
+def _slots(df, deps, params):
+    return rpt.build_slots(df, flags=deps["flags"])
+
+
+def _by_time(df, deps, params):
+    # jeden podział na przedziały, wspólny dla wszystkich arkuszy czasowych
+    return rpt.finalize_flags(rpt.rollup_slots(deps["slots"], params["granularity"], params["shifts"]))
+
+
+def _problems(df, deps, params):
+    return rpt.problem_subset(df)
+
+
+def _discharge_details(df, deps, params):
+    # trzy arkusze szczegółów z jednego groupby po wierszach zrzutów problemowych
+    return rpt.report_discharge_details(df, problems=deps["problems"])
+
+
+def extreme_k(params: Optional[Dict[str, Any]] = None) -> int:
+    """Ilu kandydatów skrajnych wartości trzymać w grupie - wystarczy na oba zestawienia."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    return max(int(params["top_k"]), int(params["top_k_type"]))
+
+
+def _extreme_candidates(df, deps, params):
+    return rpt.extreme_candidates(df, k=extreme_k(params))
+
+
+def _extremes(df, deps, params):
+    return rpt.extremes_from_candidates(
+        deps["extreme_candidates"], k=int(params["top_k"]), k_type=int(params["top_k_type"]),
+    )
+
+
+def _efficiency(df, deps, params):
+    return rpt.compute_weighted_length_and_efficiency(
+        deps["package_type_share"],
+        base_efficiency=params["base_efficiency"],
+        base_avg_length=params["base_avg_length"],
+    )
+
+
+# --- arkusze ---
+
+def _summary(df, deps, params):
+    vol = pd.to_numeric(df.get("Volume"), errors="coerce")
+    total_mass_g = vol[vol > 0].sum() if vol is not None else 0.0
+    return summary_frame(int(len(df)), total_mass_g, df["Scan"].min(), df["Scan"].max(), deps["efficiency"])
+
+
+def summary_frame(total_rows: int, total_mass_g: float, min_scan, max_scan, efficiency: Tuple) -> pd.DataFrame:
+    """Arkusz summary z gotowych sum (też dla trybu kawałkowego - chunked.py)."""
+    wavg_len, _ = efficiency
+
+    avg_length_mm = float(wavg_len) if pd.notna(wavg_len) else float("nan")
+    total_length_km = (total_rows * avg_length_mm / 1_000_000) if pd.notna(avg_length_mm) else 0.0
+    total_mass_t = float(total_mass_g) / 1_000_000
+
+    if pd.notna(min_scan) and pd.notna(max_scan):
+        scan_min = min_scan.strftime("%Y-%m-%d")
+        scan_max = max_scan.strftime("%Y-%m-%d")
+        scan_label = scan_max if scan_min == scan_max else f"{scan_min} → {scan_max}"
+    else:
+        scan_label = "brak"
+
+    return pd.DataFrame([{
+        "scan": scan_label,
+        "rows": total_rows,
+        "avg_length_mm": round(avg_length_mm, 2) if pd.notna(avg_length_mm) else pd.NA,
+        "total_length_km": round(total_length_km, 2),
+        "total_mass_t": round(total_mass_t, 3),
+    }])
+
+
+def _package_type_share(df, deps, params):
+    return rpt.report_package_type_dims_share(df, by_type=deps["by_type"])
+
+
+def _bad_dims_pct(df, deps, params):
+    return rpt.report_bad_dims_pct(df, by_type=deps["by_type"])
+
+
+def _bad_weight_pct(df, deps, params):
+    return rpt.report_bad_weight_pct(df, by_type=deps["by_type"])
+
+
+def _hourly_dims_measured(df, deps, params):
+    return rpt.report_hourly_dims_measured(df, by_hour=deps["by_time"])
+
+
+def _hourly_weight_measured(df, deps, params):
+    return rpt.report_hourly_weight_measured(df, by_hour=deps["by_time"])
+
+
+def _hourly_loop_nok_ovf(df, deps, params):
+    return rpt.report_hourly_loop_nok_overflow(df, by_hour=deps["by_time"])
+
+
+def _loop_99(df, deps, params):
+    return deps["discharge_details"]["99 Loop"]
+
+
+def _nok_244(df, deps, params):
+    return deps["discharge_details"]["Not Ok 244"]
+
+
+def _overflow_243(df, deps, params):
+    return deps["discharge_details"]["Overflow 243"]
+
+
+def _chute_full(df, deps, params):
+    return rpt.report_chute_full(df, problems=deps["problems"])
+
+
+def _chute_hours(df, deps, params):
+    return rpt.chute_hour_counts(df)
+
+
+def _chute_full_heatmap(df, deps, params):
+    return rpt.report_chute_full_heatmap(deps["chute_hours"])
+
+
+def _problem_share_type(df, deps, params):
+    totals, probs = rpt.cube_problem_counts(deps["cube"])
+    return rpt.problem_share_from_counts(totals, probs, min_total=params["min_total"])
+
+
+def _daily_comparison(df, deps, params):
+    return rpt.report_daily_comparison(deps["cube"])
+
+
+def _hist(df, deps, params):
+    return rpt.build_hist(df)
+
+
+def _dist_by_type(df, deps, params):
+    return rpt.hist_percentiles(deps["hist"], "Package type Barcodes")
+
+
+def _dist_by_hour(df, deps, params):
+    return rpt.hist_percentiles(deps["hist"], "scan_hour")
+
+
+def _hist_by_type(df, deps, params):
+    return rpt.hist_table(deps["hist"], "Package type Barcodes")
+
+
+def _hist_by_hour(df, deps, params):
+    return rpt.hist_table(deps["hist"], "scan_hour")
+
+
+def _top5_heaviest(df, deps, params):
+    return deps["extremes"]["heaviest"]
+
+
+def _top5_lightest(df, deps, params):
+    return deps["extremes"]["lightest"]
+
+
+def _dims_extremes(df, deps, params):
+    return deps["extremes"]["dims"]
+
+
+def _extremes_by_type(df, deps, params):
+    return deps["extremes"]["by_type"]
+
+
+_ROW_COLUMNS = ("Length", "Width", "Height", "Volume", "Discharge")
+
+# Rejestr: arkusze w kolejności arkuszy w XLSX, potem wyniki pośrednie
+NODES: List[Node] = [
+    Node("summary", _summary, needs=("efficiency",), columns=("Scan", "Volume"), sheet=True),
+    Node("package_type_share", _package_type_share, needs=("by_type",), sheet=True),
+    Node("hourly_dims_measured", _hourly_dims_measured, needs=("by_time",), sheet=True),
+    Node("hourly_weight_measured", _hourly_weight_measured, needs=("by_time",), sheet=True),
+    Node("loop_99", _loop_99, needs=("discharge_details",), sheet=True),
+    Node("nok_244", _nok_244, needs=("discharge_details",), sheet=True),
+    Node("overflow_243", _overflow_243, needs=("discharge_details",), sheet=True),
+    Node("hourly_loop_nok_ovf", _hourly_loop_nok_ovf, needs=("by_time",), sheet=True),
+    Node("chute_full", _chute_full, needs=("problems",), sheet=True),
+    Node("chute_full_heatmap", _chute_full_heatmap, needs=("chute_hours",), sheet=True),
+    Node("problem_share_type", _problem_share_type, needs=("cube",), params=("min_total",), sheet=True),
+    Node("bad_dims_pct", _bad_dims_pct, needs=("by_type",), sheet=True),
+    Node("bad_weight_pct", _bad_weight_pct, needs=("by_type",), sheet=True),
+    Node("top5_heaviest", _top5_heaviest, needs=("extremes",), sheet=True),
+    Node("top5_lightest", _top5_lightest, needs=("extremes",), sheet=True),
+    Node("dims_extremes", _dims_extremes, needs=("extremes",), sheet=True),
+    Node("extremes_by_type", _extremes_by_type, needs=("extremes",), sheet=True),
+    Node("dist_by_type", _dist_by_type, needs=("hist",), sheet=True),
+    Node("dist_by_hour", _dist_by_hour, needs=("hist",), sheet=True),
+    Node("hist_by_type", _hist_by_type, needs=("hist",), sheet=True),
+    Node("hist_by_hour", _hist_by_hour, needs=("hist",), sheet=True),
+    Node("daily_comparison", _daily_comparison, needs=("cube",), sheet=True),
+
+    Node("flags", _flags, columns=_ROW_COLUMNS),
+    Node("cube", _cube, needs=("flags",), columns=tuple(rpt.CUBE_KEYS)),
+    Node("by_type", _by_type, needs=("cube",)),
+    Node("slots", _slots, needs=("flags",), columns=("Scan", "Package type Barcodes")),
+    Node("by_time", _by_time, needs=("slots",), params=("granularity", "shifts")),
+    Node("hist", _hist, columns=tuple(rpt.HIST_COLUMNS)),
+    Node("chute_hours", _chute_hours, columns=tuple(rpt.CHUTE_COLUMNS)),
+    Node("problems", _problems, columns=tuple(rpt.PROBLEM_COLUMNS)),
+    Node("discharge_details", _discharge_details, needs=("problems",)),
+    Node(
+        "extreme_candidates", _extreme_candidates,
+        columns=tuple(rpt.EXTREME_COLUMNS), params=("top_k", "top_k_type"),
+    ),
+    Node("extremes", _extremes, needs=("extreme_candidates",), params=("top_k", "top_k_type")),
+    Node(
+        "efficiency", _efficiency,
+        needs=("package_type_share",), params=("base_efficiency", "base_avg_length"),
+    ),
+]
+
+REGISTRY: Dict[str, Node] = {n.name: n for n in NODES}
+
+# Wyniki pośrednie długości ramki: w trybie "process" liczone w workerze, który ich
+# potrzebuje (raz na worker), zamiast przesyłania między procesami
+ROW_LEVEL: Tuple[str, ...] = ("flags",)
+
+# Kolejność arkuszy w XLSX
+SHEET_ORDER: List[str] = [n.name for n in NODES if n.sheet]
+
+
+def _uses_rows(name: str) -> bool:
+    """Czy węzeł (poza kostką) czyta wiersze danych - bezpośrednio lub przez zależności."""
+    node = REGISTRY[name]
+    if name == "cube":
+        return False
+    return bool(node.columns) or any(_uses_rows(dep) for dep in node.needs)
+
+
+# Arkusze liczone wyłącznie z kostki agregatów (evaluate_cube)
+CUBE_SHEETS: List[str] = [name for name in SHEET_ORDER if not _uses_rows(name)]
+
+
+def sheet_descriptions() -> Dict[str, Tuple[str, str, str]]:
+    """Opisy (tekst + pozycja bloku) dla arkuszy z rejestru."""
+    return {name: DESCRIPTIONS[name] for name in SHEET_ORDER if name in DESCRIPTIONS}
+
+
+def resolve(names: Iterable[str]) -> List[str]:
+    """Wszystkie węzły potrzebne do policzenia `names`, w kolejności zależności."""
+    order: List[str] = []
+    visiting: set = set()
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name not in REGISTRY:
+            raise KeyError(f"Nieznany raport/wynik pośredni: {name!r}")
+        if name in visiting:
+            raise RuntimeError(f"Cykl zależności w rejestrze raportów: {name!r}")
+        visiting.add(name)
+        for dep in REGISTRY[name].needs:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def required_columns(names: Iterable[str]) -> List[str]:
+    """Kolumny danych potrzebne do policzenia `names` (np. do przycięcia odczytu)."""
+    cols: List[str] = []
+    for name in resolve(names):
+        for c in REGISTRY[name].columns:
+            if c not in cols:
+                cols.append(c)
+    return cols
+
+
+def _param_key(name: str, params: Dict[str, Any]) -> Tuple:
+    """Parametry wpływające na węzeł - bezpośrednio lub przez zależności."""
+    used = sorted({p for n in resolve([name]) for p in REGISTRY[n].params})
+    return tuple((p, params[p]) for p in used)
+
+
+def memo_key(name: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+    """Klucz wyniku węzła w `memo` dla evaluate (np. do wstawienia gotowego wyniku)."""
+    return (name, _param_key(name, {**DEFAULT_PARAMS, **(params or {})}))
+
+
+class BoundedMemo(OrderedDict):
+    """Słownik z limitem wpisów (LRU) - pamięć wyników węzłów między wywołaniami."""
+
+    def __init__(self, max_items: int = 256):
+        super().__init__()
+        self.max_items = max_items
+        # wspólna między sesjami aplikacji - operacje pod blokadą
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value) -> None:
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > self.max_items:
+                self.popitem(last=False)
+
+
+def _compute_local(df: pd.DataFrame, name: str, deps: Dict[str, Any], params: Dict[str, Any]) -> Any:
+    """
+    Węzeł w procesie roboczym: brakujące zależności (ROW_LEVEL) liczone na miejscu,
+    każda raz na worker. params - wszystkie parametry raportu.
+    """
+    node = REGISTRY[name]
+    deps = dict(deps)
+    for dep in node.needs:
+        if dep not in deps:
+            deps[dep] = worker_cached((dep, _param_key(dep, params)), _compute_local, df, dep, {}, params)
+    return node.compute(df, deps, {p: params[p] for p in node.params})
+
+
+def _job_columns(name: str, local: Iterable[str]) -> Tuple[str, ...]:
+    """Kolumny danych zadania: własne węzła + zależności liczonych w workerze."""
+    cols = list(REGISTRY[name].columns)
+    for dep in REGISTRY[name].needs:
+        if dep in local:
+            cols += [c for c in _job_columns(dep, local) if c not in cols]
+    return tuple(cols)
+
+
+def evaluate(
+    df: pd.DataFrame,
+    names: Optional[Iterable[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    memo: Optional[MutableMapping] = None,
+    mode: str = "thread",
+    max_workers: Optional[int] = None,
+    on_done: Optional[Callable[[str, int, int], None]] = None,
+    perf: Optional[PerfLog] = None,
+) -> Dict[str, Any]:
+    """
+    Liczy tylko wskazane węzły (domyślnie wszystkie arkusze) i ich zależności;
+    każdy wynik pośredni raz. Węzły bez wzajemnych zależności idą razem
+    przez scheduler.run_reports.
+
+    memo: opcjonalna pamięć wyników (klucz: nazwa węzła + użyte parametry, zob. memo_key),
+    np. BoundedMemo trzymana per plik. Zależności węzła z memo nie są liczone.
+    on_done(name, done, total) - postęp po każdym policzonym węźle.
+    perf: opcjonalny PerfLog - pomiar każdego węzła (wyniki z memo jako cached).
+    mode="process": jedna pula i jeden plik ramki na całe wywołanie; węzły ROW_LEVEL
+    (o ile nie są w `names`) liczone w workerach, nie przesyłane.
+    Zwraca {nazwa: wynik} dla `names`.
+    """
+    names = list(SHEET_ORDER if names is None else names)
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    memo = memo if memo is not None else {}
+
+    resolve(names)  # walidacja nazw i cykli
+    values: Dict[str, Any] = {}
+    hits: List[str] = []
+    pending: List[str] = []
+    mode = effective_mode(mode, max_workers)
+    local = {n for n in ROW_LEVEL if n not in names} if mode == "process" else set()
+
+    # zależności schodzimy tylko pod węzłami, których nie ma w memo
+    def visit(name: str) -> None:
+        if name in values or name in pending or name in local:
+            return
+        try:
+            values[name] = memo[(name, _param_key(name, params))]
+        except KeyError:
+            for dep in REGISTRY[name].needs:
+                visit(dep)
+            pending.append(name)
+            return
+        hits.append(name)
+
+    for name in names:
+        visit(name)
+
+    total = len(hits) + len(pending)
+    done = 0
+    for name in hits:
+        if perf is not None:
+            perf.add(StageStat(name, 0.0, 0.0, rows_out=count_rows(values[name]), cached=True))
+        done += 1
+        if on_done:
+            on_done(name, done, total)
+
+    # poziomy grafu: węzeł startuje, gdy wszystkie jego zależności są policzone;
+    # jedna pula na wszystkie poziomy
+    with report_pool(df, mode=mode, max_workers=max_workers) as pool:
+        while pending:
+            ready = [n for n in pending if all(d in values or d in local for d in REGISTRY[n].needs)]
+            jobs = []
+            for name in ready:
+                node = REGISTRY[name]
+                deps = {d: values[d] for d in node.needs if d not in local}
+                if any(d in local for d in node.needs):
+                    func, args = _compute_local, (SHARED_FRAME, name, deps, params)
+                else:
+                    func, args = node.compute, (SHARED_FRAME, deps, {p: params[p] for p in node.params})
+                if perf is not None:
+                    func, args = timed_call, (name, perf.trace_memory, func) + args
+                jobs.append(ReportJob(name, func, args, columns=_job_columns(name, local)))
+
+            def _done(name: str, i: int, n: int) -> None:
+                if on_done:
+                    on_done(name, done + i, total)
+
+            results = run_reports(df, jobs, mode=mode, max_workers=max_workers, on_done=_done, executor=pool)
+            done += len(results)
+
+            for name, value in results.items():
+                if perf is not None:
+                    value, stat = value
+                    perf.add(stat)
+                values[name] = value
+                memo[(name, _param_key(name, params))] = value
+            pending = [n for n in pending if n not in values]
+
+    return {name: values[name] for name in names}
+
+
+def evaluate_cube(
+    cube: pd.DataFrame,
+    names: Optional[Iterable[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Arkusze z CUBE_SHEETS policzone z samej kostki agregatów (rpt.build_cube),
+    bez wierszy danych - np. z kostki wczytanej z cache albo wyciętej przez rpt.slice_cube.
+    """
+    names = list(CUBE_SHEETS if names is None else names)
+    for name in names:
+        if _uses_rows(name):
+            raise ValueError(f"Raport {name!r} wymaga wierszy danych, nie da się go policzyć z kostki.")
+    memo = {memo_key("cube", params): cube}
+    return evaluate(None, names, params=params, memo=memo, mode="serial")
+
+
+def evaluate_parts(
+    values: Dict[str, Any],
+    total_rows: int,
+    total_mass_g: float,
+    min_scan,
+    max_scan,
+    names: Optional[Iterable[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Jak evaluate(df, names, params), ale bez ramki: `values` to gotowe wyniki węzłów
+    czytających wiersze ({nazwa: wynik}, np. z liczników częściowych), arkusz summary
+    składany z podanych sum. Reszta liczy się w rejestrze jak zwykle.
+    """
+    names = list(SHEET_ORDER if names is None else names)
+    memo: Dict[Any, Any] = {memo_key(name, params): value for name, value in values.items()}
+
+    # summary potrzebuje średniej długości (efficiency) - liczonej z package_type_share
+    efficiency = evaluate(None, ["efficiency"], params=params, memo=memo, mode="serial")["efficiency"]
+    memo[memo_key("summary", params)] = summary_frame(total_rows, total_mass_g, min_scan, max_scan, efficiency)
+    return evaluate(None, names, params=params, memo=memo, mode="serial")
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
 import pandas as pd
 
+from processing import NO_CHUTE, parse_logic
+
 
 DISCHARGES = ["99 Loop", "Not Ok 244", "Overflow 243"]
 
@@ -14,21 +19,415 @@ def _get_package_type_col(df: pd.DataFrame) -> str:
     raise KeyError("Brak kolumny 'Package type Barcodes' lub 'package_type'.")
 
 
-def report_bad_dims_pct(df: pd.DataFrame) -> pd.DataFrame:
-    type_col = _get_package_type_col(df)
-    g = df.groupby(type_col, dropna=False)
+def _str_contains(s: pd.Series, pat: str) -> pd.Series:
+    """
+    str.contains bez regex; dla kolumn category sprawdza tylko wartości unikalne
+    i mapuje wynik z powrotem przez kody.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        hit = s.cat.categories.astype("string").str.contains(pat, regex=False).to_numpy(dtype=bool)
+        codes = s.cat.codes.to_numpy()
+        if not len(hit):
+            return pd.Series(False, index=s.index)
+        return pd.Series((codes >= 0) & hit[codes], index=s.index)
+    return s.astype("string").str.contains(pat, regex=False, na=False)
+
+
+def _key_codes(frame: pd.DataFrame, keys: Sequence[str]):
+    """
+    Klucze `keys` złożone w jeden klucz int64 (kody kategorii albo pd.factorize,
+    braki na końcu jak grupa NaN w groupby) + opis poziomów do odtworzenia wartości.
+    None, gdy iloczyn słowników nie mieści się w int64.
+    """
+    codes_list = []
+    levels = []
+    radix = 1
+    for k in keys:
+        s = frame[k]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy().astype(np.int64)
+            level = s.dtype
+            n = len(s.dtype.categories)
+        else:
+            codes, level = pd.factorize(s, sort=True)
+            codes = codes.astype(np.int64)
+            n = len(level)
+        codes[codes < 0] = n
+        codes_list.append(codes)
+        levels.append((k, level, n))
+        radix *= n + 1
+
+    if radix >= 2**63:
+        return None
+    key = np.zeros(len(frame), dtype=np.int64)
+    for codes, (_, _, n) in zip(codes_list, levels):
+        key = key * (n + 1) + codes
+    return key, levels
+
+
+def group_ids(frame: pd.DataFrame, keys: Sequence[str]) -> np.ndarray:
+    """Numer grupy (0..G-1, w kolejności posortowanych kluczy) dla każdego wiersza."""
+    packed = _key_codes(frame, keys)
+    if packed is None:
+        return frame.groupby(list(keys), dropna=False, observed=True, sort=True).ngroup().to_numpy()
+    return np.unique(packed[0], return_inverse=True)[1].reshape(-1)
+
+
+def count_by(
+    frame: pd.DataFrame,
+    keys: Sequence[str],
+    value: Optional[str] = None,
+    name: str = "items_count",
+) -> pd.DataFrame:
+    """
+    Liczba wierszy (albo suma kolumny `value`) po kluczach `keys`, jak
+    groupby(keys, dropna=False, observed=True) - ale bez groupby: klucze zamieniane są
+    na kody (kategorie - gotowe kody, reszta - pd.factorize), składane w jeden klucz int64
+    i zliczane przez np.unique + np.bincount. Przy wielu kluczach i dużych słownikach
+    (Chunk Id) wielokrotnie szybsze. Kolejność grup i typy kolumn jak w groupby na kategoriach.
+    """
+    packed = _key_codes(frame, keys)
+    if packed is None:
+        return _count_by_groupby(frame, keys, value, name)
+
+    key, levels = packed
+    groups, inverse = np.unique(key, return_inverse=True)
+    if value is None:
+        totals = np.bincount(inverse, minlength=len(groups))
+    else:
+        values = frame[value]
+        totals = np.bincount(inverse, weights=values.to_numpy(dtype=np.float64), minlength=len(groups))
+        if values.dtype.kind in "iu":
+            totals = totals.round().astype(values.dtype)
+
+    columns = {}
+    for k, level, n in reversed(levels):
+        groups, codes = np.divmod(groups, n + 1)
+        if isinstance(level, pd.CategoricalDtype):
+            columns[k] = pd.Categorical.from_codes(np.where(codes >= n, -1, codes), dtype=level)
+        else:
+            if (codes >= n).any():
+                level = level.insert(n, np.nan)
+            columns[k] = level.take(codes)
+    out = pd.DataFrame({k: columns[k] for k in keys})
+    out[name] = totals
+    return out
+
+
+def _count_by_groupby(
+    frame: pd.DataFrame,
+    keys: Sequence[str],
+    value: Optional[str],
+    name: str,
+) -> pd.DataFrame:
+    # gdy iloczyn słowników nie mieści się w int64 - groupby na kodach kategorii
+    arrays = []
+    cats = {}
+    for k in keys:
+        s = frame[k]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy().astype(np.int64)
+            codes[codes < 0] = len(s.cat.categories)
+            cats[k] = s.dtype
+            arrays.append(pd.Series(codes, index=frame.index, name=k))
+        else:
+            arrays.append(s)
+
+    g = frame.groupby(arrays, dropna=False, sort=True)
+    out = (g.size() if value is None else g[value].sum()).rename(name).reset_index()
+    for k, dtype in cats.items():
+        codes = out[k].to_numpy()
+        codes = np.where(codes >= len(dtype.categories), -1, codes)
+        out[k] = pd.Categorical.from_codes(codes, dtype=dtype)
+    return out
+
+
+# Kolumny z wartościami > 0 (reszta -> NaN), z których liczymy średnie
+_POSITIVE_COLS = {
+    "Length": "length_pos",
+    "Width": "width_pos",
+    "Height": "height_pos",
+    "Volume": "weight_pos",
+}
+
+# Flagi zliczane w problemach (Discharge)
+_DISCHARGE_FLAGS = {
+    "99 Loop": "is_loop",
+    "Not Ok 244": "is_nok",
+    "Overflow 243": "is_overflow",
+}
+
+
+def compute_row_flags(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Wektorowe flagi wierszy liczone RAZ dla całej ramki (zamiast lambd per grupa):
+    - dims_ok / dims_bad: Length, Width, Height > 0 (NaN i <= 0 to brak pomiaru)
+    - weight_ok / weight_bad: Volume > 0
+    - *_pos: wartość > 0 albo NaN (do średnich tylko z poprawnych pomiarów)
+    - is_loop / is_nok / is_overflow: trafienia do zrzutni problemowych
+    Brakujące kolumny źródłowe są pomijane.
+    """
+    flags = pd.DataFrame(index=df.index)
+
+    nums = {}
+    for col, pos_col in _POSITIVE_COLS.items():
+        if col not in df.columns:
+            continue
+        s = pd.to_numeric(df[col], errors="coerce")
+        nums[col] = s
+        flags[pos_col] = s.where(s > 0)
+
+    if all(c in nums for c in ["Length", "Width", "Height"]):
+        dims_ok = (nums["Length"] > 0) & (nums["Width"] > 0) & (nums["Height"] > 0)
+        flags["dims_ok"] = dims_ok
+        flags["dims_bad"] = ~dims_ok
+
+    if "Volume" in nums:
+        weight_ok = nums["Volume"] > 0
+        flags["weight_ok"] = weight_ok
+        flags["weight_bad"] = ~weight_ok
+
+    if "Discharge" in df.columns:
+        for discharge, flag_col in _DISCHARGE_FLAGS.items():
+            flags[flag_col] = df["Discharge"] == discharge
+
+    return flags
+
+
+def aggregate_flags_partial(
+    df: pd.DataFrame,
+    by: Union[str, Sequence[str]],
+    flags: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Sumowalne liczniki po kluczu `by` - kolumnie lub liście kolumn / nazwanych Series
+    (jedno przejście groupby):
+    - total_items = size, sum dla flag
+    - dla kolumn *_pos: suma (<kol>) i liczba poprawnych wartości (<kol>_n)
+    Częściowe wyniki z kilku kawałków danych łączy się sumą po kluczu
+    (zob. chunked.py), a finalize_flags zamienia je na średnie.
+    """
+    if flags is None:
+        flags = compute_row_flags(df)
 
-    bad = g.apply(
-        lambda x: (
-            (x["Length"].isna() | x["Width"].isna() | x["Height"].isna())
-            | (x["Length"] <= 0) | (x["Width"] <= 0) | (x["Height"] <= 0)
-        ).sum(),
-        include_groups=False,
+    keys = [df[by]] if isinstance(by, str) else [k if isinstance(k, pd.Series) else df[k] for k in by]
+    # observed=True: dla kolumn category tylko występujące wartości (grupowanie po kodach)
+    g = flags.groupby(keys, dropna=False, observed=True)
+
+    pos_cols = [c for c in flags.columns if c.endswith("_pos")]
+    flag_cols = [c for c in flags.columns if c not in pos_cols]
+
+    out = pd.concat(
+        [
+            g.size().rename("total_items"),
+            g[flag_cols].sum(),
+            g[pos_cols].sum(),
+            g[pos_cols].count().add_suffix("_n"),
+        ],
+        axis=1,
     )
+    out.index.names = [by] if isinstance(by, str) else [k.name if isinstance(k, pd.Series) else k for k in by]
+    return out
+
+
+def finalize_flags(partial: pd.DataFrame) -> pd.DataFrame:
+    """Liczniki z aggregate_flags_partial -> wynik aggregate_flags (średnie *_pos)."""
+    pos_cols = [c for c in partial.columns if c.endswith("_pos")]
+    count_cols = [f"{c}_n" for c in pos_cols]
+    flag_cols = [c for c in partial.columns if c not in pos_cols and c not in count_cols and c != "total_items"]
+
+    out = partial[["total_items"] + flag_cols].copy()
+    for c in pos_cols:
+        n = partial[f"{c}_n"]
+        out[c] = (partial[c] / n).where(n > 0)
+    return out
 
-    total = g.size()
+
+def aggregate_flags(
+    df: pd.DataFrame,
+    by: str,
+    flags: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Jedno przejście groupby po kluczu `by` z wbudowanymi agregacjami:
+    - sum dla flag (liczniki)
+    - mean dla kolumn *_pos (średnie tylko z wartości > 0)
+    - total_items = size
+    Wynik: indeks = wartości klucza (posortowane, NaN jako osobna grupa).
+    """
+    return finalize_flags(aggregate_flags_partial(df, by, flags=flags))
+
+
+# Klucze kostki agregatów: godzina x typ opakowania x discharge
+CUBE_KEYS = ["scan_hour", "Package type Barcodes", "Discharge"]
+# Wersja logiki kostki (build_cube, compute_row_flags, aggregate_flags_partial) - podbić
+# przy każdej jej zmianie, żeby kostki zapisane w cache (cache.cube_cached) przestały być używane
+CUBE_VERSION = 1
+
+
+def build_cube(df: pd.DataFrame, flags: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Kostka agregatów: liczniki z aggregate_flags_partial dla każdej występującej
+    kombinacji CUBE_KEYS, posortowana po godzinie. Raporty per typ / godzina /
+    problem liczone są z kostki (rollup_cube) bez ponownego czytania wierszy;
+    kostkę można zapisać (cache.ParsedCache.put_cube) i kroić (slice_cube).
+    """
+    cube = aggregate_flags_partial(df, CUBE_KEYS, flags=flags).reset_index()
+    return cube.sort_values("scan_hour", kind="stable").reset_index(drop=True)
+
+
+def rollup_cube(cube: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Kostka -> liczniki jak aggregate_flags_partial(df, by) (do finalize_flags)."""
+    values = [c for c in cube.columns if c not in CUBE_KEYS]
+    out = cube.groupby(by, dropna=False, observed=True)[values].sum()
+    out.index.name = by
+    return out
+
+
+def cube_problem_counts(cube: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Jak problem_counts(df), ale z kostki."""
+    totals = rollup_cube(cube, "Package type Barcodes")[["total_items"]].reset_index()
+    probs = (
+        cube.loc[cube["Discharge"].isin(DISCHARGES)]
+        .groupby(["Package type Barcodes", "Discharge"], dropna=False, observed=True)["total_items"]
+        .sum()
+        .rename("problem_items")
+        .reset_index()
+    )
+    return totals, probs
+
+
+def hour_bounds(hours: np.ndarray, start=None, end=None) -> tuple[int, int]:
+    """
+    Pozycje [lo, hi) w posortowanej tablicy godzin (NaT na końcu) dla zakresu [start, end)
+    - binary search. Przy jakimkolwiek ograniczeniu czasu wiersze bez daty (NaT) odpadają.
+    """
+    if start is None and end is None:
+        return 0, len(hours)
+    valid = len(hours) - int(np.isnat(hours).sum())
+    lo = int(hours[:valid].searchsorted(np.datetime64(pd.Timestamp(start)), "left")) if start is not None else 0
+    hi = int(hours[:valid].searchsorted(np.datetime64(pd.Timestamp(end)), "left")) if end is not None else valid
+    return lo, max(lo, hi)
+
+
+def slice_cube(
+    cube: pd.DataFrame,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    types: Optional[Sequence[str]] = None,
+    time_col: str = "scan_hour",
+) -> pd.DataFrame:
+    """
+    Wycinek kostki: godziny w [start, end) i wybrane typy opakowań (None = wszystkie).
+    Kostka z build_cube jest posortowana po scan_hour (build_slots po scan_slot -
+    time_col) - zakres czasu przez hour_bounds.
+    """
+    lo, hi = hour_bounds(cube[time_col].to_numpy(), start, end)
+    out = cube.iloc[lo:hi]
+    if types is not None:
+        out = out.loc[out["Package type Barcodes"].isin(list(types))]
+    return out.reset_index(drop=True)
+
+
+# Ziarnistość arkuszy czasowych -> nazwa kolumny czasu w arkuszu
+TIME_COLUMNS = {
+    "15min": "scan_15min",
+    "hour": "scan_hour",
+    "shift": "shift_start",
+    "day": "scan_day",
+}
+# Najdrobniejszy przedział - z niego składane są pozostałe (build_slots)
+SLOT = pd.Timedelta(minutes=15)
+
+
+def parse_shifts(text: str) -> list[pd.Timedelta]:
+    """
+    "06:00,14:00,22:00" -> godziny rozpoczęcia zmian (posortowane, od północy).
+    Granice muszą wypadać na pełny kwadrans (składane z przedziałów 15 min).
+    """
+    starts = []
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        hh, _, mm = part.partition(":")
+        start = pd.Timedelta(hours=int(hh), minutes=int(mm or 0))
+        if not pd.Timedelta(0) <= start < pd.Timedelta(days=1) or start % SLOT:
+            raise ValueError(f"Nieprawidłowy początek zmiany: {part!r} (HH:MM, co 15 min).")
+        starts.append(start)
+    if not starts:
+        raise ValueError("Brak początków zmian.")
+    return sorted(set(starts))
+
+
+def time_buckets(times: pd.Series, granularity: str = "hour", shifts: str = "06:00,14:00,22:00") -> pd.Series:
+    """
+    Początek przedziału czasu dla każdej wartości `times` (jedno wektorowe przejście):
+    15 min / godzina / zmiana (początki z `shifts`) / doba. NaT zostaje NaT.
+    """
+    times = pd.Series(times)
+    if granularity == "15min":
+        return times.dt.floor("15min")
+    if granularity == "hour":
+        return times.dt.floor("h")
+    if granularity == "day":
+        return times.dt.floor("D")
+    if granularity != "shift":
+        raise ValueError(f"Nieznana ziarnistość czasu: {granularity!r} (dostępne: {', '.join(TIME_COLUMNS)}).")
+
+    # doba liczona od początku pierwszej zmiany, potem binary search po początkach zmian
+    starts = parse_shifts(shifts)
+    first = starts[0]
+    rel_starts = np.array([(s - first).value for s in starts], dtype=np.int64)
+    rel = times - first
+    day = rel.dt.floor("D")
+    offset = (rel - day).to_numpy(dtype="timedelta64[ns]").astype(np.int64)
+    idx = np.clip(rel_starts.searchsorted(offset, side="right") - 1, 0, None)
+    return day + first + pd.to_timedelta(rel_starts[idx], unit="ns")
+
+
+def build_slots(df: pd.DataFrame, flags: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Liczniki z aggregate_flags_partial po (przedział 15 min, typ opakowania), posortowane
+    po czasie. Wszystkie arkusze czasowe (każda ziarnistość) to zwinięcie tej ramki
+    (rollup_slots) - Scan dzielony na przedziały raz.
+    """
+    slot = df["Scan"].dt.floor("15min").rename("scan_slot")
+    out = aggregate_flags_partial(df, [slot, "Package type Barcodes"], flags=flags).reset_index()
+    return out.sort_values("scan_slot", kind="stable").reset_index(drop=True)
+
+
+def rollup_slots(slots: pd.DataFrame, granularity: str = "hour", shifts: str = "06:00,14:00,22:00") -> pd.DataFrame:
+    """build_slots -> liczniki po przedziałach `granularity` (do finalize_flags)."""
+    # przedział liczony tylko dla różnych wartości scan_slot (kilkadziesiąt-kilkaset na dobę)
+    uniq = pd.Series(slots["scan_slot"].unique())
+    buckets = time_buckets(uniq, granularity, shifts)
+    codes = pd.Index(uniq).get_indexer(slots["scan_slot"])
+    key = pd.Series(buckets.to_numpy()[codes], index=slots.index, name=TIME_COLUMNS[granularity])
+
+    values = [c for c in slots.columns if c not in ("scan_slot", "Package type Barcodes")]
+    return slots[values].groupby(key, dropna=False).sum()
+
+
+def _check_columns(agg: pd.DataFrame, cols: list[str], source: str) -> None:
+    for c in cols:
+        if c not in agg.columns:
+            raise KeyError(f"Brak kolumny '{source}' w danych.")
+
+
+def report_bad_dims_pct(df: pd.DataFrame, by_type: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    by_type: opcjonalnie gotowy wynik aggregate_flags(df, <kolumna typu>),
+    żeby kilka raportów korzystało z jednego groupby.
+    """
+    if by_type is None:
+        by_type = aggregate_flags(df, _get_package_type_col(df))
+    _check_columns(by_type, ["dims_bad"], "Length/Width/Height")
+
+    bad = by_type["dims_bad"]
+    total = by_type["total_items"]
     out = pd.DataFrame({
-        "type": total.index,
+        "type": by_type.index,
         "bad_measurements": bad.values,
         "total_items": total.values,
         "pct_bad": (bad.values / total.values * 100.0)
@@ -38,19 +437,17 @@ def report_bad_dims_pct(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def report_bad_weight_pct(df: pd.DataFrame) -> pd.DataFrame:
-    type_col = _get_package_type_col(df)
-    g = df.groupby(type_col, dropna=False)
-
+def report_bad_weight_pct(df: pd.DataFrame, by_type: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    if by_type is None:
+        by_type = aggregate_flags(df, _get_package_type_col(df))
     # UWAGA: zostawiamy "Volume" (tak jest nazwane w systemie)
-    bad = g.apply(
-        lambda x: (x["Volume"].isna() | (x["Volume"] <= 0)).sum(),
-        include_groups=False,
-    )
-    total = g.size()
+    _check_columns(by_type, ["weight_bad"], "Volume")
+
+    bad = by_type["weight_bad"]
+    total = by_type["total_items"]
 
     out = pd.DataFrame({
-        "type": total.index,
+        "type": by_type.index,
         "bad_weight": bad.values,
         "total_items": total.values,
         "pct_bad_weight": (bad.values / total.values * 100.0)
@@ -60,7 +457,7 @@ def report_bad_weight_pct(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def report_package_type_dims_share(df: pd.DataFrame) -> pd.DataFrame:
+def report_package_type_dims_share(df: pd.DataFrame, by_type: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
     Odpowiednik SQL z v_box_shift:
     - grupowanie po package_type
@@ -69,24 +466,18 @@ def report_package_type_dims_share(df: pd.DataFrame) -> pd.DataFrame:
     - pct_share w całym wolumenie
     - 'brak pomiaru' gdy średnia = NaN
     """
-    type_col = _get_package_type_col(df)
-
-    # bezpiecznie: konwersja na numery
-    work = df.copy()
-    for col in ["Length", "Width", "Height"]:
-        if col in work.columns:
-            work[col] = pd.to_numeric(work[col], errors="coerce")
-
-    g = work.groupby(type_col, dropna=False)
+    if by_type is None:
+        by_type = aggregate_flags(df, _get_package_type_col(df))
 
-    out = g.agg(
-        avg_length=("Length", lambda s: s[s > 0].mean()),
-        avg_width=("Width",  lambda s: s[s > 0].mean()),
-        avg_height=("Height", lambda s: s[s > 0].mean()),
-        items_count_all=(type_col, "size"),
-    ).reset_index()
+    out = pd.DataFrame(index=by_type.index)
+    for col, pos_col in [("avg_length", "length_pos"), ("avg_width", "width_pos"), ("avg_height", "height_pos")]:
+        # brak kolumny w danych -> brak pomiaru dla wszystkich typów
+        out[col] = by_type[pos_col] if pos_col in by_type.columns else float("nan")
+    out["items_count_all"] = by_type["total_items"]
+    out.index.name = "package_type"
+    out = out.reset_index()
 
-    total_count = len(work)
+    total_count = int(by_type["total_items"].sum())
     out["pct_share"] = (100.0 * out["items_count_all"] / total_count).round(2) if total_count else pd.NA
 
     # -> tekst z przecinkiem + "brak pomiaru"
@@ -98,7 +489,6 @@ def report_package_type_dims_share(df: pd.DataFrame) -> pd.DataFrame:
             else f"{x:.2f}".replace(".", ",")
         )
 
-    out = out.rename(columns={type_col: "package_type"})
     out = out.sort_values("items_count_all", ascending=False).reset_index(drop=True)
     return out
 
@@ -110,12 +500,51 @@ def report_hourly_weight(df: pd.DataFrame) -> pd.DataFrame:
     return report_package_type_dims_share(df)
 
 
-def report_discharge_detail(df: pd.DataFrame, discharge: str) -> pd.DataFrame:
-    sub = df[df["Discharge"] == discharge].copy()
+# Klucze szczegółów zrzutów problemowych
+DETAIL_KEYS = ["scan_date", "Chunk Id", "Package type Barcodes", "Discharge"]
+
+
+# Kolumny wierszy zrzutów problemowych potrzebne arkuszom szczegółów i chute_full
+PROBLEM_COLUMNS = DETAIL_KEYS + ["Logic", "logic_reason"]
+
+
+def problem_subset(df: pd.DataFrame, columns: Sequence[str] = PROBLEM_COLUMNS) -> pd.DataFrame:
+    """
+    Wiersze zrzutów problemowych (Discharge w DISCHARGES) - jedno isin na kodach kategorii,
+    tylko potrzebne kolumny. Wspólne dla szczegółów zrzutów i chute_full.
+    """
+    cols = [c for c in columns if c in df.columns]
+    return df.loc[df["Discharge"].isin(DISCHARGES), cols]
+
+
+def discharge_detail_counts(df: pd.DataFrame, discharge: str) -> pd.DataFrame:
+    """Liczniki (scan_date, chunk, typ, discharge) - sumowalne między kawałkami danych."""
+    return count_by(df.loc[df["Discharge"] == discharge, DETAIL_KEYS], DETAIL_KEYS)
+
+
+def discharge_detail_counts_all(
+    problems: pd.DataFrame,
+    keys: Sequence[str] = DETAIL_KEYS,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Jak discharge_detail_counts dla każdego z DISCHARGES, ale jednym groupby (na kodach)
+    po wierszach z problem_subset, rozdzielonym potem po Discharge. Brak wierszy
+    danego zrzutu -> pusta ramka z tymi samymi kolumnami.
+    """
+    rest = [k for k in keys if k != "Discharge"]
+    # Discharge pierwszym kluczem: grupy jednego zrzutu leżą obok siebie, w kolejności `keys`
+    counts = count_by(problems, ["Discharge"] + rest)
+    counts = counts[list(keys) + ["items_count"]]
+    parts = {
+        str(d): part.reset_index(drop=True)
+        for d, part in counts.groupby("Discharge", observed=True, sort=False)
+    }
+    return {d: parts.get(d, counts.iloc[:0]) for d in DISCHARGES}
+
+
+def discharge_detail_from_counts(counts: pd.DataFrame) -> pd.DataFrame:
     out = (
-        sub.groupby(["scan_date", "Chunk Id", "Package type Barcodes", "Discharge"], dropna=False)
-        .size()
-        .reset_index(name="items_count")
+        counts
         .rename(columns={
             "Chunk Id": "chunk",
             "Package type Barcodes": "package_type",
@@ -124,122 +553,464 @@ def report_discharge_detail(df: pd.DataFrame, discharge: str) -> pd.DataFrame:
         .sort_values(["discharge", "items_count"], ascending=[True, False])
         .reset_index(drop=True)
     )
+    # scan_date trzymamy jako datetime64 - w arkuszu sama data (jak dotąd)
+    if pd.api.types.is_datetime64_any_dtype(out["scan_date"]):
+        out["scan_date"] = _to_dates(out["scan_date"])
     return out
 
 
-def report_hourly_loop_nok_overflow(df: pd.DataFrame) -> pd.DataFrame:
+def _to_dates(s: pd.Series) -> pd.Series:
+    """Jak s.dt.date, ale obiekty date tworzone tylko dla dni unikalnych (kilka na plik)."""
+    codes, days = pd.factorize(s)
+    # kod -1 (NaT) -> ostatni element
+    dates = np.append(np.asarray(days.date, dtype=object), pd.NaT)
+    return pd.Series(dates[codes], index=s.index, name=s.name)
+
+
+def report_discharge_detail(df: pd.DataFrame, discharge: str) -> pd.DataFrame:
+    return discharge_detail_from_counts(discharge_detail_counts(df, discharge))
+
+
+def report_discharge_details(
+    df: pd.DataFrame,
+    problems: Optional[pd.DataFrame] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    report_discharge_detail dla wszystkich DISCHARGES naraz ({discharge: arkusz}).
+    problems: opcjonalnie gotowy problem_subset(df).
+    """
+    if problems is None:
+        problems = problem_subset(df)
+    return {d: discharge_detail_from_counts(c) for d, c in discharge_detail_counts_all(problems).items()}
+
+
+def _time_col(by_time: pd.DataFrame) -> str:
+    """Kolumna czasu arkusza czasowego - nazwa indeksu agregatu (scan_hour, scan_15min, ...)."""
+    return by_time.index.name or "scan_hour"
+
+
+def report_hourly_loop_nok_overflow(df: pd.DataFrame, by_hour: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    by_hour: opcjonalnie gotowy agregat po przedziałach czasu (finalize_flags(rollup_slots(...)))
+    - kolumna czasu w wyniku to nazwa jego indeksu. Tak samo w report_hourly_*_measured.
+    """
+    if by_hour is None:
+        by_hour = aggregate_flags(df, "scan_hour")
+    _check_columns(by_hour, ["is_loop", "is_nok", "is_overflow"], "Discharge")
+
     out = (
-        df.groupby("scan_hour", dropna=False)
-        .agg(
-            total_items=("scan_hour", "size"),
-            loop_99_count=("Discharge", lambda s: (s == "99 Loop").sum()),
-            overflow_243_count=("Discharge", lambda s: (s == "Overflow 243").sum()),
-            nok_count=("Discharge", lambda s: (s == "Not Ok 244").sum()),
-        )
+        pd.DataFrame({
+            "total_items": by_hour["total_items"],
+            "loop_99_count": by_hour["is_loop"],
+            "overflow_243_count": by_hour["is_overflow"],
+            "nok_count": by_hour["is_nok"],
+        })
         .reset_index()
-        .sort_values("scan_hour")
+        .sort_values(_time_col(by_hour))
         .reset_index(drop=True)
     )
     return out
 
 
-
-def report_hourly_weight_measured(df: pd.DataFrame) -> pd.DataFrame:
+def report_hourly_weight_measured(df: pd.DataFrame, by_hour: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
     Godzinowa jakość ważenia na podstawie kolumny 'Volume' (masa w gramach).
     measured_items: Volume > 0
     unmeasured_items: Volume is NaN lub <= 0
     """
-    if "Volume" not in df.columns:
-        raise KeyError("Brak kolumny 'Volume' w danych.")
+    if by_hour is None:
+        if "Volume" not in df.columns:
+            raise KeyError("Brak kolumny 'Volume' w danych.")
+        by_hour = aggregate_flags(df, "scan_hour")
+    _check_columns(by_hour, ["weight_ok", "weight_bad", "weight_pos"], "Volume")
 
-    g = df.groupby("scan_hour", dropna=False)
-
-    out = g.agg(
-        avg_weight_g=("Volume", lambda s: s[s > 0].mean()),
-        total_items=("scan_hour", "size"),
-        measured_items=("Volume", lambda s: (s > 0).sum()),
-        unmeasured_items=("Volume", lambda s: (s.isna() | (s <= 0)).sum()),
-    ).reset_index()
+    out = pd.DataFrame({
+        "avg_weight_g": by_hour["weight_pos"],
+        "total_items": by_hour["total_items"],
+        "measured_items": by_hour["weight_ok"],
+        "unmeasured_items": by_hour["weight_bad"],
+    }).reset_index()
 
     out["pct_unmeasured"] = (out["unmeasured_items"] / out["total_items"] * 100.0).round(2)
-    out = out.sort_values("scan_hour").reset_index(drop=True)
+    out = out.sort_values(_time_col(by_hour)).reset_index(drop=True)
     return out
 
 
-def report_top5_weight_extremes(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+def report_daily_comparison(cube: pd.DataFrame) -> pd.DataFrame:
     """
-    Zwraca (top5_najciezsze, top5_najlzejsze) dla Volume > 0.
-    Kolumny: chunk, type, volume.
+    Porównanie dób (np. przy analizie kilku plików): wolumen, udział w całości i odchylenie
+    od średniej doby, średnie wymiary/masa, braki pomiarów i zrzuty problemowe (liczby + %).
+    Z kostki agregatów - doba = scan_hour obcięte do północy; wiersze bez daty pomijane.
     """
-    if "Volume" not in df.columns:
-        raise KeyError("Brak kolumny 'Volume' w danych.")
-    # używamy oryginalnych nazw, żeby działało na surowym df z load_xlsx
-    cols = ["Chunk Id", "Package type Barcodes", "Volume"]
-    for c in cols:
+    values = [c for c in cube.columns if c not in CUBE_KEYS]
+    day = pd.to_datetime(cube["scan_hour"]).dt.floor("D").rename("scan_date")
+    by_day = finalize_flags(cube.groupby(day, sort=True)[values].sum())
+    total = by_day["total_items"]
+
+    def _pct(col: str) -> pd.Series:
+        if col not in by_day.columns:
+            return pd.Series(float("nan"), index=by_day.index)
+        return (by_day[col] / total * 100.0).round(2)
+
+    out = pd.DataFrame({
+        "total_items": total,
+        "pct_of_total": (total / total.sum() * 100.0).round(2) if len(total) else total,
+        "vs_avg_day_pct": ((total / total.mean() - 1.0) * 100.0).round(2) if len(total) else total,
+    })
+    for col, pos_col in [("avg_length_mm", "length_pos"), ("avg_weight_g", "weight_pos")]:
+        out[col] = by_day[pos_col].round(2) if pos_col in by_day.columns else float("nan")
+    out["pct_dims_unmeasured"] = _pct("dims_bad")
+    out["pct_weight_unmeasured"] = _pct("weight_bad")
+    for flag, name in [("is_loop", "loop_99"), ("is_nok", "nok_244"), ("is_overflow", "overflow_243")]:
+        out[f"{name}_count"] = by_day[flag] if flag in by_day.columns else 0
+        out[f"pct_{name}"] = _pct(flag)
+    return out.reset_index()
+
+
+# Miary paczki (skrajne wartości, rozkłady): kolumna danych -> nazwa w arkuszach
+MEASURES = {"Volume": "weight_g", "Length": "length_mm", "Width": "width_mm", "Height": "height_mm"}
+EXTREME_COLUMNS = ["Chunk Id", "Package type Barcodes"] + list(MEASURES)
+_EXTREME_KIND = {True: "max", False: "min"}
+
+
+def top_k_positions(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Pozycje k największych (largest=True) albo najmniejszych wartości, od skrajnej.
+    Jak stabilne sort_values + head(k) (przy równych wartościach wcześniejsza pozycja),
+    ale przez np.partition - O(n) - i sortowanie tylko wybranych k. NaN pomijane.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(v))
+    if k <= 0 or not len(valid):
+        return np.empty(0, dtype=np.intp)
+    key = -v[valid] if largest else v[valid]
+    if k < len(key):
+        # próg = k-ta wartość; wszystko przed progiem + najwcześniejsze równe progowi
+        threshold = np.partition(key, k - 1)[k - 1]
+        above = np.flatnonzero(key < threshold)
+        at = np.flatnonzero(key == threshold)[: k - len(above)]
+        pos = np.concatenate([above, at])
+    else:
+        pos = np.arange(len(key))
+    pos = pos[np.lexsort((pos, key[pos]))]
+    return valid[pos]
+
+
+def _measure_values(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Miara jako float; braki i wartości <= 0 (niezmierzone) jako NaN."""
+    v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(v > 0, v, np.nan)
+
+
+def extreme_candidates(
+    df: pd.DataFrame,
+    k: int = 5,
+    keys: Sequence[str] = ("Package type Barcodes",),
+    row_offset: int = 0,
+) -> pd.DataFrame:
+    """
+    Kandydaci top/bottom k: w każdej grupie `keys` po k największych i najmniejszych
+    wartości każdej miary (MEASURES, tylko > 0). Wystarczają do policzenia
+    skrajnych wartości ogółem i per typ (extremes_from_candidates) - także po złożeniu
+    kandydatów z kolejnych partii, plików czy godzin.
+
+    Jedno przejście: numery grup z kodów kluczy, stabilny argsort po numerze grupy
+    (wiersze grupy zostają w kolejności pliku) i wybór częściowy w każdej grupie.
+    Kolumna `_row` - numer wiersza w danych (+ row_offset); jeśli już jest, zostaje.
+    """
+    measures = [c for c in MEASURES if c in df.columns]
+    if not measures:
+        raise KeyError("Brak kolumn Volume/Length/Width/Height w danych.")
+    keys = list(keys)
+    cols = list(dict.fromkeys(keys + [c for c in EXTREME_COLUMNS if c in df.columns]))
+    values = {c: _measure_values(df, c) for c in measures}
+
+    picked = []
+    if len(df):
+        gid = group_ids(df, keys)
+        order = np.argsort(gid, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(gid))])
+        for g in range(len(bounds) - 1):
+            seg = order[bounds[g]:bounds[g + 1]]
+            if len(seg) <= k:
+                picked.append(seg)
+                continue
+            for c in measures:
+                v = values[c][seg]
+                picked.append(seg[top_k_positions(v, k, largest=True)])
+                picked.append(seg[top_k_positions(v, k, largest=False)])
+    rows = np.unique(np.concatenate(picked)) if picked else np.empty(0, dtype=np.intp)
+    # wiersze bez żadnej zmierzonej wartości nie są kandydatami
+    measured = np.zeros(len(rows), dtype=bool)
+    for c in measures:
+        measured |= ~np.isnan(values[c][rows])
+    rows = rows[measured]
+
+    out = df.iloc[rows][cols].reset_index(drop=True)
+    if "_row" in df.columns:
+        out["_row"] = df["_row"].to_numpy()[rows]
+    else:
+        out["_row"] = rows + row_offset
+    return out
+
+
+def _segments(frame: pd.DataFrame, keys: Sequence[str]):
+    """Numery wierszy kolejnych grup `keys` (w grupie w kolejności ramki)."""
+    if not keys:
+        return [np.arange(len(frame))]
+    gid = group_ids(frame, keys)
+    order = np.argsort(gid, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(gid))])
+    return [order[bounds[g]:bounds[g + 1]] for g in range(len(bounds) - 1)]
+
+
+def _extreme_table(cand: pd.DataFrame, measures: Sequence[str], k: int, keys: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    k skrajnych wartości każdej miary (max i min) w każdej grupie `keys`:
+    measure, extreme, rank, chunk, type, value. Tylko numery wierszy w pętli,
+    jedna ramka na końcu.
+    """
+    values = {c: _measure_values(cand, c) for c in measures}
+    pos, measure, extreme, rank, value = [], [], [], [], []
+    for seg in (_segments(cand, keys) if len(cand) else []):
+        for c in measures:
+            v = values[c][seg]
+            for largest in (True, False):
+                picked = seg[top_k_positions(v, k, largest=largest)]
+                pos.append(picked)
+                measure += [MEASURES[c]] * len(picked)
+                extreme += [_EXTREME_KIND[largest]] * len(picked)
+                rank.append(np.arange(1, len(picked) + 1))
+                value.append(values[c][picked])
+    pos = np.concatenate(pos) if pos else np.empty(0, dtype=np.intp)
+
+    # iloc na kolumnach - typy kolumn (np. category) jak w danych
+    return pd.DataFrame({
+        "measure": measure,
+        "extreme": extreme,
+        "rank": np.concatenate(rank) if rank else np.empty(0, dtype=np.int64),
+        "chunk": cand["Chunk Id"].iloc[pos].reset_index(drop=True),
+        "type": cand["Package type Barcodes"].iloc[pos].reset_index(drop=True),
+        "value": np.concatenate(value) if value else np.empty(0),
+    })
+
+
+def extremes_from_candidates(cand: pd.DataFrame, k: int = 5, k_type: int = 3) -> Dict[str, pd.DataFrame]:
+    """
+    Skrajne paczki z kandydatów (extreme_candidates):
+      heaviest / lightest - k najcięższych / najlżejszych ogółem (chunk, type, weight_g)
+      dims - k największych / najmniejszych ogółem dla Length/Width/Height
+      by_type - po k_type skrajnych wartości każdej miary w każdym typie opakowania
+    Kandydaci liczeni w kolejności `_row`: przy równych wartościach wygrywa wcześniejszy
+    wiersz, więc wynik z kandydatów z partii jest taki sam jak z całej ramki.
+    """
+    if "_row" in cand.columns:
+        cand = cand.sort_values("_row", kind="stable").reset_index(drop=True)
+    measures = [c for c in MEASURES if c in cand.columns]
+
+    overall = _extreme_table(cand, measures, k)
+    out: Dict[str, pd.DataFrame] = {}
+    weight = overall[overall["measure"] == MEASURES["Volume"]]
+    for name, kind in (("heaviest", "max"), ("lightest", "min")):
+        part = weight[weight["extreme"] == kind]
+        out[name] = part[["chunk", "type", "value"]].rename(columns={"value": "weight_g"}).reset_index(drop=True)
+    out["dims"] = overall[overall["measure"] != MEASURES["Volume"]].reset_index(drop=True)
+
+    by_type = _extreme_table(cand, measures, k_type, keys=["Package type Barcodes"]) if k_type > 0 else (
+        overall.iloc[:0])
+    out["by_type"] = by_type.rename(columns={"type": "package_type"})[
+        ["package_type", "measure", "extreme", "rank", "chunk", "value"]].reset_index(drop=True)
+    return out
+
+
+def report_top5_weight_extremes(df: pd.DataFrame, k: int = 5) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Zwraca (top k najciezsze, top k najlzejsze) dla Volume > 0.
+    Kolumny: chunk, type, weight_g.
+    """
+    for c in ["Chunk Id", "Package type Barcodes", "Volume"]:
         if c not in df.columns:
             raise KeyError(f"Brak kolumny '{c}' w danych.")
+    cand = extreme_candidates(df[["Chunk Id", "Package type Barcodes", "Volume"]], k=k)
+    ex = extremes_from_candidates(cand, k=k, k_type=0)
+    return ex["heaviest"], ex["lightest"]
 
-    sub = df.loc[df["Volume"] > 0, cols].copy()
 
-    sub = sub.rename(columns={
-        "Chunk Id": "chunk",
-        "Package type Barcodes": "type",
-        "Volume": "weight_g",
-    })
+# Rozkłady miar: stałe przedziały histogramu (szerokość, liczba przedziałów) per kolumna;
+# wartości powyżej zakresu trafiają do ostatniego przedziału
+HIST_BINS = {"Volume": (50.0, 800), "Length": (10.0, 250), "Width": (10.0, 250), "Height": (10.0, 250)}
+HIST_KEYS = ["scan_hour", "Package type Barcodes"]
+HIST_COLUMNS = HIST_KEYS + list(HIST_BINS)
+QUANTILES = {"p5": 0.05, "p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+_TYPE_LABEL = {"Package type Barcodes": "package_type"}
+_HIST_WIDTH = np.array([width for width, _ in HIST_BINS.values()], dtype=np.float64)
+_HIST_LAST = np.array([bins - 1 for _, bins in HIST_BINS.values()], dtype=np.int64)
+
+# Powyżej tylu komórek (grupy x przedziały) zliczanie przez np.unique zamiast gęstego bincount
+_DENSE_HIST_CELLS = 1 << 22
 
-    # zabezpieczenie na brak danych
-    if sub.empty:
-        empty = pd.DataFrame(columns=["chunk", "type", "weight_g"])
-        return empty, empty
-
-    top_heavy = sub.sort_values("weight_g", ascending=False).head(5).reset_index(drop=True)
-    top_light = sub.sort_values("weight_g", ascending=True).head(5).reset_index(drop=True)
-    return top_heavy, top_light
-
-def report_hourly_dims_measured(df: pd.DataFrame) -> pd.DataFrame:
-    g = df.groupby("scan_hour", dropna=False)
-
-    out = g.agg(
-        avg_length=("Length", lambda s: s[s > 0].mean()),
-        avg_width=("Width",  lambda s: s[s > 0].mean()),
-        avg_height=("Height", lambda s: s[s > 0].mean()),
-        total_items=("scan_hour", "size"),
-
-        measured_items=(
-            "Length",
-            lambda s: ((s > 0)
-                       & (df.loc[s.index, "Width"] > 0)
-                       & (df.loc[s.index, "Height"] > 0)).sum()
-        ),
-        unmeasured_items=(
-            "Length",
-            lambda s: (
-                s.isna()
-                | (s <= 0)
-                | df.loc[s.index, "Width"].isna()
-                | (df.loc[s.index, "Width"] <= 0)
-                | df.loc[s.index, "Height"].isna()
-                | (df.loc[s.index, "Height"] <= 0)
-            ).sum()
-        ),
-    ).reset_index()
+
+def build_hist(df: pd.DataFrame, keys: Sequence[str] = HIST_KEYS) -> pd.DataFrame:
+    """
+    Histogramy miar (HIST_BINS, tylko wartości > 0) po `keys`:
+    *keys, measure, bin, items_count - tylko niepuste przedziały, posortowane po kluczach.
+    Dla każdej miary jeden bincount po (numer grupy x przedział). Histogramy są sumowalne
+    (partie, pliki, godziny), percentyle liczy z nich hist_percentiles.
+    """
+    keys = list(keys)
+    gid = group_ids(df, keys) if len(df) else np.empty(0, dtype=np.int64)
+    groups, first = np.unique(gid, return_index=True)
+    n_groups = len(groups)
+
+    g_parts, m_parts, b_parts, c_parts = [], [], [], []
+    for m, (col, (width, bins)) in enumerate(HIST_BINS.items()):
+        if col not in df.columns:
+            continue
+        v = _measure_values(df, col)
+        ok = ~np.isnan(v)
+        b = np.minimum((v[ok] // width).astype(np.int64), bins - 1)
+        cell = gid[ok].astype(np.int64) * bins + b
+        if n_groups * bins <= _DENSE_HIST_CELLS:
+            counts = np.bincount(cell, minlength=n_groups * bins)
+            cell = np.flatnonzero(counts)
+            counts = counts[cell]
+        else:
+            cell, counts = np.unique(cell, return_counts=True)
+        g, b = np.divmod(cell, bins)
+        g_parts.append(g)
+        m_parts.append(np.full(len(g), m))
+        b_parts.append(b)
+        c_parts.append(counts)
+
+    if g_parts:
+        g, m, b, c = (np.concatenate(x) for x in (g_parts, m_parts, b_parts, c_parts))
+    else:
+        g = m = b = c = np.empty(0, dtype=np.int64)
+    order = np.lexsort((b, m, g))
+    g, m, b, c = g[order], m[order], b[order], c[order]
+
+    out = df[keys].iloc[first[g]].reset_index(drop=True)
+    out["measure"] = pd.Categorical.from_codes(m, categories=[MEASURES[col] for col in HIST_BINS])
+    out["bin"] = b.astype(np.int64)
+    out["items_count"] = c.astype(np.int64)
+    return out
+
+
+def _hist_rollup(hist: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Histogramy zsumowane po `by` (np. typ albo godzina), kolejność miar jak w HIST_BINS."""
+    hist = hist.assign(measure=pd.Categorical(hist["measure"], categories=[MEASURES[c] for c in HIST_BINS]))
+    return count_by(hist, [by, "measure", "bin"], value="items_count")
+
+
+def hist_percentiles(hist: pd.DataFrame, by: str) -> pd.DataFrame:
+    """
+    P5/P50/P95/P99 każdej miary po `by` z histogramów (build_hist): skumulowane liczniki
+    i interpolacja liniowa wewnątrz przedziału - dokładność do szerokości przedziału.
+    Wartości z ostatniego (otwartego) przedziału podawane są jako jego dolna granica.
+    """
+    agg = _hist_rollup(hist, by)
+    cols = [by, "measure", "measured_items", *QUANTILES]
+    if agg.empty:
+        return pd.DataFrame(columns=cols).rename(columns=_TYPE_LABEL)
+
+    gid = group_ids(agg, [by, "measure"])
+    n_groups = int(gid.max()) + 1
+    max_bins = max(bins for _, bins in HIST_BINS.values())
+    dense = np.zeros((n_groups, max_bins), dtype=np.float64)
+    dense[gid, agg["bin"].to_numpy()] = agg["items_count"].to_numpy()
+
+    first = np.unique(gid, return_index=True)[1]
+    out = agg.iloc[first][[by, "measure"]].reset_index(drop=True)
+    code = out["measure"].cat.codes.to_numpy()
+    width, last = _HIST_WIDTH[code], _HIST_LAST[code]
+
+    cum = dense.cumsum(axis=1)
+    total = cum[:, -1]
+    rows = np.arange(n_groups)
+    out["measured_items"] = total.astype(np.int64)
+    for name, q in QUANTILES.items():
+        target = q * total
+        idx = (cum < target[:, None]).sum(axis=1)
+        before = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0.0)
+        frac = (target - before) / dense[rows, idx]
+        value = (idx + np.where(idx >= last, 0.0, frac)) * width
+        out[name] = value.round(1)
+    return out[cols].rename(columns=_TYPE_LABEL)
+
+
+def hist_table(hist: pd.DataFrame, by: str = "Package type Barcodes") -> pd.DataFrame:
+    """Histogramy po `by` jako tabela: przedział [bin_from, bin_to) i udział w grupie (miara)."""
+    agg = _hist_rollup(hist, by)
+    code = agg["measure"].cat.codes.to_numpy()
+    width, last = _HIST_WIDTH[code], _HIST_LAST[code]
+    b = agg["bin"].to_numpy()
+    agg["bin_from"] = b * width
+    # ostatni przedział otwarty (wartości powyżej zakresu histogramu)
+    agg["bin_to"] = np.where(b < last, (b + 1) * width, np.nan)
+    totals = agg.groupby([by, "measure"], observed=True)["items_count"].transform("sum")
+    agg["pct_of_group"] = (agg["items_count"] / totals * 100.0).round(2)
+    return agg[[by, "measure", "bin_from", "bin_to", "items_count", "pct_of_group"]].rename(columns=_TYPE_LABEL)
+
+
+def report_hourly_dims_measured(df: pd.DataFrame, by_hour: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Godzinowa jakość wymiarowania.
+    measured_items: Length, Width i Height > 0 (flaga dims_ok liczona raz na wiersz)
+    unmeasured_items: którykolwiek wymiar NaN lub <= 0
+    """
+    if by_hour is None:
+        by_hour = aggregate_flags(df, "scan_hour")
+    _check_columns(by_hour, ["dims_ok", "dims_bad"], "Length/Width/Height")
+
+    out = pd.DataFrame({
+        "avg_length": by_hour["length_pos"],
+        "avg_width": by_hour["width_pos"],
+        "avg_height": by_hour["height_pos"],
+        "total_items": by_hour["total_items"],
+        "measured_items": by_hour["dims_ok"],
+        "unmeasured_items": by_hour["dims_bad"],
+    }).reset_index()
 
     out["pct_unmeasured"] = (out["unmeasured_items"] / out["total_items"] * 100.0).round(2)
-    out = out.sort_values("scan_hour").reset_index(drop=True)
+    out = out.sort_values(_time_col(by_hour)).reset_index(drop=True)
     return out
 
 
-def report_chute_full(df: pd.DataFrame) -> pd.DataFrame:
-    sub = df[
-        df["Logic"].astype("string").str.contains("Chute Full", na=False)
-        & df["Discharge"].isin(DISCHARGES)
-    ].copy()
+CHUTE_FULL = "Chute Full"
+
+# Kolumny heatmapy zsyp x godzina (arkusz chute_full_heatmap)
+CHUTE_HOUR_KEYS = ["scan_hour", "Package type Barcodes"]
+CHUTE_COLUMNS = CHUTE_HOUR_KEYS + ["Discharge", "Logic", "logic_reason", "chute"]
+
+
+def _is_chute_full(df: pd.DataFrame) -> pd.Series:
+    """'Chute Full' w powodzie z Logic (kolumna logic_reason z processing.parse_logic, jeśli jest)."""
+    if "logic_reason" in df.columns:
+        return _str_contains(df["logic_reason"], CHUTE_FULL)
+    return _str_contains(df["Logic"], CHUTE_FULL)
+
+
+def chute_full_mask(df: pd.DataFrame) -> pd.Series:
+    """Wiersze z 'Chute Full' w Logic, zrzucone do zrzutni problemowych."""
+    return _is_chute_full(df) & df["Discharge"].isin(DISCHARGES)
+
 
+def chute_full_counts(df: pd.DataFrame, problems: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Liczniki (Discharge, Logic) dla 'Chute Full' w zrzutach problemowych.
+    problems: opcjonalnie gotowy problem_subset(df) - wtedy szukamy tylko w nim.
+    """
+    if problems is None:
+        sub = df.loc[chute_full_mask(df), ["Discharge", "Logic"]]
+    else:
+        sub = problems.loc[_is_chute_full(problems), ["Discharge", "Logic"]]
+    return count_by(sub, ["Discharge", "Logic"])
+
+
+def chute_full_from_counts(counts: pd.DataFrame) -> pd.DataFrame:
     out = (
-        sub.groupby(["Discharge", "Logic"], dropna=False)
-        .size()
-        .reset_index(name="items_count")
+        counts
         .rename(columns={"Discharge": "discharge", "Logic": "logic"})
         .sort_values(["discharge", "items_count"], ascending=[True, False])
         .reset_index(drop=True)
@@ -247,16 +1018,78 @@ def report_chute_full(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def report_problem_share_type(df: pd.DataFrame, min_total: int = 50) -> pd.DataFrame:
-    totals = df.groupby("Package type Barcodes", dropna=False).size().rename("total_items").reset_index()
-    probs = (
-        df[df["Discharge"].isin(DISCHARGES)]
-        .groupby(["Package type Barcodes", "Discharge"], dropna=False)
-        .size()
-        .rename("problem_items")
-        .reset_index()
-    )
+def report_chute_full(df: pd.DataFrame, problems: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    return chute_full_from_counts(chute_full_counts(df, problems=problems))
+
+
+def chute_hour_counts(df: pd.DataFrame, keys: Sequence[str] = CHUTE_HOUR_KEYS) -> pd.DataFrame:
+    """
+    Liczniki 'Chute Full' (jak chute_full_mask) po (*keys, chute): *keys, chute, items_count,
+    tylko niezerowe, posortowane po kluczach i numerze zsypu. Jeden 2-D bincount
+    (grupa x zsyp) na kodach; sumowalne między partiami, plikami i godzinami.
+    """
+    keys = list(keys)
+    if "chute" in df.columns:
+        chute = df["chute"].to_numpy()
+    else:
+        chute = parse_logic(df["Logic"])[0]
+    hit = chute_full_mask(df).to_numpy() & (chute != NO_CHUTE)
+    sub = df.loc[hit, keys]
+    chute = chute[hit].astype(np.int64)
+
+    gid = group_ids(sub, keys) if len(sub) else np.empty(0, dtype=np.int64)
+    groups, first = np.unique(gid, return_index=True)
+    chutes, chute_idx = np.unique(chute, return_inverse=True)
+    counts = np.bincount(
+        gid * len(chutes) + chute_idx.reshape(-1), minlength=len(groups) * len(chutes),
+    ).reshape(len(groups), len(chutes))
+    g, c = np.nonzero(counts)
+
+    out = sub.iloc[first[g]].reset_index(drop=True)
+    out["chute"] = chutes[c].astype(np.int16)
+    out["items_count"] = counts[g, c].astype(np.int64)
+    return out
 
+
+def report_chute_full_heatmap(counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Heatmapa 'Chute Full': wiersz = zsyp, kolumna = godzina (ciągły zakres od pierwszej
+    do ostatniej godziny z pełnym zsypem), na końcu total. Z liczników chute_hour_counts -
+    suma po typach jednym 2-D bincount (zsyp x godzina).
+    """
+    counts = counts[counts["scan_hour"].notna()]
+    if counts.empty:
+        return pd.DataFrame(columns=["chute", "total"])
+
+    times = pd.to_datetime(counts["scan_hour"])
+    hours = pd.date_range(times.min(), times.max(), freq="h")
+    hour_idx = hours.get_indexer(times)
+    chutes, chute_idx = np.unique(counts["chute"].to_numpy(), return_inverse=True)
+    grid = np.bincount(
+        chute_idx.reshape(-1) * len(hours) + hour_idx,
+        weights=counts["items_count"].to_numpy(dtype=np.float64),
+        minlength=len(chutes) * len(hours),
+    ).reshape(len(chutes), len(hours)).round().astype(np.int64)
+
+    out = pd.DataFrame(grid, columns=hours.strftime("%Y-%m-%d %H:%M"))
+    out.insert(0, "chute", chutes.astype(np.int64))
+    out["total"] = grid.sum(axis=1)
+    return out
+
+
+def problem_counts(df: pd.DataFrame, problems: Optional[pd.DataFrame] = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (liczba paczek per typ, liczba problemów per typ i discharge) - sumowalne między kawałkami.
+    problems: opcjonalnie gotowy problem_subset(df).
+    """
+    totals = df.groupby("Package type Barcodes", dropna=False, observed=True).size().rename("total_items").reset_index()
+    if problems is None:
+        problems = problem_subset(df, ["Package type Barcodes", "Discharge"])
+    probs = count_by(problems, ["Package type Barcodes", "Discharge"], name="problem_items")
+    return totals, probs
+
+
+def problem_share_from_counts(totals: pd.DataFrame, probs: pd.DataFrame, min_total: int = 50) -> pd.DataFrame:
     out = totals.merge(probs, on="Package type Barcodes", how="left")
     out["problem_items"] = out["problem_items"].fillna(0).astype(int)
     out["pct_of_type"] = (out["problem_items"] / out["total_items"] * 100.0).round(2)
@@ -266,6 +1099,15 @@ def report_problem_share_type(df: pd.DataFrame, min_total: int = 50) -> pd.DataF
     return out
 
 
+def report_problem_share_type(
+    df: pd.DataFrame,
+    min_total: int = 50,
+    problems: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    totals, probs = problem_counts(df, problems=problems)
+    return problem_share_from_counts(totals, probs, min_total=min_total)
+
+
 def compute_weighted_length_and_efficiency(
     package_type_share_df: pd.DataFrame,
     base_efficiency: float = 8500.0,
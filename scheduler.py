@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+
+class _SharedFrame:
+    """Znacznik w args/kwargs zadania: w tym miejscu trafia współdzielona ramka danych."""
+
+    def __repr__(self) -> str:
+        return "SHARED_FRAME"
+
+
+SHARED_FRAME = _SharedFrame()
+
+# Tryby wykonania raportów
+MODES = ("serial", "thread", "process")
+
+
+@dataclass
+class ReportJob:
+    """
+    Jedno niezależne zadanie raportowe: func(*args, **kwargs).
+    W trybie "process" func musi być funkcją modułu (picklowalna), a ramkę
+    przekazujemy znacznikiem SHARED_FRAME zamiast samego DataFrame.
+    columns - kolumny ramki, których zadanie używa (tryb "process": tylko one są
+    zamieniane na pandas w workerze); None = wszystkie.
+    """
+    name: str
+    func: Callable[..., Any]
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    columns: Optional[Tuple[str, ...]] = None
+
+
+def default_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+# --- tryb procesowy: ramka współdzielona przez plik Arrow IPC (memory-map) ---
+# Worker trzyma tabelę Arrow zmapowaną z pliku (bez kopii) i zamienia na pandas tylko
+# kolumny potrzebne zadaniom (ReportJob.columns), każdą raz. Zamienione kolumny są już
+# prywatną kopią procesu - worker ma kopię tylko tych kolumn, których jego zadania użyły.
+# Bez pyarrow: ramka z pickle, cała w każdym workerze.
+_WORKER_TABLE = None
+_WORKER_FRAME: Optional[pd.DataFrame] = None
+_WORKER_COLUMNS: Dict[str, pd.Series] = {}
+_WORKER_DTYPES: Dict[str, Any] = {}
+# wyniki liczone raz na worker (worker_cached), żyją tyle co pula
+_WORKER_CACHE: Dict[Any, Any] = {}
+_IN_WORKER = False
+
+
+def _init_worker(frame_path: str) -> None:
+    """Tabela Arrow zmapowana z pliku, bez zamiany na pandas (ta dopiero w _worker_frame)."""
+    global _WORKER_TABLE, _WORKER_FRAME, _WORKER_DTYPES, _IN_WORKER
+    _IN_WORKER = True
+    if frame_path.endswith(".feather"):
+        import pyarrow.feather as feather
+
+        _WORKER_TABLE = feather.read_table(frame_path, memory_map=True)
+        _WORKER_DTYPES = pd.read_pickle(frame_path + ".dtypes")
+    else:
+        _WORKER_FRAME = pd.read_pickle(frame_path)
+
+
+def _worker_frame(columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    """Ramka zadania w workerze: wybrane kolumny tabeli Arrow (zamienione raz, potem z pamięci)."""
+    if _WORKER_TABLE is None:
+        return _WORKER_FRAME
+    available = _WORKER_TABLE.column_names
+    names = available if columns is None else [c for c in dict.fromkeys(columns) if c in available]
+    for c in names:
+        if c not in _WORKER_COLUMNS:
+            # select + to_pandas: typy jak w ramce źródłowej (metadane pandas w pliku)
+            col = _WORKER_TABLE.select([c]).to_pandas()[c]
+            # Arrow nie odtwarza wszystkich typów 1:1 (np. kategorie tekstowe)
+            dtype = _WORKER_DTYPES.get(c)
+            if dtype is not None and col.dtype != dtype:
+                col = col.astype(dtype)
+            _WORKER_COLUMNS[c] = col
+    if not names:
+        return pd.DataFrame(index=pd.RangeIndex(_WORKER_TABLE.num_rows))
+    return pd.DataFrame({c: _WORKER_COLUMNS[c] for c in names})
+
+
+def worker_cached(key: Any, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    func(*args) liczone raz na proces roboczy (tryb "process") i klucz - np. wynik pośredni
+    długości ramki, którego nie opłaca się przesyłać. Poza workerem: zwykłe wywołanie.
+    """
+    if not _IN_WORKER:
+        return func(*args)
+    if key not in _WORKER_CACHE:
+        _WORKER_CACHE[key] = func(*args)
+    return _WORKER_CACHE[key]
+
+
+def _resolve(value: Any, frame: Optional[pd.DataFrame]) -> Any:
+    # isinstance, nie "is": po picklowaniu do procesu to już inna instancja
+    return frame if isinstance(value, _SharedFrame) else value
+
+
+def _run_job(job: ReportJob, frame: Optional[pd.DataFrame] = None) -> Any:
+    if frame is None and _IN_WORKER:
+        frame = _worker_frame(job.columns)
+    args = tuple(_resolve(a, frame) for a in job.args)
+    kwargs = {k: _resolve(v, frame) for k, v in job.kwargs.items()}
+    return job.func(*args, **kwargs)
+
+
+def _dump_shared_frame(df: pd.DataFrame, tmp_dir: str) -> str:
+    """Zapis ramki raz na dysk (Feather bez kompresji -> memory-map w workerach)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        path = str(Path(tmp_dir) / "frame.pkl")
+        df.to_pickle(path)
+        return path
+
+    path = str(Path(tmp_dir) / "frame.feather")
+    df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    pd.to_pickle(df.dtypes.to_dict(), path + ".dtypes")
+    return path
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in MODES:
+        raise ValueError(f"Nieznany tryb: {mode!r} (dostępne: {', '.join(MODES)})")
+
+
+def effective_mode(mode: str, max_workers: Optional[int] = None) -> str:
+    """Tryb faktycznie użyty: "process" z jednym workerem to tylko narzut (zapis ramki, IPC) -> "serial"."""
+    _check_mode(mode)
+    if mode == "process" and (max_workers or default_workers()) <= 1:
+        return "serial"
+    return mode
+
+
+@contextmanager
+def report_pool(
+    df: pd.DataFrame,
+    mode: str = "thread",
+    max_workers: Optional[int] = None,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Iterator[Optional[Executor]]:
+    """
+    Pula dla kolejnych run_reports na tej samej ramce (np. poziomy grafu w registry.evaluate):
+    w trybie "process" ramka zapisywana jest raz, a workery startują raz. "serial" -> None.
+    """
+    mode = effective_mode(mode, max_workers)
+    if mode == "serial":
+        yield None
+        return
+    workers = max_workers or default_workers()
+    if mode == "thread":
+        with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as ex:
+            yield ex
+        return
+    with tempfile.TemporaryDirectory(prefix="box_frame_") as tmp_dir:
+        frame_path = _dump_shared_frame(df, tmp_dir)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(frame_path,),
+        ) as ex:
+            yield ex
+
+
+def run_reports(
+    df: pd.DataFrame,
+    jobs: Iterable[ReportJob],
+    mode: str = "thread",
+    max_workers: Optional[int] = None,
+    on_done: Optional[Callable[[str, int, int], None]] = None,
+    initializer: Optional[Callable[[], None]] = None,
+    executor: Optional[Executor] = None,
+) -> Dict[str, Any]:
+    """
+    Uruchamia niezależne raporty równolegle i zwraca {nazwa: wynik}.
+
+    mode: "serial" | "thread" | "process"
+    on_done(name, done, total): wołane w wątku wywołującym po każdym ukończonym zadaniu
+    (np. do paska postępu).
+    initializer: dodatkowa inicjalizacja wątków puli (tylko tryb "thread").
+    executor: gotowa pula z report_pool(df, mode) - bez niej pula tworzona na to wywołanie.
+    """
+    mode = effective_mode(mode, max_workers)
+
+    jobs = list(jobs)
+    total = len(jobs)
+    results: Dict[str, Any] = {}
+
+    if mode == "serial" or total <= 1:
+        for i, job in enumerate(jobs, start=1):
+            results[job.name] = _run_job(job, df)
+            if on_done:
+                on_done(job.name, i, total)
+        return results
+
+    def _collect(ex: Executor) -> None:
+        # w trybie "process" ramka jest już w workerach (SHARED_FRAME)
+        frame = None if mode == "process" else df
+        futures = {ex.submit(_run_job, job, frame): job.name for job in jobs}
+        for i, fut in enumerate(as_completed(futures), start=1):
+            name = futures[fut]
+            results[name] = fut.result()
+            if on_done:
+                on_done(name, i, total)
+
+    if executor is not None:
+        _collect(executor)
+    else:
+        workers = min(max_workers or default_workers(), total)
+        with report_pool(df, mode, max_workers=workers, initializer=initializer) as ex:
+            _collect(ex)
+
+    # kolejność jak w liście zadań (niezależnie od kolejności ukończenia)
+    return {job.name: results[job.name] for job in jobs}
+
+
+def map_files(
+    func: Callable[..., Any],
+    items: Iterable[Any],
+    *args: Any,
+    max_workers: Optional[int] = None,
+) -> list:
+    """
+    [func(item, *args) for item in items] w puli procesów - np. parsowanie kilku plików naraz.
+    func musi być funkcją modułu (picklowalna). Wyniki w kolejności `items`;
+    przy jednym elemencie albo max_workers=1 bez puli.
+    """
+    items = list(items)
+    workers = min(max_workers or default_workers(), len(items))
+    if workers <= 1:
+        return [func(item, *args) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(func, item, *args) for item in items]
+        return [fut.result() for fut in futures]
@@ -1,337 +1,207 @@
 import streamlit as st
+import altair as alt
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
-import tempfile
+from datetime import datetime, timedelta
+import os
 import traceback
 
 # Import z modułów
-from processing import load_xlsx
-import reports as rpt
-from export_excel import write_report_xlsx
+from cache import cube_cached, file_hash
+from chunk_index import ChunkIndex
+import filters
+import perf as perf_mod
+import pipeline
+import registry
+from reports import QUANTILES, TIME_COLUMNS
 
-# Kolejność arkuszy
-SHEET_ORDER = [
-    "summary",
-    "package_type_share",
-    "hourly_dims_measured",
-    "hourly_weight_measured",
-    "loop_99",
-    "nok_244",
-    "overflow_243",
-    "hourly_loop_nok_ovf",
-    "chute_full",
-    "problem_share_type",
-    "bad_dims_pct",
-    "bad_weight_pct",
-    "top5_heaviest",
-    "top5_lightest",
-]
+# Kolejność arkuszy i opisy (tekst + pozycja bloku) - z rejestru raportów
+SHEET_ORDER = registry.SHEET_ORDER
+DESCRIPTIONS = registry.sheet_descriptions()
 
-# Opisy (tekst + pozycja bloku)
-DESCRIPTIONS = {
-    "package_type_share": ("""Ta tabela przedstawia ilościowy i procentowy rozkład opakowań na instalacji wraz z ich wymiarami
 
-Opis kolumn:
+# Cache wyników wspólny dla całego procesu serwera (wszystkie sesje/użytkownicy).
+# Klucz: hash zawartości pliku + parametry raportu; argumenty z "_" nie są hashowane.
+RESULT_CACHE_ENTRIES = 8
+RESULT_CACHE_TTL = "6h"
 
-package_type - typ opakowania
-avg_lenght - średnia długość paczki danego typu w mm
-avg_width - średnia szerokość  paczki danego typu w mm
-avg_height - średnia wysokość  paczki danego typu w mm
-items_count_all - ile paczek danego typu wystąpiło na instalacji
-pct_share - procentowy rozkład opakowań
+# Równoległe liczenie raportów: "thread" (domyślnie), "process" albo "serial"; liczba workerów
+REPORT_MODE = os.environ.get("BOX_REPORT_MODE", "thread")
+REPORT_WORKERS = int(os.environ.get("BOX_REPORT_WORKERS", "0")) or None
 
-Średnie liczone dla opakowań zmierzonych, dzięki czemu nieopomiarowane opakowanie nie zaniżają średniej. Ilości to wszystkie opakowania danego typu, w tym nieopomiarowane. To podejście zapewnia dużą precyzyjność danych
+# Domyślne parametry raportu
+DEFAULT_MIN_TOTAL = registry.DEFAULT_PARAMS["min_total"]
+DEFAULT_TOP_K = registry.DEFAULT_PARAMS["top_k"]
+DEFAULT_TOP_K_TYPE = registry.DEFAULT_PARAMS["top_k_type"]
+DEFAULT_BASE_EFFICIENCY = registry.DEFAULT_PARAMS["base_efficiency"]
+DEFAULT_BASE_AVG_LENGTH = registry.DEFAULT_PARAMS["base_avg_length"]
+DEFAULT_GRANULARITY = registry.DEFAULT_PARAMS["granularity"]
 
-Tabela posortowana według opakowań najczęściej występujących, mających największy udział w rozkładzie
-                           
-avg_len to średnia długość wszystkich paczek na instalacji (średnia ważona)
-predicted_eff to przewidywana wydajność sortera przy założeniu, że średnia długość paczek 400mm daje wydajność 8500 (zgodnie z dokumentacją)
-                           
-https://drive.google.com/file/d/1g8EU9LQgIKa3NrOvm24-8AwQVLDlzRYW/view?usp=sharing
+# Ziarnistość arkuszy czasowych (etykiety w panelu bocznym)
+GRANULARITY_LABELS = {"15min": "15 minut", "hour": "godzina", "shift": "zmiana", "day": "doba"}
 
+# Pomiary etapów: linia JSON na każdy raport na stderr (monitoring)
+perf_mod.setup_logging()
 
 
-""", "I4", "O22"),
-    "hourly_dims_measured": ("""Ta tabela przedstawia średnie wymiary paczek w rozkładzie godzinowym oraz jakość pomiarów
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_load(digest: str, _raw: bytes):
+    # Parsowanie prosto z bajtów uploadu (cache na dysku, bez plików tymczasowych)
+    return pipeline.load(_raw, digest=digest)
 
-Opis kolumn:
-scan_hour - znacznik czasu
-package_type - typ opakowania
-avg_lenght - średnia długość paczki danego typu w mm
-avg_width - średnia szerokość  paczki danego typu w mm
-avg_height - średnia wysokość  paczki danego typu w mm
-total_items - wszystkie paczki zarejestrowane na instalacji
-unmensured_items - ilość paczek niezmierzonych
-pct_unmeasured - procent paczek niezmierzonych
 
-Średnie liczone dla opakowań zmierzonych, dzięki czemu nieopomiarowane opakowanie nie zaniżają średniej. Niezwymiarowanych jest niewiele, dzięki czemu dane są obarczone niskim błędem
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_load_many(digest: str, _raws: list, _digests: list):
+    # Kilka plików: parsowanie równolegle w puli procesów, duplikaty między plikami pominięte
+    return pipeline.load_many(_raws, digests=_digests)
 
 
-""", "K4", "Q22"),
-    "loop_99": ("""Ta tabela przedstawia wszystkie paczki wysłane do loop i ile razy
+def _load_uploaded(uploaded_files) -> tuple:
+    """(digest, LoadedData) dla jednego albo kilku wgranych plików."""
+    raws = [f.getvalue() for f in uploaded_files]
+    digests = [file_hash(raw) for raw in raws]
+    if len(raws) == 1:
+        return digests[0], _cached_load(digests[0], raws[0])
+    # zestaw plików w tej kolejności -> jeden klucz cache
+    digest = file_hash("|".join(digests).encode())
+    return digest, _cached_load_many(digest, raws, digests)
 
-Opis kolumn:
 
-scan_date - znacznik czasu
-chunk - numer danej paczki zawarty na etykiecie wysyłkowej
-package_type - typ opakowania
-discharge - gdzie posortowano (loop)
-items_count- ile razy dana paczka trafiła do loop
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _results_memo(digest: str) -> registry.BoundedMemo:
+    # wyniki węzłów rejestru (arkusze + wyniki pośrednie) dla jednego pliku
+    return registry.BoundedMemo(max_items=256)
 
-Jeśli dana paczka trafiła do loop więcej razy niż określa to system, wskazuje to na problem (np. krążenie paczek danego typu)
 
-Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES * 4, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_xlsx(digest: str, params: tuple, _report: pipeline.Report) -> bytes:
+    # Raport zapisywany do bufora w pamięci
+    return pipeline.report_bytes(_report)
 
-""", "H3", "N18"),
-    "nok_244": ("""Ta tabela przedstawia wszystkie paczki posortowane do zrzutni nok 244 i ile razy
-
-Opis kolumn:
 
-scan_date - znacznik czasu
-chunk - numer danej paczki zawarty na etykiecie wysyłkowej
-package_type - typ opakowania
-discharge - gdzie posortowano (nok 244)
-items_count- ile razy dana paczka trafiła do nok 244
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_parts(digest: str, extreme_k: int, _loaded, _params: dict) -> filters.HourlyParts:
+    # liczniki per godzina i typ do filtrów (kostka agregatów z cache na dysku);
+    # liczba kandydatów skrajnych wartości zależy od top_k / top_k_type
+    return filters.HourlyParts(_loaded.df, cube=cube_cached(_loaded, digest), params=_params)
 
-Jeśli dana paczka trafiła wielokrotnie do nok, wskazuje to na problem
 
-Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_chunk_index(digest: str, _loaded) -> ChunkIndex:
+    # Chunk Id -> wiersze danych (wyszukiwarka paczek, top recyrkulacji)
+    return ChunkIndex(_loaded.df)
 
-""", "H4", "N19"),
-    "overflow_243": ("""Ta tabela przedstawia wszystkie paczki posortowane do zrzutni overflow i ile razy
 
-Opis kolumn:
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES * 4, ttl=RESULT_CACHE_TTL, show_spinner=False)
+def _cached_filtered(digest: str, params: tuple, flt_key: tuple, _parts, _flt, _params: dict) -> pipeline.Report:
+    return _parts.for_filter(_flt, params=_params)
 
-scan_date - znacznik czasu
-chunk - numer danej paczki zawarty na etykiecie wysyłkowej
-package_type - typ opakowania
-discharge - gdzie posortowano (overflow 243)
-items_count- ile razy dana paczka trafiła do overflow 243
 
-Jeśli dana paczka trafiła wielokrotnie do overflow, wskazuje to na problem
-                     
-Jeśli pojawiły się paczki, które mają brak chunku (w kolumnie chunk) są one grupowane i zliczane po typie opakowania (nie musi być to jedna i ta sama paczka)
-
-""", "H4", "N19"),
-    "hourly_loop_nok_ovf": ("""Ta tabela przedstawia, ile paczek w każdej godzinie trafia do loop, overflow, nok w odniesieniu do wszystkich paczek zarejestrowanych na instalacji
-
-Opis kolumn:
-
-scan_hour - znacznik czasu
-total_items - wszystkie rzeczy zarejestrowane na instalacji
-loop_99_count - ilość paczek posortowanych do loop
-overflow_243_count - ilość paczek posortowana do zrzutni overflow 243
-nok_count - ilość paczek posortowana do zrzutni nok 244
-
-""", "H4", "N19"),
-    "chute_full": ("""Ta tabela przedstawia, ile paczek z powodu chute full dana zrzutnia wysłała na loop lub - jeśli się zdarzy - do overflow i nok
-
-Opis kolumn:
-
-discharge - gdzie posortowano (loop, overflow, nok)
-logic - zawiera numer zrzutni i powód (chute full)
-items_count - ilość paczek
-                   
-""", "F4", "L19"),
-    "problem_share_type": ("""Ta tabela przedstawia, jaki typ opakowania ma najwięcej procent wysyłania do loop bądź overflow czy nok
-
-Opis kolumn:
-
-package_type - zawiera kod opakowania
-total_items - ilość paczek danego typu zarejestrowano na instalacji
-discharge - gdzie posortowano (loop, overflow, nok) 
-problem_items - ile paczek z danego typu posortowano do loop, overflow, nok
-pct_of_type - ile paczek z danego typu procentowo posortowano do loop, overflow, nok
-                           
-Tabela posortowana według kolumny pct_of_type malejąco. 
-
-""", "H4", "N19"),
-    "bad_dims_pct": ("""Ta tabela przedstawia jakość wymiarowania danych opakowań
-
-Opis kolumn:
-
-type - typ opakowania
-bad_meaasurements - ile razy paczki z danym typem opakowania nie było zwymiarowane
-total_items - ile razy dany typ opakowania wystąpił na instalacji
-pct_bad - ile procent opakowań danego typu nie jest wymiarowanych przez instalację
-
-""", "G3", "M18"),
-    "bad_weight_pct": ("""Ta tabela przedstawia jakość ważenia danych opakowań
-
-Opis kolumn:
-
-type - typ opakowania
-bad_weight - ile razy paczki z danym typem opakowania nie było zważone
-total_items - ile razy dany typ opakowania wystąpił na instalacji
-pct_bad_weight - ile procent opakowań danego typu nie jest ważonych przez instalację
-
-""", "G4", "M19"),
-
-    "hourly_weight_measured": ("""Ta tabela przedstawia średnią masę paczek (kolumna Volume (waga) - masa w gramach) oraz skuteczność ważenia w ujęciu godzinowym.
-avg_weight: średnia masa [g] 
-measured_items: liczba paczek z masą 
-unmeasured_items: niezważone paczki
-pct_unmeasured: % paczek bez poprawnej masy""", "I2", "N6"),
-
-    "top5_heaviest": ("""TOP 5 najcięższych paczek.
-Kolumny:
-chunk - Chunk Id
-type - Package type Barcodes
-weight - masa [g]""", "I2", "N6"),
-
-    "top5_lightest": ("""TOP 5 najlżejszych paczek.
-Kolumny:
-chunk - Chunk Id
-type - Package type Barcodes
-weight - masa [g]""", "I2", "N6"),
-}
-
-
-def generate_report(uploaded_file):
+def generate_report(
+    uploaded_files,
+    min_total: int = DEFAULT_MIN_TOTAL,
+    base_efficiency: float = DEFAULT_BASE_EFFICIENCY,
+    base_avg_length: float = DEFAULT_BASE_AVG_LENGTH,
+    perf_sheet: bool = False,
+    granularity: str = DEFAULT_GRANULARITY,
+    top_k: int = DEFAULT_TOP_K,
+    top_k_type: int = DEFAULT_TOP_K_TYPE,
+):
     """Główna funkcja generująca raport"""
+    perf = perf_mod.PerfLog()
     try:
-        # Zapisz tymczasowo plik
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_input:
-            tmp_input.write(uploaded_file.getvalue())
-            tmp_input_path = tmp_input.name
-
-        # Wczytaj dane
-        st.info(f"📂 Wczytuję plik: {uploaded_file.name}")
-        loaded = load_xlsx(tmp_input_path)
-
-        if loaded.min_scan is None or loaded.max_scan is None:
-            raise RuntimeError("Nie udało się sparsować kolumny Scan (brak dat).")
+        names = ", ".join(f.name for f in uploaded_files)
+
+        # Wczytaj dane (cache procesu -> cache na dysku -> parsowanie XLSX)
+        st.info(f"📂 Wczytuję {'plik' if len(uploaded_files) == 1 else 'pliki'}: {names}")
+        with perf.stage("load_xlsx") as s:
+            digest, loaded = _load_uploaded(uploaded_files)
+            s["rows_out"] = len(loaded.df)
+        pipeline.check_loaded(loaded)
+        with perf.stage("chunk_index") as s:
+            s["rows_in"] = len(loaded.df)
+            _cached_chunk_index(digest, loaded)
 
         st.success(f"📅 Zakres czasu: {loaded.min_scan} → {loaded.max_scan}")
-        st.info(f"📊 Wierszy w pliku: {len(loaded.df):,}")
-
-        if len(loaded.df) == 0:
-            raise RuntimeError("Plik po wczytaniu ma 0 wierszy.")
+        st.info(f"📊 Wierszy w danych: {len(loaded.df):,}")
+        if loaded.duplicates:
+            st.info(f"🔁 Pominięte duplikaty (nakładające się eksporty): {loaded.duplicates:,}")
 
         # Liczenie raportów
         st.info("⚙️ Liczenie raportów...")
         progress_bar = st.progress(0)
-        sheets = {}
-
-        sheets["bad_dims_pct"] = rpt.report_bad_dims_pct(loaded.df)
-        progress_bar.progress(10)
-        
-        sheets["bad_weight_pct"] = rpt.report_bad_weight_pct(loaded.df)
-        progress_bar.progress(20)
-        
-        sheets["package_type_share"] = rpt.report_package_type_dims_share(loaded.df)
-        progress_bar.progress(30)
 
-        sheets["loop_99"] = rpt.report_discharge_detail(loaded.df, "99 Loop")
-        progress_bar.progress(40)
-        
-        sheets["nok_244"] = rpt.report_discharge_detail(loaded.df, "Not Ok 244")
-        progress_bar.progress(50)
-        
-        sheets["overflow_243"] = rpt.report_discharge_detail(loaded.df, "Overflow 243")
-        progress_bar.progress(60)
-
-        sheets["hourly_loop_nok_ovf"] = rpt.report_hourly_loop_nok_overflow(loaded.df)
-        progress_bar.progress(70)
-        
-        sheets["hourly_dims_measured"] = rpt.report_hourly_dims_measured(loaded.df)
-        progress_bar.progress(78)
-        
-        sheets["hourly_weight_measured"] = rpt.report_hourly_weight_measured(loaded.df)
-        progress_bar.progress(82)
-        sheets["chute_full"] = rpt.report_chute_full(loaded.df)
-        progress_bar.progress(90)
-        
-        sheets["problem_share_type"] = rpt.report_problem_share_type(loaded.df, min_total=50)
-        progress_bar.progress(94)
-
-        top_heavy, top_light = rpt.report_top5_weight_extremes(loaded.df)
-        sheets["top5_heaviest"] = top_heavy
-        sheets["top5_lightest"] = top_light
-        progress_bar.progress(95)
-        # Policz średnią ważoną i prognozowaną wydajność
-        wavg_len, pred_eff = rpt.compute_weighted_length_and_efficiency(
-            sheets["package_type_share"],
-            base_efficiency=8500.0,
-            base_avg_length=400.0,
+        params = {
+            "min_total": min_total,
+            "base_efficiency": base_efficiency,
+            "base_avg_length": base_avg_length,
+            "granularity": granularity,
+            "top_k": top_k,
+            "top_k_type": top_k_type,
+        }
+
+        # pasek postępu prowadzony przez faktycznie ukończone raporty
+        def _on_done(name, done, total):
+            progress_bar.progress(int(done / total * 95))
+
+        # rejestr liczy wspólne wyniki pośrednie raz, a arkusze równolegle
+        report = pipeline.compute_report(
+            loaded,
+            params=params,
+            memo=_results_memo(digest),
+            mode=REPORT_MODE,
+            max_workers=REPORT_WORKERS,
+            on_done=_on_done,
+            perf=perf,
         )
 
-        # Zapisz raport do tymczasowego pliku
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_output:
-            tmp_output_path = Path(tmp_output.name)
-
-        # --- SUMMARY sheet (do Excela jako pierwszy arkusz) ---
-        total_rows = int(len(loaded.df))
-        avg_length_mm = float(wavg_len) if pd.notna(wavg_len) else float("nan")
-        total_length_km = (total_rows * avg_length_mm / 1_000_000) if pd.notna(avg_length_mm) else 0.0
-
-        vol = pd.to_numeric(loaded.df.get("Volume"), errors="coerce")
-        total_mass_g = vol[vol > 0].sum() if vol is not None else 0.0
-        total_mass_t = float(total_mass_g) / 1_000_000
-
-        if loaded.min_scan and loaded.max_scan:
-            scan_min = loaded.min_scan.strftime("%Y-%m-%d")
-            scan_max = loaded.max_scan.strftime("%Y-%m-%d")
-            scan_label = scan_max if scan_min == scan_max else f"{scan_min} → {scan_max}"
+        if perf_sheet:
+            # arkusz _perf zmienia się przy każdym uruchomieniu - bez cache gotowego pliku
+            report_data = pipeline.report_bytes(report, perf=perf, perf_sheet=True)
         else:
-            scan_label = "brak"
-
-        sheets["summary"] = pd.DataFrame([{
-            "scan": scan_label,
-            "rows": total_rows,
-            "avg_length_mm": round(avg_length_mm, 2) if pd.notna(avg_length_mm) else pd.NA,
-            "total_length_km": round(total_length_km, 2),
-            "total_mass_t": round(total_mass_t, 3),
-        }])
-
-        write_report_xlsx(
-            tmp_output_path,
-            sheets,
-            sheet_order=SHEET_ORDER,
-            descriptions=DESCRIPTIONS,
-            package_type_share_summary=(wavg_len, pred_eff),
-        )
-        
+            with perf.stage("write_report_xlsx"):
+                report_data = _cached_xlsx(digest, tuple(params.values()), report)
+
         progress_bar.progress(100)
         st.success("✅ Raport wygenerowany!")
+        perf.log(file=names, digest=digest[:12], rows=len(loaded.df))
 
         # Zwróć plik do pobrania i dane do wizualizacji
-        with open(tmp_output_path, 'rb') as f:
-            return f.read(), tmp_output_path.name, sheets, (wavg_len, pred_eff), loaded
+        filename = pipeline.report_filename(digest)
+        return report_data, filename, report.sheets, report.summary, loaded, perf.to_frame(), digest
 
     except Exception as e:
         st.error(f"❌ Błąd: {e}")
         with st.expander("📋 Szczegóły błędu"):
             st.code(traceback.format_exc())
-        return None, None, None, None, None
+        return None, None, None, None, None, None, None
+    finally:
+        perf.close()
+
 
+def _time_indexed(df: pd.DataFrame):
+    """Arkusz czasowy z kolumną czasu (scan_hour / scan_15min / ...) jako indeksem, albo None"""
+    col = next((c for c in df.columns if c in TIME_COLUMNS.values()), None)
+    if col is None:
+        return None
+    df = df.copy()
+    df[col] = pd.to_datetime(df[col])
+    return df.set_index(col).sort_index()
 
 
-def show_visualizations(sheets, summary, loaded):
+def show_visualizations(sheets, summary):
     """Wyświetl wizualizacje danych"""
     wavg_len, pred_eff = summary
 
     st.markdown("### 📊 Podsumowanie")
 
-    # KPI bazowe
-    rows = int(len(loaded.df))
+    # KPI bazowe - z arkusza summary (te same wartości co w XLSX, także po filtrze)
+    kpi = sheets["summary"].iloc[0]
+    rows = int(kpi["rows"])
     avg_length_mm = float(wavg_len) if pd.notna(wavg_len) else float("nan")
-    total_length_km = (rows * avg_length_mm / 1_000_000) if pd.notna(avg_length_mm) else 0.0
-
-    # Volume = masa w gramach
-    vol = pd.to_numeric(loaded.df.get("Volume"), errors="coerce")
-    total_mass_g = vol[vol > 0].sum() if vol is not None else 0.0
-    total_mass_t = float(total_mass_g) / 1_000_000  # g -> t
-
-    # Data (Scan)
-    if loaded.min_scan and loaded.max_scan:
-        if loaded.min_scan.date() == loaded.max_scan.date():
-            scan_label = loaded.max_scan.strftime("%Y-%m-%d")
-        else:
-            scan_label = f"{loaded.min_scan.strftime('%Y-%m-%d')} → {loaded.max_scan.strftime('%Y-%m-%d')}"
-    else:
-        scan_label = "brak"
+    total_length_km = float(kpi["total_length_km"])
+    total_mass_t = float(kpi["total_mass_t"])
+    scan_label = kpi["scan"]
 
     # Skuteczności ważone (sum(measured)/sum(total))
     dims_eff = None
@@ -375,29 +245,31 @@ def show_visualizations(sheets, summary, loaded):
     # 2) Wolumen całkowity w czasie (godzinowo)
     if "hourly_loop_nok_ovf" in sheets:
         st.markdown("### 📈 Wolumen całkowity w czasie")
-        hourly_df = sheets["hourly_loop_nok_ovf"].copy()
-        if "scan_hour" in hourly_df.columns and "total_items" in hourly_df.columns:
-            hourly_df["scan_hour"] = pd.to_datetime(hourly_df["scan_hour"])
-            hourly_df = hourly_df.set_index("scan_hour").sort_index()
+        hourly_df = _time_indexed(sheets["hourly_loop_nok_ovf"])
+        if hourly_df is not None and "total_items" in hourly_df.columns:
             st.area_chart(hourly_df[["total_items"]])
 
-    # 3) Skuteczność mierzenia i ważenia (godzinowo)
-    st.markdown("### ✅ Skuteczność mierzenia i ważenia (godzinowo)")
+    # porównanie dób - przy danych z więcej niż jednej doby (np. kilka plików)
+    daily = sheets.get("daily_comparison")
+    if daily is not None and len(daily) > 1:
+        st.markdown("### 📅 Porównanie dób")
+        daily = daily.set_index("scan_date")
+        st.bar_chart(daily[["total_items"]])
+        st.line_chart(daily[["pct_loop_99", "pct_nok_244", "pct_overflow_243"]])
+
+    # 3) Skuteczność mierzenia i ważenia (w przedziałach czasu)
+    st.markdown("### ✅ Skuteczność mierzenia i ważenia w czasie")
     eff_df = None
 
     if "hourly_dims_measured" in sheets:
-        d = sheets["hourly_dims_measured"].copy()
-        if "scan_hour" in d.columns:
-            d["scan_hour"] = pd.to_datetime(d["scan_hour"])
-            d = d.set_index("scan_hour").sort_index()
+        d = _time_indexed(sheets["hourly_dims_measured"])
+        if d is not None:
             if "pct_unmeasured" in d.columns:
                 eff_df = pd.DataFrame({"skuteczność_mierzenia_%": (100.0 - d["pct_unmeasured"]).round(2)})
 
     if "hourly_weight_measured" in sheets:
-        w = sheets["hourly_weight_measured"].copy()
-        if "scan_hour" in w.columns:
-            w["scan_hour"] = pd.to_datetime(w["scan_hour"])
-            w = w.set_index("scan_hour").sort_index()
+        w = _time_indexed(sheets["hourly_weight_measured"])
+        if w is not None:
             if "pct_unmeasured" in w.columns:
                 w_eff = pd.DataFrame({"skuteczność_ważenia_%": (100.0 - w["pct_unmeasured"]).round(2)})
                 eff_df = w_eff if eff_df is None else eff_df.join(w_eff, how="outer")
@@ -410,10 +282,8 @@ def show_visualizations(sheets, summary, loaded):
     # 4) Problemy w czasie (Loop, NOK, Overflow) - liczby bezwzględne
     if "hourly_loop_nok_ovf" in sheets:
         st.markdown("### ⚠️ Loop, NOK, Overflow w czasie")
-        prob_df = sheets["hourly_loop_nok_ovf"].copy()
-        if "scan_hour" in prob_df.columns:
-            prob_df["scan_hour"] = pd.to_datetime(prob_df["scan_hour"])
-            prob_df = prob_df.set_index("scan_hour").sort_index()
+        prob_df = _time_indexed(sheets["hourly_loop_nok_ovf"])
+        if prob_df is not None:
             problem_cols = ["loop_99_count", "overflow_243_count", "nok_count"]
             available_cols = [c for c in problem_cols if c in prob_df.columns]
             if available_cols:
@@ -425,6 +295,19 @@ def show_visualizations(sheets, summary, loaded):
                     pct = prob_df[available_cols].div(prob_df["total_items"], axis=0) * 100.0
                     st.line_chart(pct)
 
+    # 4b) Chute Full: zsyp x godzina - które zsypy i kiedy się zapełniają
+    heatmap = sheets.get("chute_full_heatmap")
+    if heatmap is not None and not heatmap.empty:
+        st.markdown("### 🟥 Chute Full – zsyp × godzina")
+        cells = heatmap.drop(columns="total").melt(id_vars="chute", var_name="hour", value_name="items_count")
+        chart = alt.Chart(cells).mark_rect().encode(
+            x=alt.X("hour:O", title="godzina"),
+            y=alt.Y("chute:O", title="zsyp"),
+            color=alt.Color("items_count:Q", title="paczki", scale=alt.Scale(scheme="orangered")),
+            tooltip=["chute", "hour", "items_count"],
+        )
+        st.altair_chart(chart, use_container_width=True)
+
     # 5) Jakość pomiarów (tylko pojedyncze typy w aplikacji)
     if "bad_dims_pct" in sheets and "bad_weight_pct" in sheets:
         st.markdown("### 📏 Jakość pomiarów – pojedyncze typy")
@@ -445,25 +328,148 @@ def show_visualizations(sheets, summary, loaded):
                 bad_weight = bad_weight[~bad_weight["type"].astype(str).str.contains(";", regex=False)]
             st.dataframe(bad_weight.head(5), hide_index=True, use_container_width=True)
 
-    # 6) Ekstrema masy (TOP 5) – tylko pojedyncze typy w aplikacji
+    # 6) Ekstrema masy (TOP K) – tylko pojedyncze typy w aplikacji
     if "top5_heaviest" in sheets and "top5_lightest" in sheets:
-        st.markdown("### 🏋️ Ekstrema masy (TOP 5) – pojedyncze typy ")
+        k = max(len(sheets["top5_heaviest"]), 1)
+        st.markdown(f"### 🏋️ Ekstrema masy (TOP {k}) – pojedyncze typy ")
 
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("**TOP 5 najcięższych**")
+            st.markdown(f"**TOP {k} najcięższych**")
             top_heavy = sheets["top5_heaviest"].copy()
             if "type" in top_heavy.columns:
                 top_heavy = top_heavy[~top_heavy["type"].astype(str).str.contains(";", regex=False)]
-            st.dataframe(top_heavy.head(5), hide_index=True, use_container_width=True)
+            st.dataframe(top_heavy.head(k), hide_index=True, use_container_width=True)
 
         with col2:
-            st.markdown("**TOP 5 najlżejszych**")
+            st.markdown(f"**TOP {k} najlżejszych**")
             top_light = sheets["top5_lightest"].copy()
             if "type" in top_light.columns:
                 top_light = top_light[~top_light["type"].astype(str).str.contains(";", regex=False)]
-            st.dataframe(top_light.head(5), hide_index=True, use_container_width=True)
+            st.dataframe(top_light.head(k), hide_index=True, use_container_width=True)
+
+    # 7) Rozkłady masy i wymiarów - percentyle w czasie i histogram wybranego typu
+    dist_hour = sheets.get("dist_by_hour")
+    hist = sheets.get("hist_by_type")
+    if dist_hour is not None and not dist_hour.empty and hist is not None:
+        st.markdown("### 📊 Rozkłady masy i wymiarów")
+        col1, col2 = st.columns(2)
+        with col1:
+            measure = st.selectbox(
+                "Miara", options=list(dict.fromkeys(dist_hour["measure"].astype(str))), key="dist_measure",
+            )
+        types = list(dict.fromkeys(hist["package_type"].astype(str)))
+        counts = hist.groupby(hist["package_type"].astype(str))["items_count"].sum()
+        types.sort(key=lambda t: -counts.get(t, 0))
+        with col2:
+            package_type = st.selectbox("Typ opakowania (histogram)", options=types, key="dist_type")
+
+        st.markdown(f"**Percentyle {measure} w czasie**")
+        per_hour = _time_indexed(dist_hour[dist_hour["measure"].astype(str) == measure])
+        if per_hour is not None:
+            st.line_chart(per_hour[list(QUANTILES)])
+
+        st.markdown(f"**Histogram {measure} – {package_type}**")
+        h = hist[(hist["measure"].astype(str) == measure) & (hist["package_type"].astype(str) == package_type)]
+        st.bar_chart(h.set_index("bin_from")["items_count"])
+
+        # histogram w czasie: godzina x przedział, kolor = udział w godzinie
+        hist_hour = sheets.get("hist_by_hour")
+        if hist_hour is not None and not hist_hour.empty:
+            st.markdown(f"**Histogram {measure} w czasie**")
+            cells = hist_hour[(hist_hour["measure"].astype(str) == measure) & hist_hour["scan_hour"].notna()].copy()
+            cells["hour"] = pd.to_datetime(cells["scan_hour"]).dt.strftime("%Y-%m-%d %H:%M")
+            chart = alt.Chart(cells[["hour", "bin_from", "items_count", "pct_of_group"]]).mark_rect().encode(
+                x=alt.X("hour:O", title="godzina"),
+                y=alt.Y("bin_from:O", title=measure, sort="descending"),
+                color=alt.Color("pct_of_group:Q", title="% godziny", scale=alt.Scale(scheme="blues")),
+                tooltip=["hour", "bin_from", "items_count", "pct_of_group"],
+            )
+            st.altair_chart(chart, use_container_width=True)
+
+    # 8) Skrajne wartości per typ - rozrzut min/max masy wskazuje źle ważone typy
+    by_type = sheets.get("extremes_by_type")
+    if by_type is not None and not by_type.empty:
+        st.markdown("### 📏 Skrajne wartości per typ opakowania")
+        first = by_type[by_type["rank"] == 1]
+        measure = st.selectbox(
+            "Miara", options=list(dict.fromkeys(first["measure"])), key="extremes_measure",
+        )
+        spread = first[first["measure"] == measure].pivot_table(
+            index="package_type", columns="extreme", values="value", aggfunc="first", observed=True,
+        )
+        if {"min", "max"} <= set(spread.columns):
+            spread["max_to_min"] = (spread["max"] / spread["min"]).round(1)
+            spread = spread.sort_values("max_to_min", ascending=False)
+        st.dataframe(spread.reset_index(), hide_index=True, use_container_width=True)
+
+
+def filter_controls(parts: filters.HourlyParts) -> filters.ReportFilter:
+    """Zakres godzin i typy opakowań; pełny zakres i brak typów = bez filtra"""
+    st.markdown("### 🔎 Filtr raportu")
+    hours = [pd.Timestamp(h).to_pydatetime() for h in parts.hours()]
+    col1, col2 = st.columns([3, 2])
+    start = end = None
+    with col1:
+        if hours:
+            first, last = hours[0], hours[-1] + timedelta(hours=1)
+            lo, hi = st.slider(
+                "Zakres godzin (Scan)",
+                min_value=first, max_value=last, value=(first, last),
+                step=timedelta(hours=1), format="YYYY-MM-DD HH:mm",
+            )
+            start = pd.Timestamp(lo) if lo > first else None
+            end = pd.Timestamp(hi) if hi < last else None
+    with col2:
+        types = st.multiselect("Typy opakowań (puste = wszystkie)", parts.types())
+    return filters.ReportFilter(start=start, end=end, types=filters.filter_types(types))
+
+
+def chunk_lookup(index: ChunkIndex):
+    """Historia paczki po Chunk Id i paczki najczęściej krążące po sorterze (z indeksu)"""
+    st.markdown("### 📦 Paczki (Chunk Id)")
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        chunk = st.text_input("Chunk Id", placeholder="np. 7000123", help="Pełna historia paczki: skany, zrzuty, Logic")
+    with col2:
+        top_k = st.number_input("Ile paczek w zestawieniu recyrkulacji", min_value=5, max_value=500, value=20, step=5)
+
+    if chunk.strip():
+        history = index.history(chunk)
+        if history.empty:
+            st.warning(f"Brak paczki o Chunk Id: {chunk.strip()}")
+        else:
+            st.markdown(f"**Historia paczki {chunk.strip()}** – przejazdów: {len(history)}")
+            st.dataframe(history, use_container_width=True, hide_index=True)
+
+    st.markdown(f"**Top {int(top_k)} paczek z największą liczbą przejazdów**")
+    st.dataframe(index.top_recirculating(int(top_k)), use_container_width=True, hide_index=True)
+
+
+def show_performance(perf_df: pd.DataFrame):
+    """Zwijany panel z czasem/CPU/pamięcią etapów ostatniego raportu"""
+    computed = perf_df[~perf_df["cached"]]
+    with st.expander("⏱️ Wydajność (performance)", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Czas etapów (suma)", f"{computed['wall_s'].sum():.2f} s")
+        with col2:
+            st.metric("CPU (suma)", f"{computed['cpu_s'].sum():.2f} s")
+        with col3:
+            rss = perf_df["rss_mb"].max()
+            st.metric("RSS procesu (max)", f"{rss:.0f} MB" if pd.notna(rss) else "brak")
+
+        st.caption(
+            "Raporty liczone równolegle - suma czasów może przekraczać czas całkowity; "
+            "RSS dotyczy całego procesu serwera. Wiersze 'cached' pochodzą z pamięci wyników."
+        )
+        st.dataframe(
+            perf_df.sort_values("wall_s", ascending=False),
+            use_container_width=True,
+            hide_index=True,
+        )
+
 
 def main():
     # Konfiguracja strony
@@ -499,11 +505,38 @@ def main():
         st.markdown("### 🎨 Opcje")
         show_preview = st.checkbox("Pokaż wizualizacje", value=True)
         show_data_preview = st.checkbox("Pokaż podgląd tabel", value=True)
+        perf_sheet = st.checkbox("Arkusz _perf w raporcie (pomiary etapów)", value=False)
+
+        st.markdown("### ⚙️ Parametry raportu")
+        min_total = st.number_input(
+            "Min. liczba paczek typu (problem_share_type)",
+            min_value=1, value=DEFAULT_MIN_TOTAL, step=10,
+        )
+        base_efficiency = st.number_input(
+            "Wydajność bazowa sortera", min_value=1.0, value=DEFAULT_BASE_EFFICIENCY, step=100.0,
+        )
+        base_avg_length = st.number_input(
+            "Bazowa średnia długość paczki [mm]", min_value=1.0, value=DEFAULT_BASE_AVG_LENGTH, step=10.0,
+        )
+        granularity = st.selectbox(
+            "Przedziały czasu w arkuszach godzinowych",
+            options=list(GRANULARITY_LABELS),
+            index=list(GRANULARITY_LABELS).index(DEFAULT_GRANULARITY),
+            format_func=GRANULARITY_LABELS.get,
+            help=f"Zmiany zaczynają się o: {registry.DEFAULT_PARAMS['shifts']} (zmienna BOX_SHIFTS)",
+        )
+        top_k = st.number_input(
+            "Skrajne paczki ogółem (top/bottom K)", min_value=1, max_value=100, value=DEFAULT_TOP_K, step=1,
+        )
+        top_k_type = st.number_input(
+            "Skrajne paczki w każdym typie", min_value=0, max_value=20, value=DEFAULT_TOP_K_TYPE, step=1,
+            help="0 = bez arkusza extremes_by_type",
+        )
     
     # Główna zawartość
     st.markdown("""
     ### 🚀 Jak używać:
-    1. **Wgraj plik XLSX** z danymi MFC/Maintenace/Box sort detail
+    1. **Wgraj plik XLSX** z danymi MFC/Maintenace/Box sort detail (albo kilka plików, np. tydzień zmian)
     2. **Kliknij "Generuj raport"** i poczekaj ~30-60 sekund
     3. **Obejrzyj** raport na stronie lub **pobierz** table z opisem w pliku Excel
     """)
@@ -511,21 +544,32 @@ def main():
     st.markdown("---")
 
     # Upload pliku
-    uploaded_file = st.file_uploader(
+    uploaded_files = st.file_uploader(
         "📁 Wybierz plik XLSX do analizy",
         type=['xlsx'],
-        help="Plik musi zawierać kolumnę 'Scan' z datami oraz dane logistyczne (Discharge, Package type, etc.)"
+        accept_multiple_files=True,
+        help="Plik musi zawierać kolumnę 'Scan' z datami oraz dane logistyczne (Discharge, Package type, etc.). "
+             "Kilka plików = jeden raport łączny z porównaniem dób; powtórzone wiersze liczone raz."
     )
 
-    if uploaded_file is not None:
-        # Wyświetl info o pliku
-        file_size_mb = uploaded_file.size / 1024 / 1024
-        st.info(f"📄 Wybrany plik: **{uploaded_file.name}** ({file_size_mb:.2f} MB)")
+    if uploaded_files:
+        # Wyświetl info o plikach
+        for f in uploaded_files:
+            st.info(f"📄 Wybrany plik: **{f.name}** ({f.size / 1024 / 1024:.2f} MB)")
         
         # Przycisk generowania
         if st.button("🚀 Generuj raport", type="primary", use_container_width=True):
             with st.spinner("🔄 Przetwarzam dane... To może potrwać ~30-60 sekund"):
-                report_data, _, sheets, summary, loaded = generate_report(uploaded_file)
+                report_data, _, sheets, summary, loaded, perf_df, digest = generate_report(
+                    uploaded_files,
+                    min_total=int(min_total),
+                    base_efficiency=float(base_efficiency),
+                    base_avg_length=float(base_avg_length),
+                    perf_sheet=perf_sheet,
+                    granularity=granularity,
+                    top_k=int(top_k),
+                    top_k_type=int(top_k_type),
+                )
                 
                 if report_data and sheets and summary and loaded:
                     # Zapisz w session state
@@ -533,7 +577,17 @@ def main():
                     st.session_state['sheets'] = sheets
                     st.session_state['summary'] = summary
                     st.session_state['loaded'] = loaded
-                    st.session_state['uploaded_filename'] = uploaded_file.name
+                    st.session_state['perf'] = perf_df
+                    st.session_state['digest'] = digest
+                    st.session_state['params'] = {
+                        "min_total": int(min_total),
+                        "base_efficiency": float(base_efficiency),
+                        "base_avg_length": float(base_avg_length),
+                        "granularity": granularity,
+                        "top_k": int(top_k),
+                        "top_k_type": int(top_k_type),
+                    }
+                    st.session_state['uploaded_filename'] = ", ".join(f.name for f in uploaded_files)
                     
                     st.balloons()
                     st.success("🎉 Raport gotowy do pobrania!")
@@ -554,15 +608,34 @@ def main():
             type="primary",
             use_container_width=True
         )
-        
+
+        # Filtr: raport z wycinków liczników per godzina i typ (bez ponownego liczenia pliku)
+        sheets = st.session_state['sheets']
+        summary = st.session_state['summary']
+        st.markdown("---")
+        digest = st.session_state['digest']
+        params = st.session_state['params']
+        parts = _cached_parts(digest, registry.extreme_k(params), st.session_state['loaded'], params)
+        flt = filter_controls(parts)
+        if flt.active:
+            filtered = _cached_filtered(digest, tuple(params.values()), flt.key(), parts, flt, params)
+            sheets, summary = filtered.sheets, filtered.summary
+            st.download_button(
+                label="⬇️ Pobierz raport Excel (filtr)",
+                data=_cached_xlsx(digest, tuple(params.values()) + flt.key(), filtered),
+                file_name=f"BOX_raport_filtr_{stamp}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+
+        # Wyszukiwarka paczek - zawsze na pełnych danych (bez filtra raportu)
+        st.markdown("---")
+        chunk_lookup(_cached_chunk_index(digest, st.session_state['loaded']))
+
         # Wizualizacje
         if show_preview:
             st.markdown("---")
-            show_visualizations(
-                st.session_state['sheets'],
-                st.session_state['summary'],
-                st.session_state['loaded']
-            )
+            show_visualizations(sheets, summary)
         
         # Podgląd tabel
         if show_data_preview:
@@ -570,19 +643,24 @@ def main():
             st.markdown("### 📋 Podgląd danych")
             
             # Tabele w tej samej kolejności co arkusze w wygenerowanym XLSX
-            ordered = [n for n in SHEET_ORDER if n in st.session_state['sheets']]
-            for n in st.session_state['sheets'].keys():
+            ordered = [n for n in SHEET_ORDER if n in sheets]
+            for n in sheets.keys():
                 if n not in ordered:
                     ordered.append(n)
 
             tabs = st.tabs(ordered)
 
             for i, name in enumerate(ordered):
-                df = st.session_state['sheets'][name]
+                df = sheets[name]
                 with tabs[i]:
                     st.markdown(f"**{name}** - Pokazuje pierwsze 50 wierszy")
                     st.dataframe(df.head(50), use_container_width=True, hide_index=True)
 
+        # Pomiary etapów (wczytanie, każdy węzeł raportu, zapis XLSX)
+        perf_df = st.session_state.get('perf')
+        if perf_df is not None and len(perf_df):
+            show_performance(perf_df)
+
     # Footer
     st.markdown("---")
     st.markdown("""
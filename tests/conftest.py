@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# moduły aplikacji leżą płasko w katalogu repozytorium, generator danych w benchmarks/
+for path in (ROOT, ROOT / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def _plain_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Teksty i kategorie jako object - kategorie z różnych źródeł mają różne słowniki."""
+    df = df.copy()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or df[c].dtype == object or pd.api.types.is_string_dtype(df[c]):
+            df[c] = df[c].astype(object).where(df[c].notna(), None)
+    return df
+
+
+def _assert_sheets_equal(got: dict, expected: dict) -> None:
+    assert list(got) == list(expected)
+    for name, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(
+                _plain_frame(got[name]), _plain_frame(value),
+                check_dtype=False, check_exact=False, rtol=1e-12, obj=name,
+            )
+        else:
+            assert got[name] == pytest.approx(value, rel=1e-12), name
+
+
+@pytest.fixture
+def assert_sheets_equal():
+    """Porównanie wyników registry.evaluate (arkusz po arkuszu), bez typów kategorii."""
+    return _assert_sheets_equal
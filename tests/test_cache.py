@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+import cache as cache_mod
+import reports as rpt
+from cache import ParsedCache, cube_cached, file_hash, load_xlsx_cached
+from processing import load_xlsx
+from synthetic import make_sorter_frame, write_sorter_xlsx
+
+
+@pytest.fixture(scope="module")
+def xlsx_bytes(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cache") / "sorter.xlsx"
+    write_sorter_xlsx(make_sorter_frame(2_000, seed=41), path)
+    return path.read_bytes()
+
+
+def test_cache_hit_equals_fresh_parse(tmp_path, xlsx_bytes):
+    cache = ParsedCache(tmp_path)
+    fresh = load_xlsx(xlsx_bytes).df
+    miss = load_xlsx_cached(xlsx_bytes, cache=cache)
+    hit = load_xlsx_cached(xlsx_bytes, cache=cache)
+    assert hit is not miss
+    # typy kolumn co do słownika kategorii (np. braki pd.NA, nie NaN)
+    for col in fresh.columns:
+        assert hit.df[col].dtype == fresh[col].dtype, col
+    pd.testing.assert_frame_equal(hit.df, fresh, check_exact=True)
+    assert (hit.min_scan, hit.max_scan) == (miss.min_scan, miss.max_scan)
+
+
+def test_cube_cache_hit_equals_build_cube(tmp_path, xlsx_bytes):
+    cache = ParsedCache(tmp_path)
+    loaded = load_xlsx(xlsx_bytes)
+    digest = file_hash(xlsx_bytes)
+    cube_cached(loaded, digest, cache=cache)
+    pd.testing.assert_frame_equal(cube_cached(loaded, digest, cache=cache), rpt.build_cube(loaded.df))
+
+
+def test_entry_without_dtypes_is_a_miss(tmp_path, xlsx_bytes):
+    cache = ParsedCache(tmp_path)
+    if cache.suffix != ".feather":
+        pytest.skip("bez pyarrow cache zapisuje pickle")
+    load_xlsx_cached(xlsx_bytes, cache=cache)
+    for p in tmp_path.glob("*.dtypes"):
+        p.unlink()
+    assert cache.get(file_hash(xlsx_bytes)) is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_cube_version_in_key(tmp_path, xlsx_bytes, monkeypatch):
+    cache = ParsedCache(tmp_path)
+    loaded = load_xlsx(xlsx_bytes)
+    digest = file_hash(xlsx_bytes)
+    load_xlsx_cached(xlsx_bytes, cache=cache)
+    cube_cached(loaded, digest, cache=cache)
+    assert cache.get_cube(digest) is not None
+
+    # nowa wersja logiki kostki: stara kostka nieużywana i usuwana, dane z cache zostają
+    monkeypatch.setattr(cache_mod, "_CUBE_KIND", f"-cube{rpt.CUBE_VERSION + 1}")
+    assert cache.get_cube(digest) is None
+    cache.evict()
+    assert cache.get(digest) is not None
+    assert not list(tmp_path.glob(f"*-cube{rpt.CUBE_VERSION}-*"))
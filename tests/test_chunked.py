@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+import chunked
+import registry
+from processing import load_xlsx
+from synthetic import make_sorter_frame, write_sorter_xlsx
+
+ROWS, CHUNK_ROWS = 5_000, 100
+NAMES = registry.SHEET_ORDER + ["efficiency"]
+
+
+@pytest.fixture(scope="module")
+def xlsx_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("chunked") / "sorter.xlsx"
+    write_sorter_xlsx(make_sorter_frame(ROWS, seed=21), path)
+    return path
+
+
+def test_enough_chunks_for_several_compactions():
+    chunks = ROWS // CHUNK_ROWS
+    # pierwsze scalenie po COMPACT_EVERY partiach, każde następne po COMPACT_EVERY - 1
+    assert (chunks - 1) // (chunked.COMPACT_EVERY - 1) >= 3
+
+
+def test_report_chunked_matches_in_memory(xlsx_path, assert_sheets_equal):
+    expected = registry.evaluate(load_xlsx(xlsx_path, engine="openpyxl").df, NAMES, mode="serial")
+    got, acc = chunked.report_chunked(xlsx_path, NAMES, chunk_rows=CHUNK_ROWS)
+    assert acc.rows == ROWS
+    assert_sheets_equal(got, expected)
+
+
+def test_report_chunked_with_params(xlsx_path, assert_sheets_equal):
+    params = dict(registry.DEFAULT_PARAMS, top_k=2, top_k_type=1, granularity="15min")
+    names = ["top5_heaviest", "dims_extremes", "extremes_by_type", "hourly_dims_measured"]
+    expected = registry.evaluate(load_xlsx(xlsx_path, engine="openpyxl").df, names, params=params, mode="serial")
+    got, _ = chunked.report_chunked(xlsx_path, names, params=params, chunk_rows=1_000)
+    assert_sheets_equal(got, expected)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reports as rpt
+from processing import normalize_frame
+from synthetic import make_sorter_frame
+
+K, K_TYPE = 5, 3
+
+
+def _reference_positions(values, k, largest):
+    s = pd.Series(values, dtype="float64").dropna()
+    return s.sort_values(ascending=not largest, kind="stable").head(k).index.to_numpy()
+
+
+@pytest.mark.parametrize("largest", [True, False])
+@pytest.mark.parametrize("k", [0, 1, 3, 8, 50])
+def test_top_k_positions_matches_stable_sort(k, largest):
+    rng = np.random.default_rng(k)
+    values = rng.integers(0, 6, 40).astype(np.float64)  # dużo remisów
+    values[rng.random(40) < 0.2] = np.nan
+    got = rpt.top_k_positions(values, k, largest=largest)
+    np.testing.assert_array_equal(got, _reference_positions(values, k, largest))
+
+
+def test_top_k_positions_ties_keep_earlier_rows():
+    values = np.array([3.0, 7.0, np.nan, 7.0, 1.0, 7.0, 1.0])
+    assert rpt.top_k_positions(values, 2, largest=True).tolist() == [1, 3]
+    assert rpt.top_k_positions(values, 3, largest=False).tolist() == [4, 6, 0]
+    assert rpt.top_k_positions(np.full(3, np.nan), 2).tolist() == []
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    raw = make_sorter_frame(4_000, seed=11)
+    # zgrubne wartości -> remisy na granicy top k
+    for col in ("Volume", "Length", "Width", "Height"):
+        raw[col] = (raw[col] // 50) * 50
+    # typ z mniej niż k wierszami
+    raw.loc[raw.index[[10, 20]], "Package type Barcodes"] = "RZADKI"
+    return normalize_frame(raw).df
+
+
+def _reference_by_type(df: pd.DataFrame, k: int) -> pd.DataFrame:
+    """Skrajne wartości per typ wprost: stabilne sort_values + head(k) na wierszach."""
+    rows = []
+    for ptype, group in df.groupby("Package type Barcodes", observed=True, sort=False):
+        for col, measure in rpt.MEASURES.items():
+            values = group[col].where(group[col] > 0).dropna()
+            for largest, extreme in ((True, "max"), (False, "min")):
+                top = values.sort_values(ascending=not largest, kind="stable").head(k)
+                for rank, (pos, value) in enumerate(top.items(), start=1):
+                    rows.append((ptype, measure, extreme, rank, df.at[pos, "Chunk Id"], value))
+    return pd.DataFrame(rows, columns=["package_type", "measure", "extreme", "rank", "chunk", "value"])
+
+
+def _plain(frame: pd.DataFrame) -> pd.DataFrame:
+    out = frame.astype({"package_type": str, "chunk": str})
+    return out.sort_values(["package_type", "measure", "extreme", "rank"]).reset_index(drop=True)
+
+
+def _overall_reference(df: pd.DataFrame, col: str, k: int, largest: bool) -> list:
+    values = df[col].where(df[col] > 0).dropna()
+    top = values.sort_values(ascending=not largest, kind="stable").head(k)
+    return [(str(df.at[pos, "Chunk Id"]), value) for pos, value in top.items()]
+
+
+def _check_extremes(extremes: dict, df: pd.DataFrame) -> None:
+    by_type = extremes["by_type"]
+    assert (by_type["package_type"].astype(str) == "RZADKI").any()
+    pd.testing.assert_frame_equal(_plain(by_type), _plain(_reference_by_type(df, K_TYPE)), check_dtype=False)
+
+    for name, largest in (("heaviest", True), ("lightest", False)):
+        got = list(zip(extremes[name]["chunk"].astype(str), extremes[name]["weight_g"]))
+        assert got == _overall_reference(df, "Volume", K, largest)
+    dims = extremes["dims"]
+    for col in ("Length", "Width", "Height"):
+        for largest, extreme in ((True, "max"), (False, "min")):
+            part = dims[(dims["measure"] == rpt.MEASURES[col]) & (dims["extreme"] == extreme)]
+            assert list(zip(part["chunk"].astype(str), part["value"])) == _overall_reference(df, col, K, largest)
+
+
+def test_extremes_match_stable_sort(frame):
+    cand = rpt.extreme_candidates(frame, k=K)
+    _check_extremes(rpt.extremes_from_candidates(cand, k=K, k_type=K_TYPE), frame)
+
+
+@pytest.mark.parametrize("chunk_rows", [37, 500])
+def test_extremes_from_chunk_candidates(frame, chunk_rows):
+    # jak chunked.ChunkedReport: kandydaci z partii (row_offset), potem ponowny wybór
+    parts = [
+        rpt.extreme_candidates(frame.iloc[start:start + chunk_rows], k=K, row_offset=start)
+        for start in range(0, len(frame), chunk_rows)
+    ]
+    cand = rpt.extreme_candidates(pd.concat(parts, ignore_index=True), k=K)
+    assert cand["_row"].is_unique
+    _check_extremes(rpt.extremes_from_candidates(cand, k=K, k_type=K_TYPE), frame)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reports as rpt
+from processing import NO_CHUTE, normalize_frame, parse_logic
+from synthetic import make_sorter_frame
+
+
+def _parse_one(value):
+    chute, reason = parse_logic(pd.Series([value], dtype=object))
+    return int(chute[0]), reason[0]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("Chute Full 12", (12, "Chute Full")),
+        ("  Chute Full 7  ", (7, "Chute Full")),
+        ("Sorted", (NO_CHUTE, "Sorted")),
+        ("Chute Full\n12", (12, "Chute Full")),
+        ("Chute Full\nponownie", (NO_CHUTE, "Chute Full\nponownie")),
+    ],
+)
+def test_parse_logic(value, expected):
+    assert _parse_one(value) == expected
+
+
+def test_parse_logic_missing():
+    chute, reason = _parse_one(np.nan)
+    assert chute == NO_CHUTE
+    assert pd.isna(reason)
+
+
+def test_parse_logic_chute_above_int16():
+    chute, reason = _parse_one("Chute Full 99999")
+    assert chute == NO_CHUTE
+    assert reason == "Chute Full"
+
+
+def test_parse_logic_keeps_row_order():
+    logic = pd.Series(["Sorted", "Chute Full 3", None, "Chute Full 3", "No Read"])
+    chute, reason = parse_logic(logic)
+    assert chute.dtype == np.int16
+    assert chute.tolist() == [NO_CHUTE, 3, NO_CHUTE, 3, NO_CHUTE]
+    assert [None if pd.isna(r) else r for r in reason] == ["Sorted", "Chute Full", None, "Chute Full", "No Read"]
+
+
+def test_chute_full_with_newline_matches_raw_logic():
+    # jak przed parse_logic: 'Chute Full' gdziekolwiek w surowym Logic
+    raw = make_sorter_frame(2_000, seed=3)
+    raw.loc[raw.index[::50], "Logic"] = "Chute Full\nponownie"
+    df = normalize_frame(raw).df
+    expected = df["Logic"].astype("string").str.contains("Chute Full", na=False).astype(bool)
+    pd.testing.assert_series_equal(rpt._is_chute_full(df), expected, check_names=False)
+
+
+def test_heatmap_totals_match_raw_logic():
+    raw = make_sorter_frame(5_000, seed=4)
+    raw.loc[raw.index[::97], "Logic"] = "Chute Full\n5"
+    df = normalize_frame(raw).df
+    heatmap = rpt.report_chute_full_heatmap(rpt.chute_hour_counts(df))
+
+    # liczone wprost z tekstu Logic, bez parse_logic
+    text = df["Logic"].astype("string")
+    number = text.str.extract(r"Chute Full\s+(\d+)$", expand=False)
+    hit = (
+        text.str.contains("Chute Full", na=False)
+        & df["Discharge"].isin(rpt.DISCHARGES)
+        & number.notna()
+        & df["scan_hour"].notna()
+    )
+    expected = number[hit].astype(int).value_counts().sort_index()
+
+    got = heatmap.set_index("chute")["total"]
+    assert got.sum() == hit.sum()
+    pd.testing.assert_series_equal(got, expected, check_names=False, check_dtype=False, check_index_type=False)
+    hours = heatmap.columns[1:-1]
+    assert (heatmap[hours].sum(axis=1) == heatmap["total"]).all()
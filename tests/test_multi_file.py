@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+import pipeline
+from processing import concat_frames, load_xlsx, overlap_masks
+from synthetic import make_sorter_frame, write_sorter_xlsx
+
+ROWS, OVERLAP = 6_000, 300
+CUTS = [0, 2_000, 4_000, ROWS]
+
+
+@pytest.fixture(scope="module")
+def exports(tmp_path_factory):
+    """Jeden ciągły eksport (3 doby) i trzy eksporty zmianowe, każdy zaczyna się OVERLAP wierszy wcześniej."""
+    tmp = tmp_path_factory.mktemp("multi")
+    df = make_sorter_frame(ROWS, seed=31, start="2025-03-03 06:00:00", hours=72)
+    full = tmp / "full.xlsx"
+    write_sorter_xlsx(df, full)
+    parts = []
+    for i in range(len(CUTS) - 1):
+        path = tmp / f"part{i}.xlsx"
+        write_sorter_xlsx(df.iloc[max(0, CUTS[i] - OVERLAP):CUTS[i + 1]], path)
+        parts.append(str(path))
+    return str(full), parts
+
+
+def _sheets(report: pipeline.Report) -> dict:
+    return {**report.sheets, "summary": report.summary}
+
+
+def test_overlap_masks():
+    keys = [np.array([1, 2, 2, 3]), np.array([3, 4, 4, 1]), np.array([4, 5, 2])]
+    masks = overlap_masks(keys)
+    # powtórzenia w obrębie pliku zostają, pomijane tylko wiersze z wcześniejszych plików
+    assert [m.tolist() for m in masks] == [
+        [False, False, False, False],
+        [True, False, False, True],
+        [True, False, True],
+    ]
+
+
+def test_merge_loaded_matches_single_source(exports, assert_sheets_equal):
+    full, parts = exports
+    expected = pipeline.compute_report(load_xlsx(full), mode="serial")
+    loaded = load_xlsx(parts)
+    assert loaded.duplicates == 2 * OVERLAP
+    assert len(loaded.df) == ROWS
+    assert_sheets_equal(_sheets(pipeline.compute_report(loaded, mode="serial")), _sheets(expected))
+
+
+def test_compute_report_many_matches_single_source(exports, assert_sheets_equal):
+    full, parts = exports
+    expected = pipeline.compute_report(load_xlsx(full), mode="serial")
+    report, rows, duplicates = pipeline.compute_report_many(parts, use_cache=False)
+    assert (rows, duplicates) == (ROWS, 2 * OVERLAP)
+    assert_sheets_equal(_sheets(report), _sheets(expected))
+
+
+def test_load_many_with_cache_hit_and_miss(exports, tmp_path, monkeypatch):
+    # pierwszy plik z cache, drugi parsowany od nowa - słowniki kategorii muszą się zgadzać
+    monkeypatch.setattr(cache, "DEFAULT_CACHE_DIR", tmp_path)
+    _, parts = exports
+    datas = [Path(p).read_bytes() for p in parts[:2]]
+    pipeline.load(datas[0])
+    assert len(list(tmp_path.glob("*.feather"))) == 1
+
+    loaded = pipeline.load_many(datas)
+    expected = load_xlsx(parts[:2])
+    assert loaded.duplicates == expected.duplicates == OVERLAP
+    pd.testing.assert_frame_equal(loaded.df, expected.df)
+
+
+def test_concat_frames_mixed_category_dictionaries():
+    fresh = pd.Categorical(["5", "99 Loop"], categories=pd.Index(["5", "99 Loop"], dtype="string"))
+    # jak z Arrow bez odtworzenia typów: słownik "str" z brakami NaN
+    other = pd.Categorical(
+        ["Overflow 243", "5"], categories=pd.Index(["5", "Overflow 243"], dtype=pd.StringDtype(na_value=np.nan)),
+    )
+    df = concat_frames([pd.DataFrame({"Discharge": fresh}), pd.DataFrame({"Discharge": other})])
+    assert df["Discharge"].cat.categories.dtype == pd.StringDtype()
+    assert df["Discharge"].tolist() == ["5", "99 Loop", "Overflow 243", "5"]
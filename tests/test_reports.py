@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import registry
+import reports as rpt
+from processing import normalize_frame
+from synthetic import make_sorter_frame
+
+
+def _hourly_dims_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """report_hourly_dims_measured sprzed wektoryzacji (lambdy z df.loc per godzina)."""
+    g = df.groupby("scan_hour", dropna=False)
+
+    out = g.agg(
+        avg_length=("Length", lambda s: s[s > 0].mean()),
+        avg_width=("Width", lambda s: s[s > 0].mean()),
+        avg_height=("Height", lambda s: s[s > 0].mean()),
+        total_items=("scan_hour", "size"),
+        measured_items=(
+            "Length",
+            lambda s: ((s > 0) & (df.loc[s.index, "Width"] > 0) & (df.loc[s.index, "Height"] > 0)).sum(),
+        ),
+        unmeasured_items=(
+            "Length",
+            lambda s: (
+                s.isna()
+                | (s <= 0)
+                | df.loc[s.index, "Width"].isna()
+                | (df.loc[s.index, "Width"] <= 0)
+                | df.loc[s.index, "Height"].isna()
+                | (df.loc[s.index, "Height"] <= 0)
+            ).sum(),
+        ),
+    ).reset_index()
+
+    out["pct_unmeasured"] = (out["unmeasured_items"] / out["total_items"] * 100.0).round(2)
+    out = out.sort_values("scan_hour").reset_index(drop=True)
+    return out
+
+
+@pytest.fixture
+def dims_frame() -> pd.DataFrame:
+    raw = make_sorter_frame(3_000, seed=7, hours=5)
+    rng = np.random.default_rng(7)
+    for col in ("Length", "Width", "Height"):
+        negative = rng.random(len(raw)) < 0.05
+        raw.loc[negative, col] = -raw.loc[negative, col].abs()
+    raw.loc[raw.index[::200], "Scan"] = pd.NaT
+    df = normalize_frame(raw).df
+    # godzina, w której żaden wymiar nie jest dodatni (średnie NaN)
+    first = df["scan_hour"] == df["scan_hour"].min()
+    df.loc[first, ["Length", "Width", "Height"]] = 0.0
+    return df
+
+
+def test_hourly_dims_measured_matches_reference(dims_frame):
+    expected = _hourly_dims_reference(dims_frame)
+    assert expected["scan_hour"].isna().any() and expected["avg_length"].isna().any()
+    pd.testing.assert_frame_equal(rpt.report_hourly_dims_measured(dims_frame), expected)
+
+
+def test_hourly_dims_measured_from_slots_matches_reference(dims_frame):
+    # ścieżka rejestru: agregat godzinowy z przedziałów 15 min
+    sheet = registry.evaluate(dims_frame, ["hourly_dims_measured"], mode="serial")["hourly_dims_measured"]
+    pd.testing.assert_frame_equal(sheet, _hourly_dims_reference(dims_frame))
+
+
+def test_hist_percentiles_within_one_bin_of_quantile():
+    rng = np.random.default_rng(5)
+    n = 5_000
+    # dwa szczyty masy (rozkład dwumodalny), wymiary w zakresie histogramu
+    mass = np.concatenate([rng.normal(800, 120, n // 2), rng.normal(3_000, 400, n - n // 2)])
+    df = pd.DataFrame({
+        "scan_hour": pd.Timestamp("2025-01-01 06:00"),
+        "Package type Barcodes": pd.Categorical(rng.choice(["BOX S", "BOX M"], n)),
+        "Volume": mass.round(),
+        "Length": rng.uniform(100, 600, n).round(),
+        "Width": rng.lognormal(5.0, 0.4, n).round(),
+        "Height": rng.uniform(20, 300, n).round(),
+    })
+    df.loc[df.index[::40], "Length"] = np.nan
+    df.loc[df.index[::70], "Height"] = 0.0
+
+    dist = rpt.hist_percentiles(rpt.build_hist(df), "Package type Barcodes")
+    for col, (width, _) in rpt.HIST_BINS.items():
+        for ptype, group in df.groupby("Package type Barcodes", observed=True):
+            values = group[col][group[col] > 0].to_numpy()
+            row = dist[(dist["package_type"] == ptype) & (dist["measure"] == rpt.MEASURES[col])].iloc[0]
+            assert row["measured_items"] == len(values)
+            for name, q in rpt.QUANTILES.items():
+                assert abs(row[name] - np.quantile(values, q)) <= width
+
+
+def test_hist_by_hour_sheet(dims_frame):
+    sheets = registry.evaluate(dims_frame, ["hist_by_hour", "hist_by_type"], mode="serial")
+    by_hour, by_type = sheets["hist_by_hour"], sheets["hist_by_type"]
+    assert list(by_hour.columns) == ["scan_hour", "measure", "bin_from", "bin_to", "items_count", "pct_of_group"]
+    # te same histogramy, tylko inaczej zsumowane
+    hour_totals = by_hour.groupby(["measure", "bin_from"], observed=True)["items_count"].sum()
+    type_totals = by_type.groupby(["measure", "bin_from"], observed=True)["items_count"].sum()
+    pd.testing.assert_series_equal(hour_totals, type_totals)
+    # wiersze bez godziny (NaT) też mają swój wiersz histogramu
+    assert by_hour["scan_hour"].isna().any()
+    assert by_hour.loc[by_hour["measure"] == "length_mm", "items_count"].sum() == (dims_frame["Length"] > 0).sum()